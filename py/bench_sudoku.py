@@ -0,0 +1,263 @@
+"""Benchmarks for the solver, generator and validator hot paths
+
+Usage (from this folder):
+    python bench_sudoku.py                          # run every benchmark
+    python bench_sudoku.py -k solve/bitmask         # only names containing a filter
+    python bench_sudoku.py --save baseline.json     # store the results
+    python bench_sudoku.py --compare baseline.json  # flag regressions
+
+Each benchmark times individual calls over a fixed corpus and reports
+throughput and latency percentiles. With ``--compare`` the median latency of
+every benchmark is checked against the stored baseline and the script exits
+with status 1 if any got slower by more than ``--threshold``.
+
+Baselines are only comparable on the same machine and Python version.
+"""
+
+import argparse
+import collections
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sudoku import (CompactBoard, PuzzleStore, SeedBank, SolutionCache, SudokuBoard,
+                    canonical_form, count_solutions, generate_puzzle, is_valid_board,
+                    rate_puzzle, solve, solve_sudoku)
+from sudoku._metrics import LatencyHistogram
+
+# Puzzles with 17 givens, the fewest a uniquely solvable sudoku can have
+SEVENTEEN_CLUE = [
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+]
+
+# Puzzles published as among the hardest for human and backtracking solvers
+HARDEST = [
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+]
+
+# Generated puzzles the reference backtracking solver handles quickly
+EASY = [
+    ".47....3.....36178..81...545....2...4.23875.67.964..1292.5.478.....9...13..8219.5",
+    "93.6..42.1.4...697..829...3..17...69..718...2...9.574.5.2.73916.694..385.1.5.....",
+    ".9.58.467.7.4239.1..1..9...1....4.787298.51.638...75..8179.26.543....8.9..6.18...",
+    "...37.28172.5.16.93..2..7....17.39...6..28...23795.81458..9..6...6.3..92942617.5.",
+]
+
+# Generated hard 16x16 puzzles
+SIXTEEN = [
+    "....D.4.78.91..G.34.8B97.E.G.6D2.8...CG....2...41...A..26...389...7..8E.5BG..D...2.G.6.....8..59..E.F......6.3.8.58B.....1..F4G...C..7D.2.E14B....14E.A.3.F.C...GE..5...89...F1...5F1....6.C...E71..C..9G.B.D5..C.B..57...84.92.D4.9..6.C7.381BF5G....2..D6A.E..",
+    "3B.F4..A2..8..9.......DG...B.....CG......F.EA7..D..5B.....6G..3..7..3...8....A1.........C1F..D7G..F.8..D.62..4..9....E..G.A4B2.3EF74AB...83.C5.1.9.3F.47...C6E.......D..E47FG......A6.5....14FD.415...B3....D....D..57.F4.E....2.A..G6..D3......2G..D.E8....F.4C",
+    "DC8..52.439FG.76.1.4.F.....DE2..A.B...692.G.D..16....E..8.B...C3.8..GA...F...4.5...G..3E52..BC.7..A...1.C..G8.....5.F.9...E.31...B.7CD4.......19.9.F..E8....46.A......AF9B..C.32.A.CB9...1.8.7E......6CDG...1...E..697..F.....GB9.C1..B4DE.5.3.....5..F...2B6...",
+    ".CB..9.1DA73....D4.1..C...2G..59..F6..5D.4........A...G.1...6.....GDC5.26.84.3.77..B8.6.E...2.4.6.3.....72B..CAG.....B7....F.....8...A...EC.DF.4.7E.D.8.4F69GB2.9.2CF..E...8A.164.63..2B..........D.E2.....71...F.47G.1...56E...G......9..1D.7B...1.5..A..F.483.",
+]
+
+CORPORA = {'17-clue': SEVENTEEN_CLUE, 'hardest': HARDEST, 'easy': EASY, '16x16': SIXTEEN}
+
+# A benchmark times run(prepare(case)) for every case; prepare is not timed
+Benchmark = collections.namedtuple('Benchmark', 'name cases prepare run')
+
+
+def load_corpora():
+    """Parse the corpora, checking every puzzle has exactly one solution"""
+    corpora = {}
+    for name, puzzles in CORPORA.items():
+        boards = [CompactBoard.from_string(puzzle) for puzzle in puzzles]
+        for puzzle in boards:
+            if count_solutions(puzzle, limit=2) != 1:
+                raise SystemExit(f'Corpus {name}: {puzzle} is not uniquely solvable')
+        corpora[name] = boards
+    return corpora
+
+
+def build_benchmarks(corpora):
+    """Return the benchmark list"""
+    solutions = []
+    for puzzle in corpora['17-clue'] + corpora['hardest']:
+        solution = puzzle.copy()
+        solve(solution)
+        solutions.append(solution)
+
+    benchmarks = []
+    for engine in ('bitmask', 'dlx'):
+        for corpus in ('17-clue', 'hardest', '16x16'):
+            benchmarks.append(Benchmark(
+                f'solve/{engine}/{corpus}', corpora[corpus], CompactBoard.copy,
+                lambda board, engine=engine: solve(board, engine)))
+    benchmarks.append(Benchmark(
+        'solve/backtrack/easy', corpora['easy'], CompactBoard.copy,
+        lambda board: solve(board, 'backtrack')))
+    # The warm-up pass fills the caches, so these time cache hits
+    for canonical in (True, False):
+        cache = SolutionCache(canonical=canonical)
+        benchmarks.append(Benchmark(
+            f"solve/cached-{'canonical' if canonical else 'exact'}/hardest",
+            corpora['hardest'], CompactBoard.copy, cache.solve))
+    benchmarks.append(Benchmark(
+        'solve_sudoku/bitmask/hardest', corpora['hardest'], CompactBoard.to_rows,
+        solve_sudoku))
+    for engine in ('dlx', 'bitmask'):
+        benchmarks.append(Benchmark(
+            f'count_solutions/{engine}/17-clue', corpora['17-clue'], None,
+            lambda board, engine=engine: count_solutions(board, 2, engine)))
+    for difficulty in ('easy', 'medium', 'hard'):
+        benchmarks.append(Benchmark(
+            f'generate_puzzle/{difficulty}', list(range(8)), random.Random,
+            lambda rng, difficulty=difficulty: generate_puzzle(difficulty, rng)))
+    benchmarks.append(Benchmark(
+        'generate_puzzle/16x16/hard', list(range(4)), random.Random,
+        lambda rng: generate_puzzle('hard', rng, size=16)))
+    for difficulty in ('easy', 'hard'):
+        bank = SeedBank()
+        benchmarks.append(Benchmark(
+            f'generate_puzzle/bank/{difficulty}', list(range(8)), random.Random,
+            lambda rng, difficulty=difficulty, bank=bank: generate_puzzle(difficulty, rng,
+                                                                          bank=bank)))
+    benchmarks.append(Benchmark(
+        'rate_puzzle/17-clue', corpora['17-clue'], None, rate_puzzle))
+    benchmarks.append(Benchmark(
+        'find_hint/17-clue', corpora['17-clue'], SudokuBoard.from_puzzle,
+        SudokuBoard.find_hint))
+    benchmarks.append(Benchmark(
+        'canonical_form/17-clue', corpora['17-clue'], None, canonical_form))
+    benchmarks.append(Benchmark(
+        'is_valid_board/solved', solutions, None, is_valid_board))
+    benchmarks.append(Benchmark(
+        'is_valid_board/solved-rows', [board.to_rows() for board in solutions], None,
+        is_valid_board))
+    # Random reads from a 1024-record store against parsing the text form
+    folder = tempfile.TemporaryDirectory()
+    path = os.path.join(folder.name, 'bench.store')
+    puzzles = corpora['17-clue'] + corpora['hardest']
+    with PuzzleStore(path, 'w') as store:
+        store.extend(list(zip(puzzles, solutions)) * 128)
+    store = PuzzleStore(path)
+    benchmarks.append(Benchmark(
+        'store/read', list(range(0, 1024, 37)), None,
+        lambda i, store=store, folder=folder: store[i].puzzle.to_board()))
+    benchmarks.append(Benchmark(
+        'from_string/17-clue', [puzzle.to_string() for puzzle in corpora['17-clue']], None,
+        CompactBoard.from_string))
+    try:
+        from sudoku import boards_to_array, validate_boards
+    except ImportError:  # NumPy is optional
+        pass
+    else:
+        # One call validates 1024 boards
+        benchmarks.append(Benchmark(
+            'validate_boards/solved-1024', [boards_to_array(solutions * 128)], None,
+            validate_boards))
+    return benchmarks
+
+
+def run_benchmark(benchmark, repeat):
+    """Time every case ``repeat`` times after one warm-up pass
+
+    Returns:
+        dict: The histogram summary plus throughput in calls per second
+    """
+    prepare = benchmark.prepare or (lambda case: case)
+    for case in benchmark.cases:
+        benchmark.run(prepare(case))
+
+    histogram = LatencyHistogram()
+    clock = time.perf_counter
+    for _ in range(repeat):
+        for case in benchmark.cases:
+            argument = prepare(case)
+            started = clock()
+            benchmark.run(argument)
+            histogram.add(clock() - started)
+    result = histogram.summary()
+    result['throughput'] = histogram.count / histogram.total if histogram.total else 0.0
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline and return the regressed names"""
+    regressed = []
+    print(f"\n{'benchmark':34} {'baseline p50':>13} {'p50':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or not before['p50']:
+            print(f'{name:34} {"-":>13} {_ms(result["p50"]):>10} {"new":>8}')
+            continue
+        change = result['p50'] / before['p50'] - 1.0
+        flag = ''
+        if change > threshold:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:34} {_ms(before["p50"]):>13} {_ms(result["p50"]):>10} '
+              f'{change:>+8.1%}{flag}')
+    return regressed
+
+
+def _ms(seconds):
+    """Format seconds as milliseconds"""
+    return f'{seconds * 1000:.3f}ms'
+
+
+def main(argv=None):
+    """Run the benchmarks and return the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', '--filter', action='append', default=[],
+                        help='only run benchmarks whose name contains this text')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='timed passes over each corpus (default: 5)')
+    parser.add_argument('--save', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='JSON baseline to check the results against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed p50 slowdown before flagging, 0.2 = 20%% '
+                             '(default: 0.2)')
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks(load_corpora())
+    if args.filter:
+        benchmarks = [benchmark for benchmark in benchmarks
+                      if any(text in benchmark.name for text in args.filter)]
+
+    print(f"{'benchmark':34} {'calls':>6} {'calls/s':>10} {'mean':>10} "
+          f"{'p50':>10} {'p90':>10} {'p99':>10} {'max':>10}")
+    results = {}
+    for benchmark in benchmarks:
+        result = results[benchmark.name] = run_benchmark(benchmark, args.repeat)
+        print(f"{benchmark.name:34} {result['count']:>6} {result['throughput']:>10,.1f} "
+              + ' '.join(f'{_ms(result[key]):>10}'
+                         for key in ('mean', 'p50', 'p90', 'p99', 'max')))
+
+    if args.save:
+        document = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.save, 'w') as handle:
+            json.dump(document, handle, indent=2, sort_keys=True)
+        print(f'\nSaved results to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)['results']
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f'\n{len(regressed)} benchmark(s) regressed by more than '
+                  f'{args.threshold:.0%}: {", ".join(regressed)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,85 @@
 """Sudoku game with solver and PySide6 GUI"""
 
-from ._sudoku import SudokuBoard, generate_puzzle, solve_sudoku
-from ._solve_engine import solve, is_valid_board
-from ._gui import run as run_gui
+from ._board import SIZES, CompactBoard
+from ._sudoku import SudokuBoard, generate_puzzle, solve_sudoku, count_solutions
+from ._solve_engine import ENGINES, GaveUp, solve, iter_solutions, is_valid_board
+from ._batch import solve_many, iter_solve_many, generate_many
+from ._metrics import SolveStats
+from ._pool import PuzzlePool, get_default_pool, set_default_pool
+from ._canonical import Transform, canonical_form, random_transform
+from ._index import PuzzleIndex
+from ._cache import SolutionCache
+from ._bank import SeedBank
+from ._history import MoveHistory
+from ._store import PuzzleStore
 
 __all__ = [
+    'SIZES',
+    'CompactBoard',
     'SudokuBoard',
     'generate_puzzle',
     'solve_sudoku',
+    'count_solutions',
+    'ENGINES',
+    'GaveUp',
     'solve',
+    'iter_solutions',
     'is_valid_board',
+    'solve_many',
+    'iter_solve_many',
+    'generate_many',
+    'SolveStats',
+    'rate_puzzle',
+    'difficulty_of',
+    'logical_steps',
+    'PuzzlePool',
+    'get_default_pool',
+    'set_default_pool',
+    'Transform',
+    'canonical_form',
+    'random_transform',
+    'PuzzleIndex',
+    'SolutionCache',
+    'SeedBank',
+    'MoveHistory',
+    'PuzzleStore',
+    'validate_boards',
+    'candidate_masks',
+    'boards_to_array',
+    'asolve',
+    'agenerate_puzzle',
+    'AsyncExecutor',
+    'get_default_executor',
+    'set_default_executor',
+    'PuzzleServer',
     'run_gui',
 ]
+
+# Optional dependencies, imported on first use: PySide6 for the GUI and
+# NumPy for the batched validator; asyncio, slow to import, for the async API
+# and the HTTP service; the logical solver, whose unit tables are built on
+# import
+_LAZY = {
+    'rate_puzzle': ('_logic', 'rate_puzzle'),
+    'difficulty_of': ('_logic', 'difficulty_of'),
+    'logical_steps': ('_logic', 'logical_steps'),
+    'run_gui': ('_gui', 'run'),
+    'validate_boards': ('_vectorized', 'validate_boards'),
+    'candidate_masks': ('_vectorized', 'candidate_masks'),
+    'boards_to_array': ('_vectorized', 'boards_to_array'),
+    'asolve': ('_async', 'asolve'),
+    'agenerate_puzzle': ('_async', 'agenerate_puzzle'),
+    'AsyncExecutor': ('_async', 'AsyncExecutor'),
+    'get_default_executor': ('_async', 'get_default_executor'),
+    'set_default_executor': ('_async', 'set_default_executor'),
+    'PuzzleServer': ('_server', 'PuzzleServer'),
+}
+
+
+def __getattr__(name):
+    """Import the GUI, NumPy and asyncio helpers on first use so they stay optional"""
+    if name in _LAZY:
+        import importlib
+        module, attribute = _LAZY[name]
+        return getattr(importlib.import_module('.' + module, __name__), attribute)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
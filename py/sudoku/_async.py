@@ -0,0 +1,314 @@
+"""asyncio entry points for the solver and generator.
+
+``solve`` and ``generate_puzzle`` are CPU-bound and take from microseconds
+to seconds, so calling them from a coroutine stalls every other session on
+the event loop. ``asolve`` and ``agenerate_puzzle`` hand the work to an
+``AsyncExecutor`` instead and await the result.
+
+The executor bounds the work in flight: at most ``max_pending`` calls are
+handed to the worker processes at a time, and further calls wait their turn
+on the event loop, so a burst of thousands of requests queues cheaply in
+the loop rather than in the pool. A timeout covers the wait for a slot as
+well as the work. Cancelling a call (or timing out) withdraws a task the
+workers have not started; a task already running is left to finish, its
+result discarded, and keeps its slot until then so the workers are never
+oversubscribed. ``asolve`` also hands its timeout to the solver as a search
+budget, so a puzzle still running at the deadline stops on the worker too.
+``stats`` reports the queue depths and outcome counters.
+
+Classes:
+    AsyncExecutor: Bounded process or thread pool awaited from asyncio
+
+Functions:
+    asolve: Solve a puzzle in place without blocking the event loop
+    agenerate_puzzle: Generate a puzzle without blocking the event loop
+    get_default_executor: The executor shared by the async functions
+    set_default_executor: Replace the shared executor
+
+"""
+
+import asyncio
+import collections
+import os
+import random
+import threading
+import time
+
+from ._batch import _BACKLOG_PER_WORKER, _COUNTERS, _solve_chunk
+from ._board import flatten, write_cells
+from ._metrics import LatencyHistogram, SolveStats
+from ._sudoku import _generate_puzzle
+
+_OUTCOMES = ('submitted', 'completed', 'failed', 'cancelled', 'timeouts')
+
+
+class AsyncExecutor(object):
+    """Bounded process or thread pool for running solver work from asyncio
+
+    The pool is started on first use. Use an executor from one event loop
+    at a time.
+
+    Args:
+        workers: Worker processes or threads, None for one per CPU
+        max_pending: Calls handed to the workers at once; further calls wait
+            for a slot. Defaults to two per worker
+        kind: 'process' to solve in parallel, or 'thread' for work that
+            releases the GIL or must share memory with the caller
+    """
+
+    def __init__(self, workers=None, max_pending=None, kind='process'):
+        super().__init__()
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"kind must be 'process' or 'thread', not {kind!r}")
+        self._workers = workers or os.cpu_count() or 1
+        self._limit = max_pending or self._workers * _BACKLOG_PER_WORKER
+        if self._limit < 1:
+            raise ValueError('max_pending must be at least 1')
+        self._kind = kind
+        self._pool = None
+        self._lock = threading.Lock()
+        self._running = 0  # Calls holding a slot
+        self._waiters = collections.deque()  # Futures of calls waiting for a slot
+        self._counts = dict.fromkeys(_OUTCOMES, 0)
+        self._wait = LatencyHistogram()
+
+    async def run(self, func, *args, timeout=None, timed_out=None):
+        """
+        Run func(*args) on a worker once a slot is free
+
+        Args:
+            func: Picklable callable (a module-level function for processes)
+            timeout: Seconds to wait for the result, slot included; None to
+                wait indefinitely
+            timed_out: Optional callable(result) telling whether func itself
+                stopped at a deadline; such a result counts as a timeout
+
+        Returns:
+            The return value of func
+
+        Raises:
+            asyncio.TimeoutError: If the timeout expires first, or timed_out
+                says func did
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            await self._acquire(loop, deadline)
+        except asyncio.TimeoutError:
+            self._counts['timeouts'] += 1
+            raise
+        except asyncio.CancelledError:
+            self._counts['cancelled'] += 1
+            raise
+        try:
+            future = self._executor().submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        self._counts['submitted'] += 1
+        # The slot is returned when the task ends, not when the caller stops waiting
+        future.add_done_callback(lambda future: self._finished(loop, future))
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+        except asyncio.TimeoutError:
+            self._counts['timeouts'] += 1
+            raise
+        except asyncio.CancelledError:
+            self._counts['cancelled'] += 1
+            raise
+        if timed_out is not None and timed_out(result):
+            self._counts['timeouts'] += 1
+            raise asyncio.TimeoutError()
+        return result
+
+    def stats(self):
+        """
+        Get the queue depths and outcome counters
+
+        Returns:
+            dict: running (calls handed to the workers), waiting (calls
+                waiting for a slot), max_pending, workers, the submitted,
+                completed, failed, cancelled and timeouts counts, and
+                wait_p50 / wait_p99, the seconds calls waited for a slot
+        """
+        stats = {
+            'running': self._running,
+            'waiting': sum(1 for waiter in self._waiters if not waiter.done()),
+            'max_pending': self._limit,
+            'workers': self._workers,
+        }
+        stats.update(self._counts)
+        stats['wait_p50'] = self._wait.percentile(50)
+        stats['wait_p99'] = self._wait.percentile(99)
+        return stats
+
+    def shutdown(self, wait=True):
+        """Stop the workers; the executor starts new ones if used again"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait)
+
+    def _executor(self):
+        """The worker pool, started on first use"""
+        with self._lock:
+            if self._pool is None:
+                from concurrent import futures
+                if self._kind == 'process':
+                    self._pool = futures.ProcessPoolExecutor(self._workers)
+                else:
+                    self._pool = futures.ThreadPoolExecutor(self._workers)
+            return self._pool
+
+    async def _acquire(self, loop, deadline):
+        """Take a slot, waiting in arrival order when all are in use"""
+        started = time.perf_counter()
+        if self._running < self._limit and not self._waiters:
+            self._running += 1
+        else:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except BaseException:
+                # The slot may have been handed over just as the wait ended
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                raise
+        self._wait.add(time.perf_counter() - started)
+
+    def _release(self):
+        """Hand a slot to the next waiting call, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    def _finished(self, loop, future):
+        """Task done callback, run on a worker thread"""
+        if future.cancelled():
+            outcome = None
+        else:
+            outcome = 'failed' if future.exception() is not None else 'completed'
+        try:
+            loop.call_soon_threadsafe(self._settle, outcome)
+        except RuntimeError:  # The loop is closed; nobody waits on it any more
+            self._settle(outcome)
+
+    def _settle(self, outcome):
+        """Count a finished task and return its slot"""
+        if outcome is not None:
+            self._counts[outcome] += 1
+        self._release()
+
+
+_default_executor = None
+_default_lock = threading.Lock()
+
+
+def get_default_executor():
+    """Return the executor shared by asolve and agenerate_puzzle, creating it on first use"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = AsyncExecutor()
+        return _default_executor
+
+
+def set_default_executor(executor):
+    """Replace the shared executor
+
+    The previous executor is returned and left running.
+    """
+    global _default_executor
+    with _default_lock:
+        previous, _default_executor = _default_executor, executor
+    return previous
+
+
+async def asolve(board, engine='bitmask', stats=None, timeout=None, executor=None,
+                 max_nodes=None):
+    """
+    Solve a sudoku puzzle in place without blocking the event loop
+
+    Like ``solve``, run on a worker. stats receives the search counters
+    once the worker is done; its on_node hook is not called.
+
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        engine: Name of the solving engine, one of ``ENGINES``
+        stats: Optional SolveStats to update
+        timeout: Seconds to wait, None for no limit; the search stops at
+            the same deadline, even if the task waited for a worker
+        executor: AsyncExecutor to run on, defaults to the shared one
+        max_nodes: Optional most guesses the search may make
+
+    Returns:
+        bool: True if solved successfully, False otherwise, or a falsy
+            GaveUp if max_nodes ran out
+
+    Raises:
+        asyncio.TimeoutError: If the timeout expires first; board is unchanged
+    """
+    cells = bytes(flatten(board))
+    executor = executor or get_default_executor()
+    deadline = None if timeout is None else time.time() + timeout
+    solved, timings, counters, gave_up = await executor.run(
+        _solve_chunk, (len(cells), cells), engine, stats is not None, None, max_nodes,
+        deadline, timeout=timeout, timed_out=_timed_out)
+    if stats is not None:
+        result = SolveStats()
+        for name, value in zip(_COUNTERS, counters):
+            setattr(result, name, value)
+        result.elapsed = timings[0]
+        stats.merge(result)
+    if gave_up:
+        return gave_up[0][1]
+    if not solved[0]:
+        return False
+    write_cells(board, solved)
+    return True
+
+
+def _timed_out(result):
+    """Whether the puzzle of a one-puzzle _solve_chunk result hit its deadline"""
+    gave_up = result[3]
+    return bool(gave_up) and gave_up[0][1].reason == 'timeout'
+
+
+async def agenerate_puzzle(difficulty='medium', size=9, seed=None, timeout=None,
+                           executor=None):
+    """
+    Generate a sudoku puzzle with unique solution without blocking the event loop
+
+    Like ``generate_puzzle``, run on a worker.
+
+    Args:
+        difficulty: 'easy', 'medium' or 'hard'
+        size: Side length, 9 or one of 4, 16 and 25
+        seed: Seed of the generator, None for a random one
+        timeout: Seconds to wait, None for no limit
+        executor: AsyncExecutor to run on, defaults to the shared one
+
+    Returns:
+        tuple: (puzzle, solution) as 2D lists
+
+    Raises:
+        asyncio.TimeoutError: If the timeout expires first
+    """
+    if seed is None:
+        # Forked workers share the parent's random state, so seed every call
+        seed = random.SystemRandom().getrandbits(64)
+    executor = executor or get_default_executor()
+    puzzle, solution = await executor.run(_generate_task, difficulty, size, seed,
+                                          timeout=timeout)
+    return puzzle.to_rows(), solution.to_rows()
+
+
+def _generate_task(difficulty, size, seed):
+    """Worker task: generate one puzzle from a seed"""
+    return _generate_puzzle(difficulty, random.Random(seed), None, size)
@@ -0,0 +1,191 @@
+"""Seed bank for fast puzzle generation.
+
+Carving a puzzle out of a fresh grid spends most of its time proving that
+each removal keeps the solution unique. ``SeedBank`` keeps minimal puzzles
+(cores: no given can be removed without losing uniqueness) with their solved
+grids instead. Every superset of a core on its own grid is unique as well,
+so a new puzzle is derived by applying a random symmetry (see
+``random_transform``) to a core and its grid and removing random non-core
+cells without any uniqueness check, then fitting the result into the score
+band of its difficulty as usual. New full grids are a random symmetry of a
+stored grid, microseconds instead of a search.
+
+The price is variety. All puzzles derived from one core contain a symmetric
+image of it and share its solution grid up to symmetry, so they are related
+even though they are not equivalent puzzles. A core is retired after
+``reuse`` puzzles and a fresh one is carved the slow way; lower values give
+more varied puzzles, higher values faster generation.
+
+Classes:
+    SeedBank: Minimal puzzles and solved grids that new puzzles derive from
+
+"""
+
+import collections
+import random
+import threading
+
+from ._board import CompactBoard
+from ._canonical import random_transform
+from ._solve_engine import _BitmaskSearch, count_solutions, solve
+from ._sudoku import (_carve, _cells_to_remove, _fit_band, _generate_full_board,
+                      _generate_puzzle)
+
+
+class _Core(object):
+    """A minimal puzzle, its solution and how it has been used"""
+
+    __slots__ = ('puzzle', 'solution', 'uses', 'exhausted', 'bare')
+
+    def __init__(self, puzzle, solution):
+        self.puzzle = puzzle
+        self.solution = solution
+        self.uses = 0
+        # Difficulties the core yields no new puzzles for: it rates too easy
+        # even with every other cell removed, or only fits the band bare
+        # and was already returned that way
+        self.exhausted = set()
+        # Difficulties the bare core was returned for
+        self.bare = set()
+
+
+class SeedBank(object):
+    """Minimal puzzles and solved grids that new puzzles are derived from
+
+    The bank starts empty and fills itself: whenever no core is available
+    for a difficulty, a puzzle is carved normally and its core is added.
+
+    Args:
+        reuse: Puzzles derived from a core before it is retired
+        capacity: Most cores and grids kept; the oldest go first
+    """
+
+    def __init__(self, reuse=32, capacity=64):
+        super().__init__()
+        if reuse < 1 or capacity < 1:
+            raise ValueError('reuse and capacity must be at least 1')
+        self._reuse = reuse
+        self._cores = collections.deque(maxlen=capacity)
+        self._grids = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @property
+    def reuse(self):
+        """(int) Puzzles derived from a core before it is retired"""
+        return self._reuse
+
+    def __len__(self):
+        return len(self._cores)
+
+    def add(self, puzzle, solution=None):
+        """
+        Add a uniquely solvable puzzle; it is reduced to a core first
+
+        Args:
+            puzzle: CompactBoard, 81-char string or 9x9 list
+            solution: Its solution, solved here when None
+
+        Raises:
+            ValueError: If the puzzle does not have exactly one solution
+        """
+        puzzle = CompactBoard.coerce(puzzle)
+        if count_solutions(puzzle, 2) != 1:
+            raise ValueError('Puzzle does not have a unique solution')
+        if solution is None:
+            solution = puzzle.copy()
+            solve(solution)
+        self._add_core(puzzle, CompactBoard.coerce(solution))
+
+    def full_board(self, rng=random):
+        """
+        Return a complete, valid board as a random symmetry of a stored grid
+
+        Args:
+            rng: random.Random instance to draw from
+
+        Returns:
+            CompactBoard: A solved grid
+        """
+        with self._lock:
+            grid = rng.choice(self._grids) if self._grids else None
+        if grid is None:
+            grid = _generate_full_board(rng)
+            with self._lock:
+                self._grids.append(grid)
+        return random_transform(rng).apply(grid)
+
+    def generate(self, difficulty='medium', rng=random, progress=None):
+        """
+        Derive a puzzle from a core, carving a new core when none fits
+
+        Args:
+            difficulty: 'easy', 'medium' or 'hard'
+            rng: random.Random instance to draw from
+            progress: Optional callable(removed, total), as for generate_puzzle
+
+        Returns:
+            tuple: (puzzle, solution) CompactBoards
+        """
+        from ._logic import DIFFICULTY_BANDS
+        band = DIFFICULTY_BANDS.get(difficulty)
+        while True:
+            core = self._take(difficulty, rng)
+            if core is None:
+                break
+            result = _derive(core, difficulty, band, rng, progress)
+            with self._lock:
+                if result is not None and result[0].count_empty() == core.puzzle.count_empty():
+                    # Nothing but the core is left; equivalent to the last time
+                    if difficulty in core.bare:
+                        result = None
+                    core.bare.add(difficulty)
+                if result is not None:
+                    return result
+                core.exhausted.add(difficulty)
+        puzzle, solution = _generate_puzzle(difficulty, rng, progress)
+        self._add_core(puzzle, solution)
+        return puzzle, solution
+
+    def _take(self, difficulty, rng):
+        """Pick a core usable for difficulty, retiring it once used up"""
+        with self._lock:
+            usable = [core for core in self._cores if difficulty not in core.exhausted]
+            if not usable:
+                return None
+            core = rng.choice(usable)
+            core.uses += 1
+            if core.uses >= self._reuse:
+                self._cores.remove(core)
+            return core
+
+    def _add_core(self, puzzle, solution):
+        """Reduce a unique puzzle to a core and store it with its grid"""
+        search = _BitmaskSearch(puzzle.cells)
+        for cell, digit in enumerate(puzzle.cells):
+            if digit:
+                search.try_remove(cell)
+        with self._lock:
+            self._cores.append(_Core(CompactBoard(search.cells), solution))
+            self._grids.append(solution)
+
+
+def _derive(core, difficulty, band, rng, progress):
+    """Carve a puzzle around a randomly transformed core
+
+    Returns:
+        tuple: (puzzle, solution) CompactBoards, or None if the puzzle rates
+            too easy for the band even when reduced to the core
+    """
+    transform = random_transform(rng)
+    solution = transform.apply(core.solution)
+    kept = transform.apply(core.puzzle).cells
+    positions = [cell for cell, digit in enumerate(kept) if not digit]
+    rng.shuffle(positions)
+    positions = iter(positions)
+
+    search = _BitmaskSearch(solution.cells)
+    _carve(search, positions, _cells_to_remove(difficulty, rng), progress, checked=False)
+    if band is None or _fit_band(search, solution, positions, band, rng, progress,
+                                 checked=False):
+        return CompactBoard(search.cells), solution
+    return None
@@ -0,0 +1,346 @@
+"""Batch solving and generation across worker processes.
+
+Puzzles are packed into chunks of raw 81-byte records (one ``bytes`` object
+per chunk), so each task pickles a single small buffer instead of a list of
+nested lists. Boards of the other sizes use records of their cell count;
+a new chunk starts wherever the size changes. Chunks are handed to a
+``ProcessPoolExecutor`` with a bounded number of tasks in flight, which
+keeps memory flat however long the input iterable is. A per-puzzle search
+budget (``timeout``, ``max_nodes``) stops a pathological puzzle from
+holding a worker; it comes back as a ``GaveUp``.
+
+Functions:
+    solve_many: Solve a collection of puzzles and return the results in order
+    iter_solve_many: Stream (index, solution) pairs, ordered or as completed
+    generate_many: Stream unique puzzles generated from per-task seed streams
+
+"""
+
+import collections
+import hashlib
+import itertools
+import os
+import random
+import time
+from array import array
+
+from ._bank import SeedBank
+from ._board import CompactBoard
+from ._canonical import canonical_form
+from ._metrics import SolveStats
+from ._solve_engine import solve
+from ._sudoku import _check_bank_size, _generate_puzzle
+
+# Tasks kept in flight per worker process
+_BACKLOG_PER_WORKER = 2
+
+# Integer SolveStats fields sent back from the workers
+_COUNTERS = ('nodes', 'backtracks', 'max_depth', 'propagations', 'solutions')
+
+# Generated records: puzzle, solution and the puzzle's dedup digest
+_KEY_SIZE = 8
+
+# Duplicates in a row after which generation stops: the difficulty and size
+# have (almost) no new puzzles left, as with large counts of 4x4 puzzles
+_MAX_DUPLICATES = 1000
+
+
+def solve_many(puzzles, workers=None, chunksize=64, engine='bitmask', timeout=None,
+               max_nodes=None):
+    """
+    Solve many puzzles, using several processes
+
+    Args:
+        puzzles: Iterable of 81-char strings, 9x9 lists or CompactBoards
+        workers: Number of worker processes, None for one per CPU and 1 to
+            solve in the calling process
+        chunksize: Number of puzzles sent to a worker per task
+        engine: Name of the solving engine
+        timeout: Optional seconds to search each puzzle for
+        max_nodes: Optional most guesses to make per puzzle
+
+    Returns:
+        list: A CompactBoard solution, None if unsolvable, or a falsy GaveUp
+            if the search ran out of budget, per puzzle in input order
+    """
+    return [solution for _, solution in
+            iter_solve_many(puzzles, workers, chunksize, engine, True, timeout, max_nodes)]
+
+
+def iter_solve_many(puzzles, workers=None, chunksize=64, engine='bitmask', ordered=True,
+                    timeout=None, max_nodes=None):
+    """
+    Lazily solve many puzzles, using several processes
+
+    Only a few chunks per worker are read ahead of the results being
+    consumed, so ``puzzles`` can be an arbitrarily long iterator.
+
+    Args:
+        puzzles: Iterable of 81-char strings, 9x9 lists or CompactBoards
+        workers: Number of worker processes, None for one per CPU and 1 to
+            solve in the calling process
+        chunksize: Number of puzzles sent to a worker per task
+        engine: Name of the solving engine
+        ordered: Yield in input order if True, otherwise as chunks complete
+        timeout: Optional seconds to search each puzzle for
+        max_nodes: Optional most guesses to make per puzzle
+
+    Yields:
+        tuple: (index, solution) where solution is a CompactBoard, None or
+            GaveUp
+    """
+    for index, solution, _, _ in _iter_solve_timed(puzzles, workers, chunksize, engine,
+                                                   ordered, False, timeout, max_nodes):
+        yield index, solution
+
+
+def _iter_solve_timed(puzzles, workers, chunksize, engine, ordered, with_stats=False,
+                      timeout=None, max_nodes=None):
+    """Like iter_solve_many, but yield (index, solution, seconds, stats)
+
+    seconds is the time the worker spent solving that puzzle. stats is a
+    SolveStats for the puzzle when with_stats is set, otherwise None.
+    """
+    chunks = _pack_chunks(puzzles, chunksize)
+    results = _map_chunks(_solve_chunk, chunks, workers, ordered, engine, with_stats,
+                          timeout, max_nodes)
+    for start, (blob, timings, counters, gave_up) in results:
+        ncells = len(blob) // len(timings)
+        gave_up = dict(gave_up)
+        for i, seconds in enumerate(timings):
+            cells = blob[i * ncells:(i + 1) * ncells]
+            solution = CompactBoard(cells) if cells[0] else gave_up.get(i)
+            stats = None
+            if counters is not None:
+                stats = SolveStats()
+                values = counters[i * len(_COUNTERS):(i + 1) * len(_COUNTERS)]
+                for name, value in zip(_COUNTERS, values):
+                    setattr(stats, name, value)
+                stats.elapsed = seconds
+            yield start + i, solution, seconds, stats
+
+
+def generate_many(n, difficulty='medium', workers=None, seed=None, chunksize=16, reuse=0,
+                  size=9):
+    """
+    Generate unique puzzles, using several processes
+
+    Task k draws from its own ``random.Random`` seeded with ``(seed, k)``
+    and results are consumed in task order, so a given seed and chunksize
+    always produce the same sequence whatever the number of workers.
+    Puzzles that are equivalent under a symmetry (see ``canonical_form``)
+    are skipped; the workers canonicalize and only an 8-byte digest per
+    puzzle is kept, so memory grows by 8 bytes per puzzle produced. Boards
+    of the other sizes are only checked for exact duplicates.
+
+    Args:
+        n: Number of unique puzzles to produce
+        difficulty: 'easy', 'medium' or 'hard'
+        workers: Number of worker processes, None for one per CPU and 1 to
+            generate in the calling process
+        seed: Base seed, None for a random one
+        chunksize: Number of puzzles generated per worker task
+        reuse: When above 0, every task derives its puzzles from its own
+            SeedBank that reuses each core this many times; faster, but
+            puzzles of a task are related (see ``SeedBank``); 9x9 only
+        size: Side length, 9 or one of 4, 16 and 25
+
+    Yields:
+        tuple: (puzzle, solution) CompactBoards
+
+    Raises:
+        RuntimeError: If a thousand puzzles in a row are duplicates, as
+            there are not n distinct puzzles to be found
+    """
+    for puzzle, solution, _ in _iter_generate_timed(n, difficulty, workers, seed,
+                                                    chunksize, reuse=reuse, size=size):
+        yield puzzle, solution
+
+
+def _iter_generate_timed(n, difficulty, workers, seed, chunksize, stats=None, reuse=0,
+                         size=9, max_duplicates=_MAX_DUPLICATES):
+    """Like generate_many, but yield (puzzle, solution, seconds) triples
+
+    When given, stats['duplicates'] counts the puzzles skipped as duplicates.
+    RuntimeError is raised once more than max_duplicates come in a row.
+    """
+    if reuse > 0:
+        _check_bank_size(size)
+    if n <= 0:
+        return
+    ncells = size * size
+    record_size = 2 * ncells + _KEY_SIZE
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    tasks = ((index, (seed, index, chunksize)) for index in itertools.count())
+    results = _map_chunks(_generate_chunk, tasks, workers, True, difficulty, reuse, size)
+    seen = set()
+    produced = 0
+    repeated = 0  # Duplicates since the last new puzzle
+    try:
+        for _, (blob, timings) in results:
+            for i, seconds in enumerate(timings):
+                record = blob[i * record_size:(i + 1) * record_size]
+                key = record[2 * ncells:]
+                if key in seen:
+                    if stats is not None:
+                        stats['duplicates'] = stats.get('duplicates', 0) + 1
+                    repeated += 1
+                    if repeated > max_duplicates:
+                        raise RuntimeError(
+                            f'Stopped after {repeated} duplicate puzzles in a row: '
+                            f'found only {produced} distinct {difficulty} puzzles')
+                    continue
+                repeated = 0
+                seen.add(key)
+                yield (CompactBoard(record[:ncells]),
+                       CompactBoard(record[ncells:2 * ncells]), seconds)
+                produced += 1
+                if produced >= n:
+                    return
+    finally:
+        results.close()
+
+
+def _generate_chunk(task, difficulty, reuse=0, size=9):
+    """Worker task: generate a chunk of puzzles from the task's own seed
+
+    Returns:
+        tuple: (records, timings) with a puzzle+solution+digest record and
+            the seconds spent generating each puzzle
+    """
+    seed, index, count = task
+    rng = random.Random(f'{seed}:{index}')
+    bank = SeedBank(reuse) if reuse > 0 else None
+    out = bytearray()
+    timings = array('d')
+    clock = time.perf_counter
+    for _ in range(count):
+        started = clock()
+        if bank is not None:
+            puzzle, solution = bank.generate(difficulty, rng)
+        else:
+            puzzle, solution = _generate_puzzle(difficulty, rng, None, size)
+        timings.append(clock() - started)
+        out += puzzle.cells
+        out += solution.cells
+        out += _dedup_key(puzzle)
+    return bytes(out), timings
+
+
+def _dedup_key(puzzle):
+    """Digest of the puzzle's canonical form, or of its cells if not 9x9"""
+    cells = canonical_form(puzzle)[0].cells if puzzle.size == 9 else puzzle.cells
+    return hashlib.blake2b(cells, digest_size=_KEY_SIZE).digest()
+
+
+def _pack_chunks(puzzles, chunksize):
+    """Yield (start_index, (ncells, chunk)) where chunk holds raw records
+
+    Every record of a chunk has ncells cells, 81 for 9x9 boards.
+    """
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1')
+    chunk = bytearray()
+    start = count = ncells = 0
+    for puzzle in puzzles:
+        cells = CompactBoard.coerce(puzzle).cells
+        if count and len(cells) != ncells:
+            yield start, (ncells, bytes(chunk))
+            start += count
+            chunk = bytearray()
+            count = 0
+        ncells = len(cells)
+        chunk += cells
+        count += 1
+        if count == chunksize:
+            yield start, (ncells, bytes(chunk))
+            start += count
+            chunk = bytearray()
+            count = 0
+    if count:
+        yield start, (ncells, bytes(chunk))
+
+
+def _solve_chunk(chunk, engine, with_stats=False, timeout=None, max_nodes=None,
+                 deadline=None):
+    """Worker task: solve every record of an (ncells, records) chunk
+
+    timeout and max_nodes are the search budget of each puzzle. deadline is
+    an optional ``time.time()`` shared by the whole chunk: each puzzle's
+    timeout is cut to what is left of it, so the puzzles after it give up
+    at once.
+
+    Returns:
+        tuple: (solutions, timings, counters, gave_up) where unsolved
+            puzzles come back as all-zero records, timings holds the seconds
+            spent per puzzle, counters the _COUNTERS of every puzzle's
+            SolveStats in one flat array, or None without with_stats, and
+            gave_up lists (position, GaveUp) for the puzzles out of budget
+    """
+    ncells, blob = chunk
+    out = bytearray(len(blob))
+    timings = array('d')
+    counters = array('q') if with_stats else None
+    gave_up = []
+    clock = time.perf_counter
+    for offset in range(0, len(blob), ncells):
+        board = CompactBoard(blob[offset:offset + ncells])
+        stats = SolveStats() if with_stats else None
+        started = clock()
+        budget = timeout
+        if deadline is not None:
+            left = max(0.0, deadline - time.time())
+            budget = left if timeout is None else min(timeout, left)
+        solved = solve(board, engine, stats, budget, max_nodes)
+        timings.append(clock() - started)
+        if solved:
+            out[offset:offset + ncells] = board.cells
+        elif solved is not False:
+            gave_up.append((offset // ncells, solved))
+        if with_stats:
+            counters.extend(getattr(stats, name) for name in _COUNTERS)
+    return bytes(out), timings, counters, gave_up
+
+
+def _map_chunks(func, chunks, workers, ordered, *args):
+    """Run func(chunk, *args) for every (key, chunk) and yield (key, result)
+
+    Work runs in a process pool with at most a few tasks per worker in
+    flight. Runs in the calling process when workers is 1.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for key, chunk in chunks:
+            yield key, func(chunk, *args)
+        return
+
+    # Imported here: concurrent.futures pulls in logging and would double the
+    # import time of the package for callers that never use processes
+    from concurrent import futures
+
+    backlog = workers * _BACKLOG_PER_WORKER
+    chunks = iter(chunks)
+    with futures.ProcessPoolExecutor(workers) as pool:
+        pending = collections.OrderedDict()
+
+        def submit():
+            for key, chunk in chunks:
+                pending[pool.submit(func, chunk, *args)] = key
+                if len(pending) >= backlog:
+                    return
+
+        try:
+            submit()
+            while pending:
+                if ordered:
+                    done = (next(iter(pending)),)
+                else:
+                    done = futures.wait(pending, return_when=futures.FIRST_COMPLETED).done
+                for future in done:
+                    yield pending.pop(future), future.result()
+                submit()
+        finally:
+            for future in pending:
+                future.cancel()
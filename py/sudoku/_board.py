@@ -0,0 +1,353 @@
+"""Compact Sudoku board representation.
+
+A board is stored as a flat ``bytearray`` of 81 cells in row-major order, with
+0 for empty cells. Compared with a 9x9 list of lists this takes a fraction of
+the memory, copies with a single buffer copy instead of ``copy.deepcopy`` and
+round-trips through the usual 81-character puzzle string.
+
+Boards of the other N^2 x N^2 sizes (4x4, 16x16 and 25x25) use the same
+layout with 16, 256 or 625 cells. Their strings write the values 10-25 as
+the letters A-P.
+
+Code that expects the historical list-of-lists layout can use ``rows``, a view
+that reads and writes through to the compact cells.
+
+Classes:
+    CompactBoard: Flat 81-byte board with cheap copy, hashing and string I/O
+    BoardView: List-of-lists view over a CompactBoard
+    RowView: Single row of a BoardView
+
+Functions:
+    board_size: Side length of a board from its number of cells
+    flatten: Get the 81 cell values of any supported board type
+    write_cells: Store 81 cell values back into any supported board type
+
+"""
+
+from collections.abc import Sequence
+
+_SIZE = 9
+_NCELLS = _SIZE * _SIZE
+_EMPTY_CHARS = '.0'
+
+# Supported side lengths, N^2 for boxes of N x N cells
+SIZES = (4, 9, 16, 25)
+_SIZE_OF = {size * size: size for size in SIZES}
+_BASE_OF = {size * size: base for base, size in zip((2, 3, 4, 5), SIZES)}
+_CHARS = '123456789ABCDEFGHIJKLMNOP'
+# Cell values allowed per side length, for a bytes.translate range check
+_VALUES = {size: bytes(range(size + 1)) for size in SIZES}
+
+
+def board_size(ncells):
+    """
+    Side length of a board with ncells cells
+
+    Raises:
+        ValueError: If ncells is not the cell count of a supported size
+    """
+    try:
+        return _SIZE_OF[ncells]
+    except KeyError:
+        raise ValueError(f"Expected {_NCELLS} cells or another supported size "
+                         f"({', '.join(str(size * size) for size in SIZES)}), "
+                         f"got {ncells}") from None
+
+
+class CompactBoard(object):
+    """Flat 81-cell sudoku board backed by a bytearray
+
+    Cells can be addressed by flat index (``row * 9 + col``) or by a
+    ``(row, col)`` tuple. Boards compare and hash by content, so a board must
+    not be modified while it is used as a dict key or set member.
+
+    Args:
+        cells: Cell values in row-major order, 0 for empty; their count sets
+            the board size
+        size: Side length of an empty board when no cells are given
+
+    Raises:
+        ValueError: If the cell count is not that of a supported size, or a
+            value is above the side length
+    """
+
+    __slots__ = ('_cells',)
+
+    def __init__(self, cells=None, size=_SIZE):
+        if cells is None:
+            board_size(size * size)
+            self._cells = bytearray(size * size)
+        else:
+            self._cells = bytearray(cells)
+            size = _SIZE if len(self._cells) == _NCELLS else board_size(len(self._cells))
+            invalid = self._cells.translate(None, _VALUES[size])
+            if invalid:
+                raise ValueError(f"Cell value {invalid[0]} at position "
+                                 f"{self._cells.index(invalid[0])} is outside 0-{size}")
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a board from a 9x9 (or other supported size) list of lists"""
+        return cls(value for row in rows for value in row)
+
+    @classmethod
+    def from_string(cls, text):
+        """Build a board from an 81-char string using '.' or '0' for empty cells
+
+        Strings of 16, 256 or 625 characters give the other sizes, with the
+        letters A-P (either case) for the values 10-25.
+        """
+        text = text.strip()
+        ncells = len(text)
+        if ncells not in _SIZE_OF:
+            raise ValueError(f"Expected {_NCELLS} characters or another supported size "
+                             f"({', '.join(str(size * size) for size in SIZES)}), "
+                             f"got {ncells}")
+        size = _SIZE_OF[ncells]
+        cells = bytearray(ncells)
+        for i, char in enumerate(text):
+            if char in _EMPTY_CHARS:
+                continue
+            value = _CHARS.find(char.upper()) + 1
+            if not 0 < value <= size:
+                raise ValueError(f"Invalid character {char!r} at position {i} "
+                                 f"of a {size}x{size} board")
+            cells[i] = value
+        board = cls.__new__(cls)
+        board._cells = cells
+        return board
+
+    @classmethod
+    def coerce(cls, board):
+        """Return board as a CompactBoard, converting strings and 9x9 lists
+
+        CompactBoards are returned unchanged, not copied; stored boards are
+        unpacked into a new one.
+        """
+        if isinstance(board, cls):
+            return board
+        if isinstance(board, BoardView):
+            return board.board
+        if isinstance(board, str):
+            return cls.from_string(board)
+        if hasattr(board, 'to_board'):  # PackedBoard of a PuzzleStore
+            return board.to_board()
+        return cls.from_rows(board)
+
+    @property
+    def cells(self):
+        """(bytearray) The underlying 81 cells, shared with the board"""
+        return self._cells
+
+    @property
+    def size(self):
+        """(int) Side length: 9, or 4, 16 or 25 for the other sizes"""
+        return _SIZE_OF[len(self._cells)]
+
+    @property
+    def base(self):
+        """(int) Side length of a box, 3 for a 9x9 board"""
+        return _BASE_OF[len(self._cells)]
+
+    @property
+    def rows(self):
+        """(BoardView) List-of-lists view that writes through to this board"""
+        return BoardView(self)
+
+    def get(self, row, col):
+        """Get value at specific cell"""
+        return self._cells[row * _SIZE_OF[len(self._cells)] + col]
+
+    def set(self, row, col, value):
+        """Set value at specific cell"""
+        self._cells[row * _SIZE_OF[len(self._cells)] + col] = value
+
+    def copy(self):
+        """Return an independent copy of the board"""
+        board = CompactBoard.__new__(CompactBoard)
+        board._cells = bytearray(self._cells)
+        return board
+
+    def count_empty(self):
+        """Number of empty cells"""
+        return self._cells.count(0)
+
+    def to_rows(self):
+        """Return a new 9x9 list of lists"""
+        cells = self._cells
+        size = _SIZE_OF[len(cells)]
+        return [list(cells[i:i + size]) for i in range(0, len(cells), size)]
+
+    def to_string(self, empty='.'):
+        """Return the 81-char string form of the board"""
+        return self._cells.translate(_TO_TEXT).decode('ascii').replace('.', empty)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            row, col = index
+            return self._cells[row * _SIZE_OF[len(self._cells)] + col]
+        return self._cells[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            row, col = index
+            index = row * _SIZE_OF[len(self._cells)] + col
+        self._cells[index] = value
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactBoard):
+            return self._cells == other._cells
+        if isinstance(other, (list, BoardView)):
+            return self.to_rows() == list(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(bytes(self._cells))
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __str__(self):
+        return self.to_string()
+
+    def __repr__(self):
+        return f"CompactBoard({self.to_string()!r})"
+
+
+# bytes.translate table mapping cell values 0-25 to their characters
+_TO_TEXT = (b'.' + _CHARS.encode('ascii')).ljust(256, b'?')
+
+
+class RowView(Sequence):
+    """A row of a CompactBoard that behaves like a list of 9 ints"""
+
+    __slots__ = ('_cells', '_start', '_size')
+
+    def __init__(self, cells, row, size=_SIZE):
+        self._cells = cells
+        self._size = size
+        self._start = row * size
+
+    def _index(self, col):
+        if col < 0:
+            col += self._size
+        if not 0 <= col < self._size:
+            raise IndexError('row index out of range')
+        return self._start + col
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return list(self._cells[self._start:self._start + self._size])[col]
+        return self._cells[self._index(col)]
+
+    def __setitem__(self, col, value):
+        if isinstance(col, slice):
+            values = list(self)
+            values[col] = value
+            if len(values) != self._size:
+                raise ValueError('cannot change the length of a board row')
+            self._cells[self._start:self._start + self._size] = bytes(values)
+        else:
+            self._cells[self._index(col)] = value
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self._cells[self._start:self._start + self._size])
+
+    def __contains__(self, value):
+        return value in self._cells[self._start:self._start + self._size]
+
+    def __eq__(self, other):
+        if isinstance(other, (list, RowView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class BoardView(Sequence):
+    """List-of-lists view over a CompactBoard
+
+    ``view[row][col]`` reads and writes the underlying board, so code written
+    for the original 9x9 list layout keeps working without a copy.
+    """
+
+    __slots__ = ('_board', '_size')
+
+    def __init__(self, board):
+        self._board = board
+        self._size = board.size
+
+    @property
+    def board(self):
+        """(CompactBoard) The board this view reads from"""
+        return self._board
+
+    def __getitem__(self, row):
+        size = self._size
+        if isinstance(row, slice):
+            return [self[i] for i in range(size)[row]]
+        if row < 0:
+            row += size
+        if not 0 <= row < size:
+            raise IndexError('board index out of range')
+        return RowView(self._board.cells, row, size)
+
+    def __setitem__(self, row, values):
+        self[row][:] = values
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        cells = self._board.cells
+        size = self._size
+        return (RowView(cells, row, size) for row in range(size))
+
+    def __eq__(self, other):
+        if isinstance(other, BoardView):
+            return self._board == other._board
+        if isinstance(other, (list, CompactBoard)):
+            return self._board == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        return BoardView(self._board.copy())
+
+    def __repr__(self):
+        return repr(self._board.to_rows())
+
+
+def flatten(board):
+    """Get the 81 cell values of a CompactBoard, BoardView or 9x9 list"""
+    if isinstance(board, CompactBoard):
+        return board.cells
+    if isinstance(board, BoardView):
+        return board.board.cells
+    return [value for row in board for value in row]
+
+
+def write_cells(board, cells):
+    """Store 81 cell values into a CompactBoard, BoardView or 9x9 list"""
+    if isinstance(board, (CompactBoard, BoardView)):
+        flatten(board)[:] = bytes(cells)
+        return
+    size = len(board)
+    for i in range(size):
+        board[i][:] = cells[i * size:(i + 1) * size]
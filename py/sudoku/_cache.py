@@ -0,0 +1,204 @@
+"""Memoized solving.
+
+``SolutionCache`` sits in front of the solver engines and remembers every
+puzzle it solved. Keys are canonical forms by default, so a 9x9 puzzle hits
+the cache when any symmetric variant of it was solved before; the cached
+solution is stored in the canonical frame and mapped back through the
+inverse transform. Canonicalizing costs about as much as solving an easy
+puzzle, so ``canonical=False`` keys on the exact cells instead when variants
+are not expected. Boards of the other sizes always use exact keys.
+
+Entries are kept in memory with least-recently-used eviction. Given a path,
+every solution is also written to a ``dbm`` database that survives restarts
+and is consulted on a memory miss; it is not size-limited. Puzzles without a
+solution are cached too.
+
+Classes:
+    SolutionCache: LRU cache of solutions with an optional dbm backend
+
+"""
+
+import collections
+import threading
+
+from ._board import CompactBoard, flatten, write_cells
+from ._canonical import canonical_form
+from ._solve_engine import solve as _solve
+
+# Stored for puzzles without a solution
+_UNSOLVABLE = b''
+
+
+class SolutionCache(object):
+    """LRU cache of solved puzzles
+
+    Args:
+        maxsize: Entries kept in memory, None for no limit
+        canonical: Key on the canonical form so symmetric variants share an
+            entry; False keys on the exact cells
+        engine: Engine that solves cache misses
+        path: Optional dbm file persisting every solution across runs
+    """
+
+    def __init__(self, maxsize=1024, canonical=True, engine='bitmask', path=None):
+        super().__init__()
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('maxsize must be None or at least 0')
+        self._maxsize = maxsize
+        self._canonical = canonical
+        self._engine = engine
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            import dbm
+            self._db = dbm.open(path, 'c')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def maxsize(self):
+        """(int) Entries kept in memory, None for no limit"""
+        return self._maxsize
+
+    def solve(self, board, stats=None):
+        """
+        Solve a sudoku puzzle in place, reusing a cached solution if possible
+
+        Args:
+            board: 9x9 2D list or CompactBoard (0 for empty cells)
+            stats: Optional SolveStats, only updated when the engine runs
+
+        Returns:
+            bool: True if solved successfully, False otherwise
+        """
+        key, transform = self._key(board)
+        stored = self._lookup(key)
+        if stored is None:
+            solution = CompactBoard(flatten(board))
+            if not _solve(solution, self._engine, stats):
+                self._store(key, _UNSOLVABLE)
+                return False
+            self._store(key, bytes(self._to_key_frame(solution, transform).cells))
+        elif not stored:
+            return False
+        else:
+            solution = self._from_key_frame(stored, transform)
+        write_cells(board, solution.cells)
+        return True
+
+    def get(self, puzzle):
+        """
+        Look up a cached solution without solving
+
+        Args:
+            puzzle: CompactBoard, 81-char string or 9x9 list
+
+        Returns:
+            CompactBoard: The solution of puzzle, False if it is cached as
+                unsolvable, or None if it is not cached
+        """
+        key, transform = self._key(CompactBoard.coerce(puzzle))
+        stored = self._lookup(key)
+        if stored is None:
+            return None
+        if not stored:
+            return False
+        return self._from_key_frame(stored, transform)
+
+    def put(self, puzzle, solution):
+        """Cache a solution computed elsewhere; None marks the puzzle unsolvable"""
+        key, transform = self._key(CompactBoard.coerce(puzzle))
+        if solution is None:
+            self._store(key, _UNSOLVABLE)
+            return
+        solution = self._to_key_frame(CompactBoard.coerce(solution), transform)
+        self._store(key, bytes(solution.cells))
+
+    def info(self):
+        """Return the hit/miss counters and sizes as a dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self._maxsize,
+            }
+
+    def clear(self):
+        """Drop the in-memory entries and reset the counters; the dbm file is kept"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self):
+        """Close the dbm database, if the cache has one"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _key(self, board):
+        """Return (key, transform); transform is None for exact keys"""
+        cells = flatten(board)
+        if not self._canonical or len(cells) != 81:
+            return bytes(cells), None
+        canonical, transform = canonical_form(board)
+        return bytes(canonical.cells), transform
+
+    @staticmethod
+    def _to_key_frame(solution, transform):
+        """Map a solution of the board onto its key"""
+        return solution if transform is None else transform.apply(solution)
+
+    @staticmethod
+    def _from_key_frame(stored, transform):
+        """Map a stored solution back onto the board"""
+        solution = CompactBoard(stored)
+        return solution if transform is None else transform.invert().apply(solution)
+
+    def _lookup(self, key):
+        """Return the stored value for key, or None, updating the counters"""
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                stored = self._db.get(key)
+                if stored is not None:
+                    self._remember(key, stored)
+            if stored is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return stored
+
+    def _store(self, key, value):
+        """Add an entry to memory and the dbm database"""
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db[key] = value
+
+    def _remember(self, key, value):
+        """Insert into the LRU, evicting the oldest entries; caller holds the lock"""
+        if self._maxsize == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while self._maxsize is not None and len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
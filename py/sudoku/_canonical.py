@@ -0,0 +1,401 @@
+"""Canonical forms for deduplicating puzzles.
+
+Two puzzles that only differ by a renaming of the digits 1-9 are the same
+puzzle. Relabeling the digits in order of first appearance (row-major) maps
+every such variant to one representative, which makes a cheap dedup key.
+
+``canonical_form`` goes further and also folds the geometric symmetries that
+keep a grid valid: permuting the rows inside a band, the columns inside a
+stack, the bands, the stacks, and transposing. The canonical form is the
+smallest relabeled grid (row-major, empty cells first) over all of them.
+Rows, columns, bands and stacks are first ordered by invariants that these
+symmetries preserve (clue counts refined by their neighbours), and only
+orders consistent with the invariants are searched; ties are enumerated
+exhaustively and a branch-and-bound over rows prunes every prefix that is
+already larger than the best found. Puzzles usually leave few ties, so they
+canonicalize in about a millisecond; completely filled grids tie everywhere
+and take much longer.
+
+Classes:
+    Transform: A validity-preserving symmetry that can be applied and inverted
+
+Functions:
+    relabel_digits: Canonical form of a board under digit relabeling
+    canonical_form: Canonical form of a board under every symmetry
+    random_transform: Draw a random Transform
+
+"""
+
+import itertools
+
+from ._board import CompactBoard, flatten
+
+_BASE = 3
+_SIZE = 9
+_NCELLS = 81
+
+# _TRANSPOSE[i] is the cell that moves to i when the grid is transposed
+_TRANSPOSE = [(i % _SIZE) * _SIZE + i // _SIZE for i in range(_NCELLS)]
+_IDENTITY = tuple(range(_SIZE))
+
+
+def relabel_digits(board):
+    """
+    Rename digits so they first appear in the order 1, 2, 3, ...
+
+    Args:
+        board: CompactBoard, 81-char string or 9x9 list
+
+    Returns:
+        CompactBoard: The relabeled board; empty cells stay empty
+    """
+    if isinstance(board, str):
+        board = CompactBoard.from_string(board)
+    cells = flatten(board)
+    mapping = bytearray(10)
+    label = 0
+    for value in cells:
+        if value and not mapping[value]:
+            label += 1
+            mapping[value] = label
+            if label == 9:
+                break
+    return CompactBoard(bytes(cells).translate(bytes(mapping) + bytes(246)))
+
+
+class Transform(object):
+    """A symmetry of the sudoku grid
+
+    Applying it optionally transposes the board, then puts source row
+    ``row_perm[r]`` at row r and source column ``col_perm[c]`` at column c,
+    and finally renames every digit d to ``digit_map[d]``.
+
+    Args:
+        transposed: Transpose before permuting
+        row_perm: Source row of each row; rows may only move within their
+            band and bands as a whole
+        col_perm: Source column of each column, with the same rule for stacks
+        digit_map: 10 entries, the new name of every digit (entry 0 must be 0)
+
+    Raises:
+        ValueError: If a permutation breaks the band/stack structure
+    """
+
+    __slots__ = ('transposed', 'row_perm', 'col_perm', 'digit_map', '_source', '_table')
+
+    def __init__(self, transposed=False, row_perm=_IDENTITY, col_perm=_IDENTITY,
+                 digit_map=tuple(range(10))):
+        super().__init__()
+        for perm in (row_perm, col_perm):
+            _check_perm(perm)
+        if sorted(digit_map) != list(range(10)) or digit_map[0] != 0:
+            raise ValueError(f'Invalid digit map: {digit_map!r}')
+        self.transposed = bool(transposed)
+        self.row_perm = tuple(row_perm)
+        self.col_perm = tuple(col_perm)
+        self.digit_map = tuple(digit_map)
+        source = [row * _SIZE + col for row in row_perm for col in col_perm]
+        if transposed:
+            source = [_TRANSPOSE[cell] for cell in source]
+        self._source = source
+        self._table = bytes(digit_map) + bytes(246)
+
+    @classmethod
+    def identity(cls):
+        """The transform that changes nothing"""
+        return cls()
+
+    def apply(self, board):
+        """
+        Apply the transform to a board
+
+        Args:
+            board: CompactBoard, 81-char string or 9x9 list
+
+        Returns:
+            CompactBoard: The transformed board
+        """
+        if isinstance(board, str):
+            board = CompactBoard.from_string(board)
+        cells = flatten(board)
+        return CompactBoard(bytes([cells[i] for i in self._source]).translate(self._table))
+
+    def invert(self):
+        """Return the transform that undoes this one"""
+        row_inverse = _inverse(self.row_perm)
+        col_inverse = _inverse(self.col_perm)
+        digit_inverse = _inverse(self.digit_map)
+        if self.transposed:
+            # Undo the permutations, then transpose back; expressed as
+            # transpose-then-permute the roles of rows and columns swap
+            return Transform(True, col_inverse, row_inverse, digit_inverse)
+        return Transform(False, row_inverse, col_inverse, digit_inverse)
+
+    def __eq__(self, other):
+        if not isinstance(other, Transform):
+            return NotImplemented
+        return self._source == other._source and self.digit_map == other.digit_map
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((tuple(self._source), self.digit_map))
+
+    def __repr__(self):
+        return (f'Transform(transposed={self.transposed}, row_perm={self.row_perm}, '
+                f'col_perm={self.col_perm}, digit_map={self.digit_map})')
+
+
+def _check_perm(perm):
+    """Raise ValueError unless perm only moves lines within and between blocks"""
+    if sorted(perm) != list(_IDENTITY):
+        raise ValueError(f'Not a permutation of 0-8: {perm!r}')
+    for slot in range(_BASE):
+        if len({line // _BASE for line in perm[slot * _BASE:(slot + 1) * _BASE]}) != 1:
+            raise ValueError(f'Permutation splits a band or stack: {perm!r}')
+
+
+def _inverse(perm):
+    """Inverse of a permutation given as a sequence"""
+    inverse = [0] * len(perm)
+    for index, value in enumerate(perm):
+        inverse[value] = index
+    return tuple(inverse)
+
+
+def random_transform(rng):
+    """
+    Draw a transform uniformly from all validity-preserving symmetries
+
+    Args:
+        rng: random.Random instance to draw from
+
+    Returns:
+        Transform: Random transposition, band/row, stack/column and digit
+            permutations
+    """
+    perms = []
+    for _ in range(2):
+        blocks = list(range(_BASE))
+        rng.shuffle(blocks)
+        perm = []
+        for block in blocks:
+            lines = list(range(block * _BASE, (block + 1) * _BASE))
+            rng.shuffle(lines)
+            perm.extend(lines)
+        perms.append(perm)
+    digits = list(range(1, 10))
+    rng.shuffle(digits)
+    return Transform(rng.random() < 0.5, perms[0], perms[1], [0] + digits)
+
+
+def canonical_form(board):
+    """
+    Canonical representative of a board under every validity-preserving symmetry
+
+    Equivalent boards (same up to digit relabeling, row and column
+    permutations within bands and stacks, band and stack permutations and
+    transposition) get the same canonical form.
+
+    Args:
+        board: CompactBoard, 81-char string or 9x9 list
+
+    Returns:
+        tuple: (canonical, transform) where canonical is a CompactBoard and
+            ``transform.apply(board) == canonical``
+
+    Raises:
+        ValueError: If the board is not 9x9
+    """
+    if isinstance(board, str):
+        board = CompactBoard.from_string(board)
+    cells = flatten(board)
+    if len(cells) != _NCELLS:
+        raise ValueError('Canonical forms are only defined for 9x9 boards')
+    best = _Best()
+    for transposed in (False, True):
+        grid = [cells[i] for i in _TRANSPOSE] if transposed else list(cells)
+        row_keys, col_keys, band_keys, stack_keys = _refine(grid)
+        row_slots = _slots(band_keys, row_keys)
+        # Swapping identical columns leaves the grid unchanged, so column
+        # orders that read the same contents give the same result
+        columns = [tuple(grid[col::_SIZE]) for col in range(_SIZE)]
+        seen = set()
+        for col_perm in _orders(stack_keys, col_keys):
+            contents = tuple(columns[col] for col in col_perm)
+            if contents not in seen:
+                seen.add(contents)
+                _search_rows(grid, col_perm, row_slots, transposed, best)
+
+    transposed, row_perm, col_perm, labels = best.transform
+    # Digits the board does not use take the remaining labels in order
+    label = max(labels)
+    for digit in range(1, 10):
+        if not labels[digit]:
+            label += 1
+            labels[digit] = label
+    transform = Transform(transposed, row_perm, col_perm, labels)
+    return CompactBoard(bytes(value for row in best.rows for value in row)), transform
+
+
+class _Best(object):
+    """Smallest rows found so far and the transform that produced them"""
+
+    __slots__ = ('rows', 'transform')
+
+    def __init__(self):
+        self.rows = None
+        self.transform = None
+
+
+def _ranks(keys):
+    """Replace keys by their rank among the distinct keys"""
+    order = {key: rank for rank, key in enumerate(sorted(set(keys)))}
+    return [order[key] for key in keys]
+
+
+def _refine(grid, rounds=2):
+    """Symmetry-invariant keys for the rows, columns, bands and stacks
+
+    Starts from clue counts and repeatedly folds in the keys of the columns,
+    digits and boxes each row touches (and likewise for the others), a
+    colour refinement over the grid structure. Keys are ranks, so they only
+    depend on the board up to symmetry.
+    """
+    clues = [(cell // _SIZE, cell % _SIZE, value) for cell, value in enumerate(grid) if value]
+    row_key = [0] * _SIZE
+    col_key = [0] * _SIZE
+    box_key = [0] * _SIZE
+    digit_key = [0] * 10
+    for row, col, value in clues:
+        row_key[row] += 1
+        col_key[col] += 1
+        box_key[(row // _BASE) * _BASE + col // _BASE] += 1
+        digit_key[value] += 1
+
+    for _ in range(rounds):
+        rows = [[row_key[i]] for i in range(_SIZE)]
+        cols = [[col_key[i]] for i in range(_SIZE)]
+        boxes = [[box_key[i]] for i in range(_SIZE)]
+        digits = [[digit_key[i]] for i in range(10)]
+        for row, col, value in clues:
+            box = (row // _BASE) * _BASE + col // _BASE
+            rows[row].append((col_key[col], box_key[box], digit_key[value]))
+            cols[col].append((row_key[row], box_key[box], digit_key[value]))
+            boxes[box].append((row_key[row], col_key[col], digit_key[value]))
+            digits[value].append((row_key[row], col_key[col], box_key[box]))
+        row_key, col_key, box_key, digit_key = [
+            _ranks([(group[0], tuple(sorted(group[1:]))) for group in family])
+            for family in (rows, cols, boxes, digits)]
+
+    band_key = [(tuple(sorted(row_key[band * _BASE:(band + 1) * _BASE])),
+                 tuple(sorted(box_key[band * _BASE:(band + 1) * _BASE])))
+                for band in range(_BASE)]
+    stack_key = [(tuple(sorted(col_key[stack * _BASE:(stack + 1) * _BASE])),
+                  tuple(sorted(box_key[stack::_BASE])))
+                 for stack in range(_BASE)]
+    return row_key, col_key, _ranks(band_key), _ranks(stack_key)
+
+
+def _tie_orders(items, keys):
+    """Every order of items sorted by key, with tied items in every arrangement"""
+    items = sorted(items, key=keys.__getitem__)
+    groups = [list(group) for _, group in itertools.groupby(items, key=keys.__getitem__)]
+    return [[item for part in parts for item in part]
+            for parts in itertools.product(*(itertools.permutations(group)
+                                             for group in groups))]
+
+
+def _orders(block_keys, line_keys):
+    """Yield every line order consistent with the block and line keys"""
+    line_orders = [_tie_orders(range(block * _BASE, (block + 1) * _BASE), line_keys)
+                   for block in range(_BASE)]
+    for blocks in _tie_orders(range(_BASE), block_keys):
+        for parts in itertools.product(*(line_orders[block] for block in blocks)):
+            yield [line for part in parts for line in part]
+
+
+def _slots(band_keys, row_keys):
+    """For each output row, the source rows allowed there
+
+    Returns a list of 9 (bands, key) pairs: the bands whose key matches the
+    band slot of the row, and the row key required at that position.
+    """
+    band_order = sorted(range(_BASE), key=band_keys.__getitem__)
+    slots = []
+    for slot, band in enumerate(band_order):
+        bands = [other for other in range(_BASE) if band_keys[other] == band_keys[band]]
+        keys = sorted(row_keys[band * _BASE:(band + 1) * _BASE])
+        for key in keys:
+            slots.append((bands, key))
+    return [(bands, key, row_keys) for bands, key in slots]
+
+
+def _search_rows(grid, col_perm, row_slots, transposed, best):
+    """Branch and bound over row orders for one column order
+
+    Rows with identical contents (and bands holding the same rows) are
+    interchangeable, so only the first of them is tried at each position.
+    """
+    contents = [tuple(grid[row * _SIZE:(row + 1) * _SIZE]) for row in range(_SIZE)]
+    band_contents = [tuple(sorted(contents[band * _BASE:(band + 1) * _BASE]))
+                     for band in range(_BASE)]
+    prefix = []
+    chosen = []
+
+    def search(index, band, labels, next_label):
+        if index == _SIZE:
+            if best.rows is None or prefix < best.rows:
+                best.rows = list(prefix)
+                best.transform = (transposed, list(chosen), list(col_perm), list(labels))
+            return
+        bands, key, row_keys = row_slots[index]
+        if index % _BASE == 0:
+            candidates = [row for other in bands for row in range(other * _BASE,
+                                                                   (other + 1) * _BASE)
+                          if other * _BASE not in used_band_starts]
+        else:
+            candidates = range(band * _BASE, (band + 1) * _BASE)
+        tried = set()
+        for row in candidates:
+            if row in chosen or row_keys[row] != key:
+                continue
+            twin = (band_contents[row // _BASE], contents[row]) if index % _BASE == 0 \
+                else contents[row]
+            if twin in tried:
+                continue
+            tried.add(twin)
+            row_labels = list(labels)
+            label = next_label
+            values = []
+            base = row * _SIZE
+            for col in col_perm:
+                value = grid[base + col]
+                if value:
+                    if not row_labels[value]:
+                        label += 1
+                        row_labels[value] = label
+                    value = row_labels[value]
+                values.append(value)
+            values = tuple(values)
+            if best.rows is not None:
+                prefix.append(values)
+                worse = prefix > best.rows[:index + 1]
+                prefix.pop()
+                if worse:
+                    continue
+            prefix.append(values)
+            chosen.append(row)
+            start = index % _BASE == 0
+            if start:
+                used_band_starts.add((row // _BASE) * _BASE)
+            search(index + 1, row // _BASE, row_labels, label)
+            if start:
+                used_band_starts.discard((row // _BASE) * _BASE)
+            chosen.pop()
+            prefix.pop()
+
+    used_band_starts = set()
+    search(0, 0, [0] * 10, 0)
@@ -0,0 +1,446 @@
+"""Command line interface behind ``python -m sudoku``.
+
+Commands:
+    gui: Launch the PySide6 game (default when no command is given)
+    solve: Stream puzzles from a file or stdin and write their solutions
+    generate: Stream a pack of unique generated puzzles to a file or stdout
+    serve: Answer generate, solve, validate and hint requests over HTTP
+    loadtest: Load-test a running serve and report its latencies
+
+The solve command reads one 81-character puzzle per line ('.' or '0' for
+empty cells, anything after the first whitespace is ignored; 16, 256 or 625
+characters for 4x4, 16x16 or 25x25 puzzles, with letters for values over 9)
+and writes one solution per line in the same order, or ``unsolvable``.
+Puzzles flow through a generator pipeline, so memory stays bounded however
+large the input is. A throughput summary is printed to stderr at the end.
+With ``--stats`` every line also carries the search statistics of its puzzle
+as ``name=value`` fields, and the summary names the puzzle that needed the
+most guesses. ``--timeout`` and ``--max-nodes`` bound the search of each
+puzzle; a puzzle that runs out is written as ``gaveup``.
+
+The generate command writes one puzzle per line, optionally followed by a
+space and its solution, as soon as each puzzle is produced. ``--size``
+picks one of the other board sizes.
+
+Both commands write a binary ``PuzzleStore`` instead of text with
+``--store``, and solve reads a store given as its input directly, without
+parsing text.
+
+The serve command runs ``PuzzleServer`` (see ``_server``) until interrupted,
+with its own worker processes and puzzle pool, and prints the latency of
+every endpoint when it stops. loadtest drives one of its endpoints from many
+keep-alive connections and prints the throughput and latency percentiles seen
+by the client, plus the solve batch sizes reported by the server.
+
+"""
+
+import argparse
+import collections
+import contextlib
+import itertools
+import os
+import sys
+import time
+
+from ._batch import _iter_generate_timed, _iter_solve_timed
+from ._board import SIZES, CompactBoard
+from ._metrics import LatencyHistogram, SolveStats
+from ._pool import PuzzlePool
+from ._solve_engine import ENGINES
+from ._store import _MAGIC as _STORE_MAGIC, PuzzleStore
+
+UNSOLVABLE = 'unsolvable'
+GAVE_UP = 'gaveup'
+
+
+def main(argv=None):
+    """Run the command line interface and return the exit code"""
+    if argv is None:
+        argv = sys.argv[1:]
+    # Historical spellings for launching the GUI
+    if not argv or argv[0] in ('--gui', '-g'):
+        argv = ['gui'] + list(argv[1:])
+    args = _build_parser().parse_args(argv)
+    return args.command(args)
+
+
+def _build_parser():
+    """Create the argument parser with one sub-parser per command"""
+    parser = argparse.ArgumentParser(
+        prog='python -m sudoku',
+        description='Sudoku game, solver and puzzle tools')
+    commands = parser.add_subparsers(title='commands', metavar='COMMAND')
+
+    gui = commands.add_parser('gui', help='launch the GUI (default)')
+    gui.set_defaults(command=_run_gui)
+
+    solve = commands.add_parser(
+        'solve', help='solve puzzles from a file or stdin, one per line')
+    solve.add_argument('input', nargs='?', default='-',
+                       help="puzzle file or store, '-' for stdin (default)")
+    solve.add_argument('-o', '--output', default='-',
+                       help="solution file, '-' for stdout (default)")
+    solve.add_argument('-w', '--workers', type=int, default=1,
+                       help='worker processes, 0 for one per CPU (default: 1)')
+    solve.add_argument('--chunksize', type=int, default=256,
+                       help='puzzles per worker task (default: 256)')
+    solve.add_argument('--engine', choices=ENGINES, default='bitmask',
+                       help='solving engine (default: bitmask)')
+    solve.add_argument('--stats', action='store_true',
+                       help='append search statistics to every solution line')
+    solve.add_argument('--timeout', type=float, default=None,
+                       help='seconds to search each puzzle for')
+    solve.add_argument('--max-nodes', type=int, default=None, metavar='N',
+                       help='most guesses to make per puzzle')
+    solve.add_argument('--store', action='store_true',
+                       help='write puzzles and solutions to a binary store')
+    solve.add_argument('-q', '--quiet', action='store_true',
+                       help='do not print the throughput summary')
+    solve.set_defaults(command=_run_solve)
+
+    generate = commands.add_parser(
+        'generate', help='generate a pack of unique puzzles, one per line')
+    generate.add_argument('-n', '--count', type=int, default=100,
+                          help='number of puzzles (default: 100)')
+    generate.add_argument('-d', '--difficulty', default='medium',
+                          choices=('easy', 'medium', 'hard'),
+                          help='puzzle difficulty (default: medium)')
+    generate.add_argument('-o', '--output', default='-',
+                          help="output file, '-' for stdout (default)")
+    generate.add_argument('-w', '--workers', type=int, default=1,
+                          help='worker processes, 0 for one per CPU (default: 1)')
+    generate.add_argument('--seed', type=int, default=None,
+                          help='base seed for a reproducible pack')
+    generate.add_argument('--chunksize', type=int, default=16,
+                          help='puzzles per worker task (default: 16)')
+    generate.add_argument('--reuse', type=int, default=0, metavar='N',
+                          help='derive puzzles from a seed bank, reusing each '
+                               'minimal puzzle N times: faster, less varied '
+                               '(default: 0, carve every puzzle)')
+    generate.add_argument('--size', type=int, default=9, choices=SIZES,
+                          help='side length of the board (default: 9)')
+    generate.add_argument('--store', action='store_true',
+                          help='write puzzles and solutions to a binary store')
+    generate.add_argument('--solutions', action='store_true',
+                          help='append the solution to every line')
+    generate.add_argument('-q', '--quiet', action='store_true',
+                          help='do not print the throughput summary')
+    generate.set_defaults(command=_run_generate)
+
+    serve = commands.add_parser(
+        'serve', help='serve generate, solve, validate and hint over HTTP')
+    serve.add_argument('--host', default='127.0.0.1',
+                       help='interface to listen on (default: 127.0.0.1)')
+    serve.add_argument('-p', '--port', type=int, default=8080,
+                       help='port to listen on (default: 8080)')
+    serve.add_argument('-w', '--workers', type=int, default=0,
+                       help='worker processes, 0 for one per CPU (default: 0)')
+    serve.add_argument('--batch-size', type=int, default=64,
+                       help='most puzzles solved per worker task (default: 64)')
+    serve.add_argument('--batch-delay', type=float, default=2.0, metavar='MS',
+                       help='milliseconds a solve waits to batch with others '
+                            '(default: 2)')
+    serve.add_argument('--timeout', type=float, default=10.0,
+                       help='seconds a request may take, and a batch of puzzles '
+                            'may be searched for (default: 10)')
+    serve.add_argument('--max-nodes', type=int, default=None, metavar='N',
+                       help='most guesses to make per puzzle')
+    serve.add_argument('--pool-size', type=int, default=64,
+                       help='ready puzzles kept per difficulty (default: 64)')
+    serve.add_argument('--pool-file', default=None,
+                       help='file the puzzle pool is loaded from and saved to')
+    serve.add_argument('-q', '--quiet', action='store_true',
+                       help='do not print the address and final latencies')
+    serve.set_defaults(command=_run_serve)
+
+    loadtest = commands.add_parser(
+        'loadtest', help='load-test a running serve')
+    loadtest.add_argument('url', nargs='?', default='http://127.0.0.1:8080',
+                          help='address of the service (default: http://127.0.0.1:8080)')
+    loadtest.add_argument('-e', '--endpoint', default='solve',
+                          choices=('solve', 'generate', 'validate', 'hint'),
+                          help='endpoint to load (default: solve)')
+    loadtest.add_argument('-n', '--requests', type=int, default=1000,
+                          help='number of requests (default: 1000)')
+    loadtest.add_argument('-c', '--concurrency', type=int, default=16,
+                          help='connections sending at once (default: 16)')
+    loadtest.add_argument('-i', '--input', default=None,
+                          help='puzzle file or store to send, instead of '
+                               'puzzles fetched from the service')
+    loadtest.add_argument('-d', '--difficulty', default='medium',
+                          choices=('easy', 'medium', 'hard'),
+                          help='difficulty of fetched puzzles (default: medium)')
+    loadtest.set_defaults(command=_run_loadtest)
+    return parser
+
+
+def _run_gui(args):
+    """Launch the PySide6 game"""
+    from . import _gui
+    _gui.run()
+    return 0
+
+
+def _run_solve(args):
+    """Stream puzzles through the batch solver"""
+    workers = args.workers or None
+    histogram = LatencyHistogram()
+    totals = SolveStats()
+    hardest = None  # (nodes, position) of the puzzle with the most guesses
+    unsolvable = 0
+    gave_up = 0
+    pending = None  # puzzles read from text, awaiting their solution
+    started = time.perf_counter()
+    with _open_puzzles(args.input) as (puzzles, store):
+        size = 9 if store is None else store.size
+        if args.store and store is None:
+            first = next(puzzles, None)
+            if first is not None:
+                size = first.size
+                pending = collections.deque()
+                puzzles = _remember(itertools.chain((first,), puzzles), pending)
+        with _open_output(args, size) as output:
+            results = _iter_solve_timed(puzzles, workers, args.chunksize, args.engine,
+                                        True, args.stats, args.timeout, args.max_nodes)
+            for index, solution, seconds, stats in results:
+                histogram.add(seconds)
+                if solution is None:
+                    unsolvable += 1
+                elif not solution:
+                    gave_up += 1
+                if stats is not None:
+                    totals.merge(stats)
+                    if hardest is None or stats.nodes > hardest[0]:
+                        hardest = (stats.nodes, index + 1)
+                if args.store:
+                    if store is not None:
+                        record = store[index]
+                        _append(output, record.puzzle, solution or None,
+                                record.difficulty)
+                    else:
+                        _append(output, pending.popleft(), solution or None)
+                    continue
+                if solution:
+                    line = solution.to_string()
+                else:
+                    line = UNSOLVABLE if solution is None else GAVE_UP
+                if stats is not None:
+                    line += ' ' + format_stats(stats)
+                output.write(line + '\n')
+    elapsed = time.perf_counter() - started
+
+    if not args.quiet:
+        _print_summary('Solved', histogram, elapsed)
+        if unsolvable:
+            print(f'{unsolvable} puzzle(s) had no solution', file=sys.stderr)
+        if gave_up:
+            print(f'{gave_up} puzzle(s) ran out of search budget', file=sys.stderr)
+        if hardest is not None:
+            print(f'Search: {totals.nodes} guesses, {totals.backtracks} dead ends, '
+                  f'{totals.propagations} forced placements; most guesses '
+                  f'{hardest[0]} (puzzle {hardest[1]})', file=sys.stderr)
+    return 0
+
+
+def format_stats(stats):
+    """Format SolveStats as space-separated name=value fields"""
+    return (f'nodes={stats.nodes} backtracks={stats.backtracks} '
+            f'depth={stats.max_depth} propagations={stats.propagations} '
+            f'ms={stats.elapsed * 1000:.3f}')
+
+
+def _run_generate(args):
+    """Stream generated puzzles to the output as they are produced"""
+    if args.reuse > 0 and args.size != 9:
+        raise SystemExit('sudoku: error: --reuse only supports 9x9 puzzles')
+    histogram = LatencyHistogram()
+    stats = {}
+    started = time.perf_counter()
+    with _open_output(args, args.size) as output:
+        results = _iter_generate_timed(args.count, args.difficulty,
+                                       args.workers or None, args.seed,
+                                       args.chunksize, stats, args.reuse,
+                                       args.size)
+        try:
+            for puzzle, solution, seconds in results:
+                histogram.add(seconds)
+                if args.store:
+                    output.append(puzzle, solution, args.difficulty)
+                elif args.solutions:
+                    output.write(f'{puzzle} {solution}\n')
+                else:
+                    output.write(f'{puzzle}\n')
+        except RuntimeError as error:
+            raise SystemExit(f'sudoku: error: {error}')
+    elapsed = time.perf_counter() - started
+
+    if not args.quiet:
+        _print_summary('Generated', histogram, elapsed)
+        if stats.get('duplicates'):
+            print(f"{stats['duplicates']} duplicate puzzle(s) skipped",
+                  file=sys.stderr)
+    return 0
+
+
+def _run_serve(args):
+    """Serve HTTP requests until interrupted"""
+    import asyncio
+    from ._async import AsyncExecutor
+    from ._server import PuzzleServer
+    workers = args.workers or os.cpu_count() or 1
+    executor = AsyncExecutor(workers)
+    # Refilled on worker processes (workers > 1), off the event loop's GIL
+    pool = PuzzlePool(max(1, args.pool_size // 4), max(1, args.pool_size),
+                      path=args.pool_file, workers=max(2, workers))
+    server = PuzzleServer(args.host, args.port, executor, pool, args.batch_size,
+                          args.batch_delay / 1000.0, args.timeout, args.max_nodes)
+    try:
+        asyncio.run(_serve(server, args.quiet))
+    except KeyboardInterrupt:
+        pass
+    except OSError as error:
+        raise SystemExit(f'sudoku: error: {error}')
+    finally:
+        pool.close()
+        executor.shutdown()
+    if not args.quiet:
+        for path, summary in server.stats()['latency'].items():
+            print(f"{path}: {summary['count']} request(s), latency "
+                  f"p50 {summary['p50'] * 1000:.3f}ms p99 {summary['p99'] * 1000:.3f}ms",
+                  file=sys.stderr)
+    return 0
+
+
+async def _serve(server, quiet):
+    """Start the server, announce its address and serve until cancelled"""
+    await server.start()
+    if not quiet:
+        host, port = server.address
+        print(f'Serving on http://{host}:{port} (Ctrl+C to stop)', file=sys.stderr)
+    await server.serve_forever()
+
+
+def _run_loadtest(args):
+    """Load-test a running service and print the results"""
+    import asyncio
+    from ._loadtest import load_test
+    puzzles = None
+    if args.input:
+        with _open_puzzles(args.input) as (source, _):
+            puzzles = [puzzle.to_string() for puzzle in source]
+        if not puzzles:
+            raise SystemExit('sudoku: error: no puzzles in the input')
+    try:
+        report = asyncio.run(load_test(args.url, args.endpoint, args.requests,
+                                       args.concurrency, puzzles, args.difficulty))
+    except (OSError, RuntimeError) as error:
+        raise SystemExit(f'sudoku: error: {error}')
+    histogram = report['latency']
+    failed = sum(count for status, count in report['statuses'].items() if status != 200)
+    print(f"Sent {report['requests']} {args.endpoint} request(s) in {report['elapsed']:.3f}s "
+          f"({report['rate']:,.1f} requests/s) over {args.concurrency} connection(s)")
+    print(f'Latency p50 {histogram.percentile(50) * 1000:.3f}ms '
+          f'p90 {histogram.percentile(90) * 1000:.3f}ms '
+          f'p99 {histogram.percentile(99) * 1000:.3f}ms '
+          f'max {(histogram.max or 0.0) * 1000:.3f}ms')
+    statuses = ', '.join(f'{status}: {count}'
+                         for status, count in sorted(report['statuses'].items()))
+    print(f'Statuses: {statuses}')
+    batches = report['server']['batches']
+    if batches['count']:
+        print(f"Server solve batches: {batches['count']}, "
+              f"mean {batches['mean']:.1f} puzzle(s), max {batches['max']}")
+    return 1 if failed else 0
+
+
+def read_puzzles(lines):
+    """Parse puzzles from lines of text, skipping blanks and '#' comments
+
+    Raises:
+        SystemExit: On a malformed line, naming its line number
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield CompactBoard.from_string(line.split(None, 1)[0])
+        except ValueError as error:
+            raise SystemExit(f'sudoku: error: line {number}: {error}')
+
+
+def _print_summary(verb, histogram, elapsed):
+    """Print throughput and latency percentiles to stderr"""
+    count = histogram.count
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f'{verb} {count} puzzle(s) in {elapsed:.3f}s ({rate:,.1f} puzzles/s), '
+          f'latency p50 {histogram.percentile(50) * 1000:.3f}ms '
+          f'p99 {histogram.percentile(99) * 1000:.3f}ms',
+          file=sys.stderr)
+
+
+def _remember(puzzles, pending):
+    """Pass puzzles through, appending each one to the pending deque"""
+    for puzzle in puzzles:
+        pending.append(puzzle)
+        yield puzzle
+
+
+def _append(store, puzzle, solution, difficulty=None):
+    """Write a record, exiting with a message if it does not fit the store"""
+    try:
+        store.append(puzzle, solution, difficulty)
+    except ValueError as error:
+        raise SystemExit(f'sudoku: error: {error}')
+
+
+def _is_store(path):
+    """Check if a file starts with the PuzzleStore magic"""
+    try:
+        with open(path, 'rb') as handle:
+            return handle.read(len(_STORE_MAGIC)) == _STORE_MAGIC
+    except OSError as error:
+        raise _cannot_open(path, error)
+
+
+@contextlib.contextmanager
+def _open_puzzles(path):
+    """Yield (puzzles, store) for an input path; store is None for text"""
+    if path != '-' and _is_store(path):
+        with PuzzleStore(path) as store:
+            yield store.puzzles(), store
+        return
+    with _open(path, 'r', sys.stdin) as source:
+        yield read_puzzles(source), None
+
+
+@contextlib.contextmanager
+def _open_output(args, size):
+    """Open the output as a PuzzleStore with --store, else as a text file"""
+    if not args.store:
+        with _open(args.output, 'w', sys.stdout) as output:
+            yield output
+        return
+    if args.output == '-':
+        raise SystemExit('sudoku: error: --store needs an output file (-o)')
+    with PuzzleStore(args.output, 'w', size) as output:
+        yield output
+
+
+@contextlib.contextmanager
+def _open(path, mode, stream):
+    """Open a path, or use the given standard stream for '-'"""
+    if path == '-':
+        yield stream
+        return
+    try:
+        handle = open(path, mode)
+    except OSError as error:
+        raise _cannot_open(path, error)
+    with handle:
+        yield handle
+
+
+def _cannot_open(path, error):
+    """The argparse-style exit for a file that cannot be opened"""
+    return SystemExit(f"sudoku: error: can't open '{path}': {error.strerror or error}")
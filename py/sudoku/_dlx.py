@@ -0,0 +1,285 @@
+"""Dancing Links (Algorithm X) exact-cover engine.
+
+Sudoku is expressed as an exact-cover problem with 324 constraint columns:
+
+- every cell holds exactly one digit (81 columns)
+- every row, column and 3x3 box holds every digit exactly once (3 x 81 columns)
+
+Each of the 729 candidate placements (cell, digit) is a matrix row covering
+four columns. Knuth's Dancing Links keeps the sparse matrix as circular doubly
+linked lists, so covering and uncovering a column is cheap and the search
+always branches on the column with the fewest remaining rows. The node links
+are stored in flat int lists rather than objects, which keeps both the setup
+and the inner loop fast on CPython.
+
+Other board sizes use the same formulation with their own matrix, e.g.
+4096 placements over 1024 columns for 16x16.
+
+Functions:
+    solve: Solve a puzzle in place
+    count_solutions: Count solutions up to a limit
+    iter_solutions: Lazily yield every solution
+
+"""
+
+from ._board import flatten, write_cells
+
+# Box side length for every supported number of cells
+_BASE_OF = {16: 2, 81: 3, 256: 4, 625: 5}
+
+# Matrix templates per number of cells, built on first use
+_templates = {}
+
+
+def _columns_for(cell, digit, base=3):
+    """Return the four constraint columns covered by placing digit in cell"""
+    size = base * base
+    ncells = size * size
+    row, col = divmod(cell, size)
+    box = (row // base) * base + col // base
+    d = digit - 1
+    # Column 0 is the root header, so constraint columns start at 1
+    return (1 + cell,
+            1 + ncells + row * size + d,
+            1 + 2 * ncells + col * size + d,
+            1 + 3 * ncells + box * size + d)
+
+
+def _build_template(base=3):
+    """Build the full 729x324 matrix once; solvers copy its link lists"""
+    size = base * base
+    ncells = size * size
+    count = 1 + 4 * ncells
+    left = [i - 1 for i in range(count)]
+    right = [i + 1 for i in range(count)]
+    left[0] = count - 1
+    right[count - 1] = 0
+    up = list(range(count))
+    down = list(range(count))
+    column = list(range(count))
+    sizes = [0] * count
+    row_of = [-1] * count
+
+    for cell in range(ncells):
+        for digit in range(1, size + 1):
+            option = cell * size + digit - 1
+            start = len(left)
+            for i, col in enumerate(_columns_for(cell, digit, base)):
+                node = start + i
+                left.append(start + (i - 1) % 4)
+                right.append(start + (i + 1) % 4)
+                # Append at the bottom of the column
+                up.append(up[col])
+                down.append(col)
+                down[up[col]] = node
+                up[col] = node
+                column.append(col)
+                row_of.append(option)
+                sizes[col] += 1
+
+    return left, right, up, down, column, sizes, row_of
+
+
+class _DancingLinks(object):
+    """Exact-cover search state for one puzzle"""
+
+    __slots__ = ('left', 'right', 'up', 'down', 'column', 'sizes',
+                 'row_of', 'cells', 'size', 'valid', 'stats')
+
+    def __init__(self, cells, stats=None):
+        base = _BASE_OF.get(len(cells))
+        if base is None:
+            raise ValueError(f'Unsupported board with {len(cells)} cells')
+        template = _templates.get(base)
+        if template is None:
+            template = _templates[base] = _build_template(base)
+        left, right, up, down, column, sizes, row_of = template
+        self.left = list(left)
+        self.right = list(right)
+        self.up = list(up)
+        self.down = list(down)
+        self.column = column
+        self.sizes = list(sizes)
+        self.row_of = row_of
+        self.cells = list(cells)
+        self.size = base * base
+        self.valid = True
+        self.stats = stats
+
+        covered = [False] * len(sizes)
+        for cell, digit in enumerate(self.cells):
+            if not digit:
+                continue
+            if digit > self.size:
+                self.valid = False
+                return
+            cols = _columns_for(cell, digit, base)
+            if any(covered[col] for col in cols):
+                self.valid = False
+                return
+            for col in cols:
+                covered[col] = True
+                self._cover(col)
+
+    def _cover(self, col):
+        """Remove a column and every row that intersects it"""
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, sizes = self.column, self.sizes
+        right[left[col]] = right[col]
+        left[right[col]] = left[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, col):
+        """Exact inverse of ``_cover``"""
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, sizes = self.column, self.sizes
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[col]] = col
+        left[right[col]] = col
+
+    def solutions(self, depth=0):
+        """Yield ``cells`` each time an exact cover is found
+
+        The links are restored when the generator is exhausted or closed, so
+        callers must copy a solution before resuming or closing it. Columns
+        with a single row are forced moves; only real choices are counted as
+        search nodes in ``stats``.
+        """
+        right, down, sizes = self.right, self.down, self.sizes
+        stats = self.stats
+        col = right[0]
+        if col == 0:
+            if stats is not None:
+                stats.solutions += 1
+            yield self.cells
+            return
+
+        # Branch on the column with the fewest rows
+        best, best_size = col, sizes[col]
+        while col and best_size > 1:
+            if sizes[col] < best_size:
+                best, best_size = col, sizes[col]
+            col = right[col]
+        if best_size == 0:
+            if stats is not None:
+                stats.backtracks += 1
+            return
+
+        cells, column, row_of, size = self.cells, self.column, self.row_of, self.size
+        forced = best_size == 1
+        if not forced:
+            depth += 1
+        self._cover(best)
+        try:
+            node = down[best]
+            while node != best:
+                cell, digit = divmod(row_of[node], size)
+                cells[cell] = digit + 1
+                if stats is not None:
+                    if forced:
+                        stats.propagations += 1
+                    else:
+                        stats.node(depth, cell, digit + 1)
+                j = right[node]
+                while j != node:
+                    self._cover(column[j])
+                    j = right[j]
+                try:
+                    yield from self.solutions(depth)
+                finally:
+                    j = self.left[node]
+                    while j != node:
+                        self._uncover(column[j])
+                        j = self.left[j]
+                    cells[cell] = 0
+                node = down[node]
+        finally:
+            self._uncover(best)
+
+
+def _rows(cells, size):
+    """Split 81 cells into a new 9x9 list"""
+    return [list(cells[i * size:(i + 1) * size]) for i in range(size)]
+
+
+def iter_solutions(board, stats=None):
+    """
+    Lazily yield every solution of a puzzle
+
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        stats: Optional SolveStats to update
+
+    Yields:
+        list: A new 9x9 2D list for each solution
+    """
+    links = _DancingLinks(flatten(board), stats)
+    if not links.valid:
+        return
+    for cells in links.solutions():
+        yield _rows(cells, links.size)
+
+
+def count_solutions(board, limit=2, stats=None):
+    """
+    Count the solutions of a puzzle, stopping once ``limit`` is reached
+
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        limit: Maximum number of solutions to look for
+        stats: Optional SolveStats to update
+
+    Returns:
+        int: Number of solutions found (never more than limit)
+    """
+    links = _DancingLinks(flatten(board), stats)
+    if not links.valid or limit <= 0:
+        return 0
+    count = 0
+    search = links.solutions()
+    for _ in search:
+        count += 1
+        if count >= limit:
+            search.close()
+            break
+    return count
+
+
+def solve(board, stats=None):
+    """
+    Solve a puzzle in place
+
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        stats: Optional SolveStats to update
+
+    Returns:
+        bool: True if solved successfully, False otherwise
+    """
+    links = _DancingLinks(flatten(board), stats)
+    if not links.valid:
+        return False
+    search = links.solutions()
+    try:
+        for cells in search:
+            write_cells(board, cells)
+            return True
+        return False
+    finally:
+        search.close()
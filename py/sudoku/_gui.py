@@ -1,8 +1,87 @@
-"""Sudoku GUI using PySide6"""
+"""Sudoku GUI using PySide6
+
+New games are prepared on a QThreadPool worker so the event loop never blocks:
+the worker takes a puzzle from the shared pool or generates one, reports
+progress, can be cancelled, and posts the finished SudokuBoard back with a
+signal. Besides 9x9, games can be 4x4, 16x16 or 25x25; the grid is rebuilt
+when the size changes and values over 9 are entered as letters.
+"""
+import functools
 import sys
+import threading
 from PySide6 import QtCore, QtGui, QtWidgets
 
-from ._sudoku import SudokuBoard
+from ._board import _CHARS
+from ._pool import get_default_pool
+from ._sudoku import SudokuBoard, _generate_puzzle
+
+
+class _Cancelled(Exception):
+    """Raised from the progress callback to abandon a cancelled generation"""
+
+
+class _TaskSignals(QtCore.QObject):
+    """Signals a background task posts back to the GUI thread"""
+    
+    progress = QtCore.Signal(int)  # percent done
+    finished = QtCore.Signal(object)  # SudokuBoard
+    failed = QtCore.Signal(str)
+    cancelled = QtCore.Signal()
+
+
+class NewGameTask(QtCore.QRunnable):
+    """Prepare a SudokuBoard on a worker thread"""
+    
+    def __init__(self, difficulty, size=9):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.difficulty = difficulty
+        self.size = size
+        self.signals = _TaskSignals()
+        self._cancel_event = threading.Event()
+        self._percent = -1
+    
+    def cancel(self):
+        """Ask the task to stop; it reports ``cancelled`` when it does"""
+        self._cancel_event.set()
+    
+    def run(self):
+        """Take a ready puzzle from the pool, or generate one with progress"""
+        try:
+            item = None
+            if self.size == 9:
+                item = get_default_pool().try_get(self.difficulty)
+            if item is None:
+                item = _generate_puzzle(self.difficulty, progress=self._on_progress,
+                                        size=self.size)
+            board = SudokuBoard.from_puzzle(*item, difficulty=self.difficulty)
+        except _Cancelled:
+            self._emit(self.signals.cancelled)
+            return
+        except Exception as error:
+            self._emit(self.signals.failed, str(error))
+            return
+        
+        if self._cancel_event.is_set():
+            self._emit(self.signals.cancelled)
+        else:
+            self._emit(self.signals.finished, board)
+    
+    def _emit(self, signal, *args):
+        """Emit a signal, unless the application tore it down meanwhile"""
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            pass
+    
+    def _on_progress(self, removed, total):
+        """Generation callback: abort when cancelled, emit whole percents"""
+        if self._cancel_event.is_set():
+            raise _Cancelled()
+        percent = removed * 100 // total if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self._emit(self.signals.progress, percent)
 
 
 class SudokuCell(QtWidgets.QLineEdit):
@@ -10,20 +89,21 @@ class SudokuCell(QtWidgets.QLineEdit):
     
     cell_changed = QtCore.Signal(int, int, int)  # row, col, value
     
-    def __init__(self, row, col, is_initial=False):
+    def __init__(self, row, col, is_initial=False, size=9):
         super().__init__()
         self.row = row
         self.col = col
         self.is_initial = is_initial
+        self.size = size
         
-        # Styling
+        # Styling, scaled so every board size fits the window
         self.setMaxLength(1)
         self.setAlignment(QtCore.Qt.AlignCenter)
         font = QtGui.QFont()
-        font.setPointSize(16)
+        font.setPointSize(min(24, max(8, 144 // size)))
         font.setBold(True)
         self.setFont(font)
-        self.setFixedSize(50, 50)
+        self.setFixedSize(450 // size, 450 // size)
         
         if is_initial:
             self.setReadOnly(True)
@@ -49,13 +129,10 @@ class SudokuCell(QtWidgets.QLineEdit):
         self.textChanged.connect(self._on_text_changed)
     
     def _on_text_changed(self, text):
-        """Handle text input"""
-        if text and text.isdigit():
-            value = int(text)
-            if 1 <= value <= 9:
-                self.cell_changed.emit(self.row, self.col, value)
-            else:
-                self.setText('')
+        """Handle text input: digits, and letters for values over 9"""
+        value = _CHARS.find(text.upper()) + 1 if text else 0
+        if 1 <= value <= self.size:
+            self.cell_changed.emit(self.row, self.col, value)
         elif text == '':
             self.cell_changed.emit(self.row, self.col, 0)
         else:
@@ -64,7 +141,7 @@ class SudokuCell(QtWidgets.QLineEdit):
     def set_value(self, value):
         """Set cell value without triggering signal"""
         self.blockSignals(True)
-        self.setText(str(value) if value != 0 else '')
+        self.setText(_CHARS[value - 1] if value != 0 else '')
         self.blockSignals(False)
     
     def set_initial(self, is_initial):
@@ -98,7 +175,9 @@ class SudokuGUI(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
         self.board = None
-        self.cells = [[None for _ in range(9)] for _ in range(9)]
+        self.cells = []
+        self._task = None  # Task preparing the next game
+        self._tasks = set()  # Running tasks, kept alive until they report back
         self.init_ui()
         self.new_game('medium')
     
@@ -125,21 +204,9 @@ class SudokuGUI(QtWidgets.QMainWindow):
         grid_frame = QtWidgets.QFrame()
         grid_frame.setFrameStyle(QtWidgets.QFrame.Box | QtWidgets.QFrame.Plain)
         grid_frame.setLineWidth(3)
-        grid_layout = QtWidgets.QGridLayout(grid_frame)
-        grid_layout.setSpacing(0)
-        
-        for i in range(9):
-            for j in range(9):
-                cell = SudokuCell(i, j)
-                cell.cell_changed.connect(self.on_cell_changed)
-                self.cells[i][j] = cell
-                grid_layout.addWidget(cell, i, j)
-                
-                # Add thicker borders for 3x3 boxes
-                if j % 3 == 2 and j < 8:
-                    cell.setStyleSheet(cell.styleSheet() + "border-right: 3px solid #333;")
-                if i % 3 == 2 and i < 8:
-                    cell.setStyleSheet(cell.styleSheet() + "border-bottom: 3px solid #333;")
+        self.grid_layout = QtWidgets.QGridLayout(grid_frame)
+        self.grid_layout.setSpacing(0)
+        self.build_grid(9)
         
         main_layout.addWidget(grid_frame, alignment=QtCore.Qt.AlignCenter)
         
@@ -153,6 +220,13 @@ class SudokuGUI(QtWidgets.QMainWindow):
         controls_layout.addWidget(QtWidgets.QLabel('Difficulty:'))
         controls_layout.addWidget(self.difficulty_combo)
         
+        # Board size selector
+        self.size_combo = QtWidgets.QComboBox()
+        for size in (4, 9, 16, 25):
+            self.size_combo.addItem(f'{size}x{size}', size)
+        self.size_combo.setCurrentText('9x9')
+        controls_layout.addWidget(self.size_combo)
+        
         controls_layout.addStretch()
         
         # New Game button
@@ -165,6 +239,16 @@ class SudokuGUI(QtWidgets.QMainWindow):
         hint_btn.clicked.connect(self.on_hint)
         controls_layout.addWidget(hint_btn)
         
+        # Undo and Redo buttons
+        undo_btn = QtWidgets.QPushButton('Undo')
+        undo_btn.setShortcut(QtGui.QKeySequence.Undo)
+        undo_btn.clicked.connect(self.on_undo)
+        controls_layout.addWidget(undo_btn)
+        redo_btn = QtWidgets.QPushButton('Redo')
+        redo_btn.setShortcut(QtGui.QKeySequence.Redo)
+        redo_btn.clicked.connect(self.on_redo)
+        controls_layout.addWidget(redo_btn)
+        
         # Check button
         check_btn = QtWidgets.QPushButton('Check')
         check_btn.clicked.connect(self.on_check)
@@ -180,6 +264,9 @@ class SudokuGUI(QtWidgets.QMainWindow):
         reset_btn.clicked.connect(self.on_reset)
         controls_layout.addWidget(reset_btn)
         
+        # Buttons that act on the current board are disabled while loading
+        self.game_buttons = [hint_btn, undo_btn, redo_btn, check_btn, solve_btn, reset_btn]
+        
         main_layout.addLayout(controls_layout)
         
         # Status label
@@ -189,17 +276,119 @@ class SudokuGUI(QtWidgets.QMainWindow):
         status_font.setPointSize(10)
         self.status_label.setFont(status_font)
         main_layout.addWidget(self.status_label)
+        
+        # Busy indicator shown while a new game is prepared
+        busy_layout = QtWidgets.QHBoxLayout()
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setVisible(False)
+        busy_layout.addWidget(self.progress_bar)
+        self.cancel_btn = QtWidgets.QPushButton('Cancel')
+        self.cancel_btn.clicked.connect(self.on_cancel)
+        self.cancel_btn.setVisible(False)
+        busy_layout.addWidget(self.cancel_btn)
+        main_layout.addLayout(busy_layout)
     
-    def new_game(self, difficulty='medium'):
-        """Start a new game"""
-        self.board = SudokuBoard(difficulty.lower())
+    def build_grid(self, size):
+        """Replace the grid with size x size empty cells"""
+        for row in self.cells:
+            for cell in row:
+                self.grid_layout.removeWidget(cell)
+                cell.deleteLater()
+        base = int(size ** 0.5)
+        self.cells = [[None for _ in range(size)] for _ in range(size)]
+        
+        for i in range(size):
+            for j in range(size):
+                cell = SudokuCell(i, j, size=size)
+                cell.cell_changed.connect(self.on_cell_changed)
+                self.cells[i][j] = cell
+                self.grid_layout.addWidget(cell, i, j)
+                
+                # Add thicker borders for boxes
+                if j % base == base - 1 and j < size - 1:
+                    cell.setStyleSheet(cell.styleSheet() + "border-right: 3px solid #333;")
+                if i % base == base - 1 and i < size - 1:
+                    cell.setStyleSheet(cell.styleSheet() + "border-bottom: 3px solid #333;")
+    
+    def new_game(self, difficulty='medium', size=9):
+        """Start a new game; the board is prepared on a worker thread"""
+        self.cancel_new_game()
+        task = NewGameTask(difficulty.lower(), size)
+        task.signals.progress.connect(functools.partial(self.on_generation_progress, task))
+        task.signals.finished.connect(functools.partial(self.on_game_ready, task))
+        task.signals.failed.connect(functools.partial(self.on_generation_failed, task))
+        task.signals.cancelled.connect(functools.partial(self.on_generation_cancelled, task))
+        self._task = task
+        self._tasks.add(task)
+        self.set_busy(True)
+        self.status_label.setText(f'Preparing {difficulty.capitalize()} puzzle...')
+        QtCore.QThreadPool.globalInstance().start(task)
+    
+    def cancel_new_game(self):
+        """Cancel the game being prepared, if any"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.set_busy(False)
+    
+    def set_busy(self, busy):
+        """Show or hide the busy indicator and lock the board buttons"""
+        self.progress_bar.setRange(0, 0)  # Indeterminate until progress arrives
+        self.progress_bar.setVisible(busy)
+        self.cancel_btn.setVisible(busy)
+        for button in self.game_buttons:
+            button.setEnabled(not busy)
+    
+    def on_generation_progress(self, task, percent):
+        """Update the progress bar of the current task"""
+        if task is self._task:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(percent)
+    
+    def on_game_ready(self, task, board):
+        """Show the board posted back by the worker"""
+        self._tasks.discard(task)
+        if task is not self._task:
+            return
+        self._task = None
+        self.set_busy(False)
+        self.board = board
+        if len(self.cells) != board.size:
+            self.build_grid(board.size)
         self.update_display()
-        self.status_label.setText(f'New {difficulty.capitalize()} game started!')
+        self.status_label.setText(f'New {board.difficulty.capitalize()} game started!')
+    
+    def on_generation_failed(self, task, message):
+        """Report a failed generation"""
+        self._tasks.discard(task)
+        if task is not self._task:
+            return
+        self._task = None
+        self.set_busy(False)
+        self.status_label.setText(f'Could not create a puzzle: {message}')
+    
+    def on_generation_cancelled(self, task):
+        """Release a cancelled task; cancel_new_game already restored the UI"""
+        self._tasks.discard(task)
+    
+    def on_cancel(self):
+        """Cancel the game being prepared and keep the current one"""
+        self.cancel_new_game()
+        self.status_label.setText('New game cancelled.')
+    
+    def closeEvent(self, event):
+        """Stop any background generation before closing"""
+        self.cancel_new_game()
+        super().closeEvent(event)
     
     def update_display(self):
         """Update the grid display from board state"""
-        for i in range(9):
-            for j in range(9):
+        if not self.board:
+            return
+        
+        for i in range(self.board.size):
+            for j in range(self.board.size):
                 value = self.board.get_cell(i, j)
                 is_initial = self.board.is_initial_cell(i, j)
                 self.cells[i][j].set_initial(is_initial)
@@ -225,21 +414,48 @@ class SudokuGUI(QtWidgets.QMainWindow):
     def on_new_game(self):
         """Start a new game with selected difficulty"""
         difficulty = self.difficulty_combo.currentText()
-        self.new_game(difficulty)
+        self.new_game(difficulty, self.size_combo.currentData())
     
     def on_hint(self):
         """Provide a hint"""
         if not self.board:
             return
         
-        result = self.board.get_hint()
-        if result:
-            row, col = result
-            self.cells[row][col].set_value(self.board.get_cell(row, col))
-            self.status_label.setText(f'Hint: Filled cell at row {row+1}, column {col+1}')
+        hint = self.board.find_hint()
+        if hint:
+            row, col = hint.row, hint.col
+            self.board.set_cell(row, col, hint.digit)
+            self.cells[row][col].set_value(hint.digit)
+            if hint.technique == 'correction':
+                text = f'Hint: Corrected the digit at row {row+1}, column {col+1}'
+            elif hint.technique:
+                text = f'Hint ({hint.technique}): Filled cell at row {row+1}, column {col+1}'
+            else:
+                text = f'Hint: Revealed cell at row {row+1}, column {col+1}'
+            self.status_label.setText(text)
         else:
             self.status_label.setText('No more hints available!')
     
+    def on_undo(self):
+        """Undo the last move"""
+        if not self.board:
+            return
+        
+        changed = self.board.undo()
+        for row, col in changed:
+            self.cells[row][col].set_value(self.board.get_cell(row, col))
+        self.status_label.setText('Move undone.' if changed else 'Nothing to undo.')
+    
+    def on_redo(self):
+        """Redo the last undone move"""
+        if not self.board:
+            return
+        
+        changed = self.board.redo()
+        for row, col in changed:
+            self.cells[row][col].set_value(self.board.get_cell(row, col))
+        self.status_label.setText('Move redone.' if changed else 'Nothing to redo.')
+    
     def on_check(self):
         """Check current solution"""
         if not self.board:
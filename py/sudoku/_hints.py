@@ -0,0 +1,103 @@
+"""Logical hints for a game in progress.
+
+A hint names the next move a person could deduce, and the technique that
+deduces it, instead of revealing a random cell of the solution.
+``SudokuBoard`` keeps the candidates of every empty cell up to date as cells
+change, so a hint starts from ready candidates rather than a fresh grid.
+``next_move`` runs the ``LogicSolver`` techniques over a copy of them,
+cheapest first, applying eliminations until a step places a digit. The
+placement is reported with the hardest technique the chain needed: a hidden
+single that only appears after a pointing elimination is a pointing hint.
+
+Eliminations stay true as more digits are placed, so the board keeps the
+ones found by earlier hints and later hints start from them instead of
+deriving them again; they are dropped when a digit is erased or replaced.
+
+The logical techniques are 9x9-specific; boards of the other sizes get
+naked and hidden singles only.
+
+Classes:
+    Hint: A deduced move and how it was found
+
+Functions:
+    next_move: Find the next logically deducible placement
+
+"""
+
+import collections
+
+from ._logic import WEIGHTS, LogicSolver, Step
+
+Hint = collections.namedtuple('Hint', 'row col digit technique steps')
+Hint.__doc__ = """A move to make and the reasoning behind it
+
+row, col and digit give the placement. technique is the name of the hardest
+technique used, 'correction' when the move fixes a wrong digit, or None when
+no technique applies and the digit is taken from the solution. steps holds
+the logical Steps leading to the placement, which is the last one.
+"""
+
+
+def next_move(cells, candidates, size, unit_cells, struck=None):
+    """
+    Find the next placement that follows logically from the candidates
+
+    Args:
+        cells: Cell values of the board, 0 for empty
+        candidates: Candidate bitmask of every cell, 0 for filled cells
+        size: Side length of the board
+        unit_cells: Cells of every row, column and box, in that order
+        struck: Optional bitmask per cell of the digits eliminated by
+            earlier calls; removed from the candidates, and updated in
+            place with the eliminations found by this one
+
+    Returns:
+        Hint: The placement, or None if no technique finds one
+    """
+    if size != 9:
+        return _single(candidates, size, unit_cells)
+    if struck is not None:
+        candidates = [mask & ~gone for mask, gone in zip(candidates, struck)]
+    solver = LogicSolver.from_candidates(cells, candidates)
+    steps = []
+    while solver.valid:
+        step = solver.next_step()
+        if step is None:
+            return None
+        steps.append(step)
+        if struck is not None:
+            for cell, digit in step.eliminations:
+                struck[cell] |= 1 << (digit - 1)
+        if step.placements:
+            cell, digit = step.placements[0]
+            technique = max((step.technique for step in steps), key=WEIGHTS.get)
+            return Hint(cell // 9, cell % 9, digit, technique, tuple(steps))
+        solver.apply(step)
+    return None
+
+
+def _single(candidates, size, unit_cells):
+    """A naked single, else a hidden single, for boards of any size"""
+    for cell, mask in enumerate(candidates):
+        if mask and not mask & (mask - 1):
+            return _hint(cell, mask.bit_length(), 'naked single', size)
+    # Boxes first, as in the logical solver
+    for unit in unit_cells[2 * size:] + unit_cells[:2 * size]:
+        once = twice = 0
+        for cell in unit:
+            mask = candidates[cell]
+            twice |= once & mask
+            once |= mask
+        hidden = once & ~twice
+        if hidden:
+            bit = hidden & -hidden
+            for cell in unit:
+                if candidates[cell] & bit:
+                    return _hint(cell, bit.bit_length(), 'hidden single', size)
+    return None
+
+
+def _hint(cell, digit, technique, size):
+    """Hint for a single-step placement"""
+    step = Step(technique, ((cell, digit),), ())
+    return Hint(cell // size, cell % size, digit, technique, (step,))
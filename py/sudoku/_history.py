@@ -0,0 +1,205 @@
+"""Undo/redo history of a game.
+
+``MoveHistory`` records the moves of a board as an append-only journal of
+``(cell, old, new)`` triples packed into an ``array('H')``, six bytes a
+change. A step groups the changes made by one action (one for a typed
+digit, many when the solution is filled in), and undo and redo move a
+position over the steps. Making a new move after undoing drops the steps
+that could have been redone.
+
+Every ``interval`` steps the board is checkpointed, so the board at any
+position is the nearest earlier checkpoint plus at most ``interval - 1``
+replayed steps: jumping anywhere in a long session costs the same as
+undoing a few moves. Checkpoints are derived data; ``to_bytes`` only
+writes the starting cells, the journal and the step boundaries, and
+``from_bytes`` rebuilds the checkpoints by replaying once.
+
+Classes:
+    MoveHistory: Journal of board changes with undo, redo and seek
+
+"""
+
+import struct
+import sys
+from array import array
+
+_MAGIC = b'SDKH'
+_VERSION = 1
+# Magic, version, cell count, checkpoint interval, steps, position, journal length
+_HEADER = struct.Struct('<4sHHHIII')
+
+
+class MoveHistory(object):
+    """Journal of the moves made on a board, with undo, redo and seek
+
+    Args:
+        cells: The starting cells of the board (the puzzle)
+        interval: Steps between checkpoints of the whole board
+    """
+
+    def __init__(self, cells, interval=64):
+        super().__init__()
+        if interval < 1:
+            raise ValueError('interval must be at least 1')
+        self._initial = bytes(cells)
+        self._interval = interval
+        self._journal = array('H')  # cell, old, new per change
+        self._steps = array('I', [0])  # journal length after each step
+        self._position = 0
+        # Cells after step k * interval, kept up to the last recorded step
+        self._checkpoints = [self._initial]
+        self._last = bytearray(self._initial)  # cells after the last step
+
+    @property
+    def position(self):
+        """(int) Steps applied to the board; 0 is the starting board"""
+        return self._position
+
+    @property
+    def interval(self):
+        """(int) Steps between checkpoints"""
+        return self._interval
+
+    def __len__(self):
+        return len(self._steps) - 1
+
+    def can_undo(self):
+        """Check if there is a step to undo"""
+        return self._position > 0
+
+    def can_redo(self):
+        """Check if there is an undone step to redo"""
+        return self._position < len(self)
+
+    def record(self, changes):
+        """
+        Append a step after the current position, dropping any redo steps
+
+        Args:
+            changes: Iterable of (cell, old, new) triples, applied in order
+        """
+        if self._position + 1 < len(self._steps):
+            self._truncate()
+        journal = self._journal
+        last = self._last
+        for cell, old, new in changes:
+            journal.extend((cell, old, new))
+            last[cell] = new
+        self._steps.append(len(journal))
+        self._position += 1
+        if self._position % self._interval == 0:
+            self._checkpoints.append(bytes(last))
+
+    def undo(self):
+        """
+        Step back one position
+
+        Returns:
+            list: The (cell, old, new) changes of the undone step, to be
+                reverted in reverse order; empty if there is nothing to undo
+        """
+        if not self._position:
+            return []
+        self._position -= 1
+        return self.changes(self._position + 1)
+
+    def redo(self):
+        """
+        Step forward one position
+
+        Returns:
+            list: The (cell, old, new) changes of the redone step; empty if
+                there is nothing to redo
+        """
+        if self._position >= len(self):
+            return []
+        self._position += 1
+        return self.changes(self._position)
+
+    def changes(self, step):
+        """Get the (cell, old, new) changes of a step, numbered from 1"""
+        start, end = self._steps[step - 1], self._steps[step]
+        values = self._journal[start:end]
+        return [tuple(values[i:i + 3]) for i in range(0, len(values), 3)]
+
+    def cells_at(self, position):
+        """
+        Compute the board after a number of steps
+
+        Args:
+            position: Steps applied, from 0 to len(history)
+
+        Returns:
+            bytearray: The cells of the board at that position
+        """
+        if not 0 <= position <= len(self):
+            raise IndexError('history position out of range')
+        checkpoint = position // self._interval
+        cells = bytearray(self._checkpoints[checkpoint])
+        journal = self._journal
+        start = self._steps[checkpoint * self._interval]
+        end = self._steps[position]
+        for i in range(start, end, 3):
+            cells[journal[i]] = journal[i + 2]
+        return cells
+
+    def seek(self, position):
+        """Move to a position without dropping any steps and return its cells"""
+        cells = self.cells_at(position)
+        self._position = position
+        return cells
+
+    def to_bytes(self):
+        """Serialize the starting cells, journal, steps and position"""
+        steps = array('I', self._steps[1:])
+        journal = array('H', self._journal)
+        if sys.byteorder == 'big':
+            steps.byteswap()
+            journal.byteswap()
+        header = _HEADER.pack(_MAGIC, _VERSION, len(self._initial), self._interval,
+                              len(steps), self._position, len(journal))
+        return header + self._initial + steps.tobytes() + journal.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load a history written by to_bytes
+
+        Raises:
+            ValueError: If data is not a serialized history
+        """
+        try:
+            magic, version, ncells, interval, nsteps, position, njournal = \
+                _HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError('Not a serialized move history')
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not a serialized move history')
+        offset = _HEADER.size
+        initial = data[offset:offset + ncells]
+        offset += ncells
+        steps = array('I', data[offset:offset + 4 * nsteps])
+        offset += 4 * nsteps
+        journal = array('H', data[offset:offset + 2 * njournal])
+        if len(initial) != ncells or len(steps) != nsteps or len(journal) != njournal \
+                or position > nsteps:
+            raise ValueError('Truncated move history')
+        if sys.byteorder == 'big':
+            steps.byteswap()
+            journal.byteswap()
+
+        history = cls(initial, interval)
+        for step in range(nsteps):
+            start = steps[step - 1] if step else 0
+            values = journal[start:steps[step]]
+            history.record(tuple(values[i:i + 3]) for i in range(0, len(values), 3))
+        history._position = position
+        return history
+
+    def _truncate(self):
+        """Drop the steps after the current position"""
+        position = self._position
+        del self._journal[self._steps[position]:]
+        del self._steps[position + 1:]
+        del self._checkpoints[position // self._interval + 1:]
+        self._last = self.cells_at(position)
@@ -0,0 +1,90 @@
+"""Index of puzzles up to symmetry.
+
+``PuzzleIndex`` keys every puzzle by its canonical form (see
+``canonical_form``), so a lookup costs one canonicalization plus a hash
+lookup, whatever the size of the index, and answers whether an equivalent
+puzzle was seen before. Solutions are stored in the canonical frame: the one
+solved grid serves every equivalent puzzle and is mapped back through the
+inverse of that puzzle's transform.
+
+The index lives in a dict, or in a ``dbm`` database when given a path.
+
+Classes:
+    PuzzleIndex: Set of puzzles up to symmetry with one solution per class
+
+"""
+
+from ._board import CompactBoard
+from ._canonical import canonical_form
+
+
+class PuzzleIndex(object):
+    """Set of puzzles up to symmetry, with an optional solution for each
+
+    Args:
+        path: dbm file to keep the index in, created if missing; the index
+            is held in memory when None
+    """
+
+    def __init__(self, path=None):
+        super().__init__()
+        if path is None:
+            self._db = {}
+        else:
+            import dbm
+            self._db = dbm.open(path, 'c')
+        self._path = path
+
+    def add(self, puzzle, solution=None):
+        """
+        Add a puzzle, and its solution if known
+
+        Args:
+            puzzle: CompactBoard, 81-char string or 9x9 list
+            solution: Solution of puzzle in the same format, or None
+
+        Returns:
+            bool: True if no equivalent puzzle was in the index yet
+        """
+        canonical, transform = canonical_form(puzzle)
+        key = bytes(canonical.cells)
+        stored = self._db.get(key)
+        if stored is None or (not stored and solution is not None):
+            if solution is not None:
+                solution = bytes(transform.apply(solution).cells)
+            self._db[key] = solution or b''
+        return stored is None
+
+    def solution_for(self, puzzle):
+        """
+        Look up the stored solution of an equivalent puzzle
+
+        Args:
+            puzzle: CompactBoard, 81-char string or 9x9 list
+
+        Returns:
+            CompactBoard: The stored solution mapped onto puzzle, or None if no
+                equivalent puzzle with a solution was added
+        """
+        canonical, transform = canonical_form(puzzle)
+        stored = self._db.get(bytes(canonical.cells))
+        if not stored:
+            return None
+        return transform.invert().apply(CompactBoard(stored))
+
+    def __contains__(self, puzzle):
+        return bytes(canonical_form(puzzle)[0].cells) in self._db
+
+    def __len__(self):
+        return len(self._db)
+
+    def close(self):
+        """Close the dbm database, if the index has one"""
+        if self._path is not None:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,148 @@
+"""Load-test client for the HTTP service, behind ``python -m sudoku loadtest``.
+
+Opens ``concurrency`` keep-alive connections to a running ``serve`` and
+sends a fixed number of requests to one endpoint over all of them, each
+connection sending its next request as soon as the last one is answered.
+Solve, validate and hint requests cycle through a corpus of puzzles, by
+default one puzzle per connection fetched from the server's own
+``/generate``. The report gives the throughput, the latency percentiles seen
+by the client and the count of every response status.
+
+Classes:
+    Connection: One keep-alive connection sending JSON requests
+
+Functions:
+    load_test: Run a load test and return its report
+
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from urllib.parse import urlencode, urlsplit
+
+from ._metrics import LatencyHistogram
+from ._server import format_request, read_message
+
+ENDPOINTS = ('solve', 'generate', 'validate', 'hint')
+
+
+class Connection(object):
+    """Keep-alive connection to the service
+
+    Args:
+        host: Server host
+        port: Server port
+    """
+
+    def __init__(self, host, port):
+        super().__init__()
+        self._host = host
+        self._port = port
+        self._reader = self._writer = None
+
+    async def request(self, method, target, payload=None):
+        """
+        Send a request and wait for its response, connecting first if needed
+
+        Args:
+            method: 'GET' or 'POST'
+            target: Path and query string
+            payload: Optional JSON-serializable body
+
+        Returns:
+            tuple: (status, decoded JSON body)
+
+        Raises:
+            ConnectionError: If the server closes the connection
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+        self._writer.write(format_request(method, target, self._host, payload))
+        await self._writer.drain()
+        message = await read_message(self._reader)
+        if message is None:
+            self.close()
+            raise ConnectionResetError('Server closed the connection')
+        start_line, headers, body = message
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(start_line.split()[1]), json.loads(body) if body else None
+
+    def close(self):
+        """Close the connection; the next request opens a new one"""
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+async def load_test(url, endpoint='solve', requests=1000, concurrency=16, puzzles=None,
+                    difficulty='medium'):
+    """
+    Send requests to one endpoint of a running service over many connections
+
+    Args:
+        url: Base URL of the service, e.g. 'http://127.0.0.1:8080'
+        endpoint: One of ``ENDPOINTS``
+        requests: Total number of requests to send
+        concurrency: Connections sending requests at the same time
+        puzzles: Puzzle strings for solve, validate and hint; None to fetch
+            one per connection from /generate
+        difficulty: Difficulty of generated puzzles
+
+    Returns:
+        dict: requests, elapsed (seconds), rate (requests per second),
+            latency (a LatencyHistogram of the client-side latencies),
+            statuses (count per HTTP status) and server (the /stats of the
+            service after the run)
+    """
+    if endpoint not in ENDPOINTS:
+        raise ValueError(f'endpoint must be one of {", ".join(ENDPOINTS)}')
+    location = urlsplit(url if '//' in url else '//' + url)
+    host, port = location.hostname or '127.0.0.1', location.port or 8080
+    connections = [Connection(host, port) for _ in range(concurrency)]
+    generate = '/generate?' + urlencode({'difficulty': difficulty})
+    try:
+        if puzzles is None and endpoint != 'generate':
+            answers = await asyncio.gather(*(connection.request('GET', generate)
+                                             for connection in connections))
+            puzzles = [answer['puzzle'] for status, answer in answers if status == 200]
+            if not puzzles:
+                raise RuntimeError('Could not fetch puzzles from the server')
+        bodies = _bodies(endpoint, puzzles, generate)
+        remaining = itertools.islice(itertools.count(), requests)
+        latency = LatencyHistogram()
+        statuses = {}
+
+        async def drive(connection):
+            for index in remaining:
+                method, target, payload = bodies(index)
+                started = time.perf_counter()
+                try:
+                    status, _ = await connection.request(method, target, payload)
+                except ConnectionError:
+                    status = 0  # Counted as a failure; reconnect for the next request
+                    connection.close()
+                latency.add(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(drive(connection) for connection in connections))
+        elapsed = time.perf_counter() - started
+        _, server = await connections[0].request('GET', '/stats')
+    finally:
+        for connection in connections:
+            connection.close()
+    return {'requests': latency.count, 'elapsed': elapsed,
+            'rate': latency.count / elapsed if elapsed > 0 else 0.0,
+            'latency': latency, 'statuses': statuses, 'server': server}
+
+
+def _bodies(endpoint, puzzles, generate):
+    """Return a function giving the (method, target, payload) of request i"""
+    if endpoint == 'generate':
+        return lambda index: ('GET', generate, None)
+    name = 'board' if endpoint == 'validate' else 'puzzle'
+    target = '/' + endpoint
+    return lambda index: ('POST', target, {name: puzzles[index % len(puzzles)]})
@@ -0,0 +1,479 @@
+"""Human-style logical solver and difficulty rating.
+
+The solver keeps a candidate bitmask per cell and applies the techniques a
+person would use, cheapest first, restarting from the cheapest after every
+step:
+
+- naked single: a cell with one candidate left
+- hidden single: a digit with one possible cell in a row, column or box
+- pointing: a digit confined to one row or column of a box is removed from
+  the rest of that row or column
+- box/line reduction: a digit confined to one box within a row or column is
+  removed from the rest of that box
+- naked pair / triple: N cells of a unit sharing N candidates
+- hidden pair / triple: N digits of a unit confined to N cells
+- X-wing: a digit confined to the same two columns in two rows, or the same
+  two rows in two columns
+
+Every step costs the weight of its technique and the difficulty score of a
+puzzle is the sum over the steps needed to solve it. Puzzles the techniques
+cannot finish are reported as unsolved, and rating stops early once the
+score passes an optional cap.
+
+Classes:
+    LogicSolver: Candidate grid that finds and applies logical steps
+    Step: One logical deduction
+    Rating: Score, hardest technique and step counts of a puzzle
+
+Functions:
+    rate_puzzle: Rate a puzzle by the techniques needed to solve it
+    difficulty_of: Name the difficulty band of a rating
+    logical_steps: Yield the steps that solve a puzzle
+
+"""
+
+import collections
+import itertools
+
+from ._board import CompactBoard, flatten
+from ._solve_engine import (_ALL, _BIT_COUNT, _BOX_OF, _COL_OF, _NCELLS, _ROW_OF, _SIZE,
+                            _UNITS)
+
+# (name, weight) in the order the solver tries them
+TECHNIQUES = (
+    ('naked single', 1),
+    ('hidden single', 1),
+    ('pointing', 4),
+    ('box/line reduction', 4),
+    ('naked pair', 6),
+    ('hidden pair', 8),
+    ('naked triple', 10),
+    ('hidden triple', 12),
+    ('x-wing', 15),
+)
+WEIGHTS = dict(TECHNIQUES)
+
+# Score band of each generated difficulty. Every empty cell costs at least one
+# single, so the score of a puzzle is at least its number of empty cells;
+# "hard" puzzles need techniques beyond singles on top of that.
+DIFFICULTY_BANDS = {
+    'easy': (36, 45),
+    'medium': (46, 59),
+    'hard': (60, 150),
+}
+
+_ROW, _COL, _BOX = 0, 1, 2
+_UNIT_CELLS = [cells for cells, _, _ in _UNITS]
+_UNITS_BY_KIND = [[cells for cells, kind, _ in _UNITS if kind == wanted]
+                  for wanted in (_ROW, _COL, _BOX)]
+_PEERS = [sorted({peer for cells in _UNIT_CELLS if cell in cells for peer in cells}
+                 - {cell})
+          for cell in range(_NCELLS)]
+_DIGIT_BITS = [(digit, 1 << (digit - 1)) for digit in range(1, _SIZE + 1)]
+_SHIFTS = [(bit, _SIZE * (digit - 1)) for digit, bit in _DIGIT_BITS]
+# Candidate mask spread to one bit per 9-bit digit field, for _positions
+_SPREAD = [sum(1 << (_SIZE * (digit - 1)) for digit, bit in _DIGIT_BITS if mask & bit)
+           for mask in range(_ALL + 1)]
+_UNIT_NUMBERS_BY_KIND = [[number for number, (_, kind, _) in enumerate(_UNITS) if kind == wanted]
+                         for wanted in (_ROW, _COL, _BOX)]
+
+
+def _segments(unit, kind, cross_kind):
+    """Split a unit into its three intersections with units of cross_kind
+
+    Returns:
+        list: (segment, rest) per intersection, where rest holds the cells
+            of the crossing unit outside this one
+    """
+    unit_of = {_ROW: _ROW_OF, _COL: _COL_OF, _BOX: _BOX_OF}[cross_kind]
+    crossings = sorted({unit_of[cell] for cell in unit}, key=lambda index: min(
+        position for position, cell in enumerate(unit) if unit_of[cell] == index))
+    segments = []
+    for index in crossings:
+        segment = [cell for cell in unit if unit_of[cell] == index]
+        rest = [cell for cell in _UNITS_BY_KIND[cross_kind][index] if cell not in unit]
+        segments.append((segment, rest))
+    return segments
+
+
+# Box/line intersections: for every box its row and column segments, and
+# for every row and column its box segments
+_BOX_SEGMENTS = [(_segments(box, _BOX, _ROW), _segments(box, _BOX, _COL))
+                 for box in _UNITS_BY_KIND[_BOX]]
+_LINE_SEGMENTS = [[_segments(line, kind, _BOX) for line in _UNITS_BY_KIND[kind]]
+                  for kind in (_ROW, _COL)]
+
+
+Step = collections.namedtuple('Step', 'technique placements eliminations')
+Step.__doc__ = """One logical deduction
+
+placements holds (cell, digit) pairs to fill in and eliminations
+(cell, digit) pairs to strike from the candidates; cells are flat indexes
+row * 9 + col.
+"""
+
+Rating = collections.namedtuple('Rating', 'score hardest solved counts')
+Rating.__doc__ = """Difficulty rating of a puzzle
+
+score is the summed weight of the steps applied, hardest the name of the
+most expensive technique used (None when nothing was needed), solved whether
+the techniques finished the puzzle and counts the steps per technique.
+"""
+
+
+class LogicSolver(object):
+    """Candidate grid that finds and applies logical steps
+
+    Args:
+        board: 9x9 2D list, CompactBoard or 81-char string (0 or '.' for empty)
+
+    ``valid`` is False when two givens conflict or a cell runs out of
+    candidates.
+    """
+
+    __slots__ = ('cells', 'candidates', 'valid')
+
+    def __init__(self, board):
+        super().__init__()
+        if isinstance(board, str):
+            board = CompactBoard.from_string(board)
+        cells = flatten(board)
+        if len(cells) != _NCELLS:
+            raise ValueError('Logical solving only supports 9x9 boards')
+        self.cells = [0] * _NCELLS
+        self.candidates = [_ALL] * _NCELLS
+        self.valid = True
+        for cell, digit in enumerate(cells):
+            if digit:
+                if not self.candidates[cell] & (1 << (digit - 1)):
+                    self.valid = False
+                self.place(cell, digit)
+
+    @classmethod
+    def from_candidates(cls, cells, candidates):
+        """Build a solver from cell values and their candidate masks as they are
+
+        The candidates are copied, not checked against the cells; an empty
+        cell without candidates makes the solver invalid.
+        """
+        solver = cls.__new__(cls)
+        solver.cells = list(cells)
+        solver.candidates = list(candidates)
+        solver.valid = all(mask or digit for digit, mask in zip(cells, candidates))
+        return solver
+
+    def place(self, cell, digit):
+        """Fill a cell and remove the digit from the candidates of its peers"""
+        bit = 1 << (digit - 1)
+        candidates = self.candidates
+        self.cells[cell] = digit
+        candidates[cell] = 0
+        for peer in _PEERS[cell]:
+            if candidates[peer] & bit:
+                candidates[peer] &= ~bit
+                if not candidates[peer]:
+                    self.valid = False
+
+    def eliminate(self, cell, digit):
+        """Strike a digit from the candidates of an empty cell"""
+        self.candidates[cell] &= ~(1 << (digit - 1))
+        if not self.candidates[cell]:
+            self.valid = False
+
+    def apply(self, step):
+        """Apply the placements and eliminations of a step"""
+        for cell, digit in step.placements:
+            self.place(cell, digit)
+        for cell, digit in step.eliminations:
+            self.eliminate(cell, digit)
+
+    def is_solved(self):
+        """Check whether every cell is filled"""
+        return all(self.cells)
+
+    def next_step(self, max_weight=None):
+        """Find the cheapest available step
+
+        Args:
+            max_weight: Skip techniques weighing more than this
+
+        Returns:
+            Step: The deduction, or None if no technique applies
+        """
+        for name, weight in TECHNIQUES:
+            if max_weight is not None and weight > max_weight:
+                break
+            step = _FINDERS[name](self)
+            if step is not None:
+                return step
+        return None
+
+
+def _naked_single(solver):
+    """A cell with a single candidate"""
+    for cell, mask in enumerate(solver.candidates):
+        if mask and _BIT_COUNT[mask] == 1:
+            return Step('naked single', ((cell, mask.bit_length()),), ())
+    return None
+
+
+def _hidden_single(solver):
+    """A digit with a single possible cell in a unit, boxes first"""
+    candidates = solver.candidates
+    for kind in (_BOX, _ROW, _COL):
+        for unit in _UNITS_BY_KIND[kind]:
+            once = twice = 0
+            for cell in unit:
+                mask = candidates[cell]
+                twice |= once & mask
+                once |= mask
+            hidden = once & ~twice
+            if hidden:
+                bit = hidden & -hidden
+                for cell in unit:
+                    if candidates[cell] & bit:
+                        return Step('hidden single', ((cell, bit.bit_length()),), ())
+    return None
+
+
+def _positions(candidates):
+    """Positions within every unit where each digit is a candidate
+
+    Returns:
+        list: One integer per unit of _UNIT_CELLS whose 9-bit field
+            ``digit - 1`` is the bitmask of the positions in the unit where
+            digit is a candidate
+    """
+    spread = [_SPREAD[mask] for mask in candidates]
+    return [spread[a] | spread[b] << 1 | spread[c] << 2 | spread[d] << 3 |
+            spread[e] << 4 | spread[f] << 5 | spread[g] << 6 | spread[h] << 7 |
+            spread[i] << 8 for a, b, c, d, e, f, g, h, i in _UNIT_CELLS]
+
+
+def _eliminations(candidates, cells, bits):
+    """(cell, digit) pairs for the given bits still present in cells"""
+    return tuple((cell, digit) for cell in cells for digit, bit in _DIGIT_BITS
+                 if bits & bit and candidates[cell] & bit)
+
+
+def _pointing(solver):
+    """A digit confined to one line of a box leaves the rest of that line"""
+    candidates = solver.candidates
+    for box, segments in zip(_UNITS_BY_KIND[_BOX], _BOX_SEGMENTS):
+        step = _confined(candidates, box, segments[0] + segments[1], 'pointing')
+        if step is not None:
+            return step
+    return None
+
+
+def _box_line(solver):
+    """A digit confined to one box within a line leaves the rest of the box"""
+    candidates = solver.candidates
+    for kind in (_ROW, _COL):
+        for line, segments in zip(_UNITS_BY_KIND[kind], _LINE_SEGMENTS[kind]):
+            step = _confined(candidates, line, segments, 'box/line reduction')
+            if step is not None:
+                return step
+    return None
+
+
+def _confined(candidates, unit, segments, name):
+    """Lowest digit with two or more homes in unit, all within one segment,
+    that the rest of that segment's crossing unit still has as a candidate
+
+    segments holds (segment, rest) pairs, three for each of one or two ways
+    of splitting the unit into three; a digit confined to a segment of each
+    way would have a single home, so at most one segment qualifies per digit.
+    """
+    once = twice = 0
+    for cell in unit:
+        mask = candidates[cell]
+        twice |= once & mask
+        once |= mask
+    if not twice:
+        return None
+    best = best_rest = None
+    for group in (segments[:3], segments[3:]):
+        if not group:
+            continue
+        masks = []
+        for segment, _ in group:
+            union = 0
+            for cell in segment:
+                union |= candidates[cell]
+            masks.append(union)
+        for i, (_, rest) in enumerate(group):
+            confined = masks[i] & ~(masks[i - 1] | masks[i - 2]) & twice
+            if not confined:
+                continue
+            seen = 0
+            for cell in rest:
+                seen |= candidates[cell]
+            hits = confined & seen
+            if hits:
+                bit = hits & -hits
+                if best is None or bit < best:
+                    best, best_rest = bit, rest
+    if best is None:
+        return None
+    return Step(name, (), _eliminations(candidates, best_rest, best))
+
+
+def _naked_subset(solver, size, name):
+    """size cells of a unit whose candidates together hold size digits"""
+    candidates = solver.candidates
+    for unit in _UNIT_CELLS:
+        open_cells = [cell for cell in unit if candidates[cell]]
+        if len(open_cells) <= size:
+            continue
+        small = [cell for cell in open_cells if _BIT_COUNT[candidates[cell]] <= size]
+        for group in itertools.combinations(small, size):
+            union = 0
+            for cell in group:
+                union |= candidates[cell]
+            if _BIT_COUNT[union] != size:
+                continue
+            others = [cell for cell in open_cells if cell not in group]
+            eliminations = _eliminations(candidates, others, union)
+            if eliminations:
+                return Step(name, (), eliminations)
+    return None
+
+
+def _hidden_subset(solver, size, name):
+    """size digits of a unit confined to size cells"""
+    candidates = solver.candidates
+    positions = None
+    for number, unit in enumerate(_UNIT_CELLS):
+        open_cells = [cell for cell in unit if candidates[cell]]
+        if len(open_cells) <= size:
+            continue
+        if positions is None:
+            positions = _positions(candidates)
+        # Cells, as a bitmask over the unit positions, that can hold each digit
+        spots = []
+        packed = positions[number]
+        for bit, shift in _SHIFTS:
+            where = packed >> shift & _ALL
+            if 2 <= _BIT_COUNT[where] <= size:
+                spots.append((bit, where))
+        for group in itertools.combinations(spots, size):
+            where = digits = 0
+            for bit, spot in group:
+                where |= spot
+                digits |= bit
+            if _BIT_COUNT[where] != size:
+                continue
+            cells = [cell for position, cell in enumerate(unit) if where >> position & 1]
+            eliminations = _eliminations(candidates, cells, _ALL & ~digits)
+            if eliminations:
+                return Step(name, (), eliminations)
+    return None
+
+
+def _x_wing(solver):
+    """A digit confined to the same two columns of two rows, or vice versa"""
+    candidates = solver.candidates
+    positions = _positions(candidates)
+    for kind, cross in ((_ROW, _COL), (_COL, _ROW)):
+        crosses = _UNITS_BY_KIND[cross]
+        for digit, bit in _DIGIT_BITS:
+            # Positions of the digit along each line, as a 9-bit mask
+            pairs = collections.defaultdict(list)
+            for index, number in enumerate(_UNIT_NUMBERS_BY_KIND[kind]):
+                where = positions[number] >> _SIZE * (digit - 1) & _ALL
+                if _BIT_COUNT[where] == 2:
+                    pairs[where].append(index)
+            for where, indexes in pairs.items():
+                if len(indexes) != 2:
+                    continue
+                others = [cell for position in range(_SIZE) if where >> position & 1
+                          for index, cell in enumerate(crosses[position])
+                          if index not in indexes]
+                eliminations = _eliminations(candidates, others, bit)
+                if eliminations:
+                    return Step('x-wing', (), eliminations)
+    return None
+
+
+_FINDERS = {
+    'naked single': _naked_single,
+    'hidden single': _hidden_single,
+    'pointing': _pointing,
+    'box/line reduction': _box_line,
+    'naked pair': lambda solver: _naked_subset(solver, 2, 'naked pair'),
+    'hidden pair': lambda solver: _hidden_subset(solver, 2, 'hidden pair'),
+    'naked triple': lambda solver: _naked_subset(solver, 3, 'naked triple'),
+    'hidden triple': lambda solver: _hidden_subset(solver, 3, 'hidden triple'),
+    'x-wing': _x_wing,
+}
+
+
+def logical_steps(board, max_weight=None):
+    """
+    Yield the steps that solve a puzzle, cheapest technique first
+
+    Stops when the puzzle is solved, no technique applies or the grid turns
+    out to be contradictory.
+
+    Args:
+        board: 9x9 2D list, CompactBoard or 81-char string
+        max_weight: Only use techniques weighing at most this much
+
+    Yields:
+        Step: Each deduction, already applied to the internal grid
+    """
+    solver = LogicSolver(board)
+    while solver.valid and not solver.is_solved():
+        step = solver.next_step(max_weight)
+        if step is None:
+            return
+        solver.apply(step)
+        yield step
+
+
+def rate_puzzle(board, max_score=None, max_weight=None):
+    """
+    Rate a puzzle by the techniques a person needs to solve it
+
+    Args:
+        board: 9x9 2D list, CompactBoard or 81-char string
+        max_score: Stop as soon as the score exceeds this; the rating is
+            then returned unsolved
+        max_weight: Only use techniques weighing at most this much
+
+    Returns:
+        Rating: score, hardest technique, solved flag and per-technique counts
+    """
+    return _rate(LogicSolver(board), max_score, max_weight)
+
+
+def difficulty_of(rating):
+    """Name the DIFFICULTY_BANDS entry a rating falls in, or None"""
+    if not rating.solved:
+        return None
+    for name, (low, high) in DIFFICULTY_BANDS.items():
+        if low <= rating.score <= high:
+            return name
+    return None
+
+
+def _rate(solver, max_score, max_weight):
+    """Run solver to a stop and rate the steps; solver keeps its final state"""
+    score = 0
+    hardest, hardest_weight = None, 0
+    counts = {}
+    while solver.valid and not solver.is_solved():
+        step = solver.next_step(max_weight)
+        if step is None:
+            break
+        solver.apply(step)
+        weight = WEIGHTS[step.technique]
+        score += weight
+        counts[step.technique] = counts.get(step.technique, 0) + 1
+        if weight > hardest_weight:
+            hardest, hardest_weight = step.technique, weight
+        if max_score is not None and score > max_score:
+            break
+    solved = solver.valid and solver.is_solved()
+    return Rating(score, hardest, solved, counts)
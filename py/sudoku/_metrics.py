@@ -0,0 +1,160 @@
+"""Latency metrics with bounded memory, and solver search statistics.
+
+Long-running batch jobs and services record one latency per puzzle, so
+keeping every sample is not an option. ``LatencyHistogram`` counts samples in
+logarithmic buckets instead: memory stays constant and percentiles are
+accurate to the bucket growth factor (about 5% by default).
+
+``SolveStats`` is handed to a solving engine to count what its search did.
+Engines only touch it when one is given, so solving without it costs a
+single ``is None`` check per search node.
+
+Classes:
+    LatencyHistogram: Log-bucketed latency histogram with percentile queries
+    SolveStats: Search-tree counters and an optional per-node hook
+
+"""
+
+import math
+
+
+class LatencyHistogram(object):
+    """Log-bucketed latency histogram
+
+    Args:
+        lowest: Smallest latency in seconds told apart from zero
+        growth: Ratio between consecutive bucket bounds
+    """
+
+    def __init__(self, lowest=1e-6, growth=1.05):
+        super().__init__()
+        self._lowest = lowest
+        self._log_growth = math.log(growth)
+        self._growth = growth
+        self._buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        """Record one latency in seconds"""
+        if seconds <= self._lowest:
+            index = 0
+        else:
+            index = int(math.log(seconds / self._lowest) / self._log_growth) + 1
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        """Add every sample recorded by another histogram with the same buckets"""
+        if (other._lowest, other._growth) != (self._lowest, self._growth):
+            raise ValueError('Histograms use different buckets')
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        """(float) Mean latency in seconds, 0.0 when empty"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """Latency below which ``percent`` of the samples fall, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100.0))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                if index == 0:
+                    return self._lowest
+                # Upper bound of the bucket, clamped to what was observed
+                upper = self._lowest * self._growth ** index
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """Return count, mean, min, max and common percentiles as a dict"""
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min or 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max or 0.0,
+        }
+
+
+class SolveStats(object):
+    """Search statistics filled in by a solving engine
+
+    Pass an instance as ``stats`` to ``solve``, ``count_solutions`` or
+    ``iter_solutions``. Counters accumulate, so one instance can total
+    several runs.
+
+    Attributes:
+        nodes: Guesses made by the search, one per search-tree node below the root
+        backtracks: Dead ends, where a guess led to a contradiction
+        max_depth: Most guesses on a single search path
+        propagations: Digits placed without guessing (naked and hidden singles,
+            forced Dancing Links columns)
+        solutions: Solutions found
+        elapsed: Wall time spent searching, in seconds
+
+    Args:
+        on_node: Optional callable(depth, cell, digit) called for every guess,
+            where cell is the flat index row * 9 + col
+    """
+
+    __slots__ = ('nodes', 'backtracks', 'max_depth', 'propagations', 'solutions',
+                 'elapsed', 'on_node')
+
+    FIELDS = ('nodes', 'backtracks', 'max_depth', 'propagations', 'solutions', 'elapsed')
+
+    def __init__(self, on_node=None):
+        super().__init__()
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.propagations = 0
+        self.solutions = 0
+        self.elapsed = 0.0
+        self.on_node = on_node
+
+    def node(self, depth, cell, digit):
+        """Record a guess of digit in cell at the given search depth"""
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.on_node is not None:
+            self.on_node(depth, cell, digit)
+
+    def merge(self, other):
+        """Add the counters of another SolveStats"""
+        self.nodes += other.nodes
+        self.backtracks += other.backtracks
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.propagations += other.propagations
+        self.solutions += other.solutions
+        self.elapsed += other.elapsed
+
+    def as_dict(self):
+        """Return the counters as a dict"""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self):
+        return 'SolveStats({})'.format(
+            ', '.join(f'{name}={value!r}' for name, value in self.as_dict().items()))
@@ -0,0 +1,226 @@
+"""Pre-generated puzzle pool.
+
+Generating a hard puzzle takes milliseconds to tens of milliseconds, which is
+too slow to do on a GUI thread or in a request handler. ``PuzzlePool`` keeps a
+queue of ready puzzles per difficulty and tops them up from a background
+thread: once a queue drops below the low watermark it is refilled to the high
+watermark. Taking a puzzle is then a queue pop. If a queue runs dry the
+puzzle is generated synchronously, so callers never wait on the refill.
+
+Pools can persist their queues to a text file between runs. The shared
+pool starts empty and only keeps the difficulties asked for filled.
+
+Classes:
+    PuzzlePool: Per-difficulty puzzle queues with background refill
+
+Functions:
+    get_default_pool: The shared pool used by SudokuBoard
+    set_default_pool: Replace the shared pool
+
+"""
+
+import collections
+import os
+import threading
+
+from ._board import CompactBoard
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+class PuzzlePool(object):
+    """Per-difficulty queues of ready (puzzle, solution) pairs
+
+    Args:
+        low: Refill a difficulty once fewer puzzles than this are queued
+        high: Number of puzzles to refill a difficulty up to
+        difficulties: Difficulties kept filled from the start
+        path: Optional file the queues are loaded from and saved to
+        workers: Processes used for a refill, 1 to generate on the thread
+        start: Start the background refill thread immediately
+    """
+
+    def __init__(self, low=4, high=16, difficulties=DIFFICULTIES, path=None,
+                 workers=1, start=True):
+        super().__init__()
+        if not 0 <= low <= high or high < 1:
+            raise ValueError('Watermarks must satisfy 0 <= low <= high and high >= 1')
+        self._low = low
+        self._high = high
+        self._path = path
+        self._workers = workers
+        self._queues = {difficulty: collections.deque() for difficulty in difficulties}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+        if path and os.path.exists(path):
+            self.load(path)
+        if start:
+            self.start()
+
+    @property
+    def low(self):
+        """(int) Low watermark that triggers a refill"""
+        return self._low
+
+    @property
+    def high(self):
+        """(int) High watermark a refill stops at"""
+        return self._high
+
+    def sizes(self):
+        """Return the number of queued puzzles per difficulty"""
+        with self._condition:
+            return {difficulty: len(queue) for difficulty, queue in self._queues.items()}
+
+    def get(self, difficulty='medium'):
+        """
+        Take a puzzle from the pool
+
+        Falls back to generating one synchronously when the queue is empty.
+
+        Returns:
+            tuple: (puzzle, solution) CompactBoards
+        """
+        item = self.try_get(difficulty)
+        if item is None:
+            item = _generate(difficulty)
+        return item
+
+    def try_get(self, difficulty='medium'):
+        """
+        Take a puzzle from the pool without ever generating one
+
+        Returns:
+            tuple: (puzzle, solution) CompactBoards, or None if the queue is empty
+        """
+        with self._condition:
+            queue = self._queues.setdefault(difficulty, collections.deque())
+            item = queue.popleft() if queue else None
+            if len(queue) < self._low and not self._closed:
+                self._condition.notify()
+        return item
+
+    def put(self, difficulty, puzzle, solution):
+        """Add a puzzle to the pool, e.g. one generated elsewhere"""
+        with self._condition:
+            self._queues.setdefault(difficulty, collections.deque()).append(
+                (CompactBoard.coerce(puzzle), CompactBoard.coerce(solution)))
+
+    def fill(self, difficulty=None):
+        """Synchronously fill one difficulty, or all of them, to the high watermark"""
+        difficulties = [difficulty] if difficulty else list(self.sizes())
+        for difficulty in difficulties:
+            missing = self._high - self.sizes().get(difficulty, 0)
+            for puzzle, solution in _produce(difficulty, missing, self._workers):
+                self.put(difficulty, puzzle, solution)
+
+    def start(self):
+        """Start the background refill thread if it is not running"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Pool is closed')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='PuzzlePool',
+                                                daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stop the refill thread and save the queues if the pool has a path"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._path:
+            self.save(self._path)
+
+    def save(self, path):
+        """Write the queued puzzles as 'difficulty puzzle solution' lines"""
+        with self._condition:
+            lines = [f'{difficulty} {puzzle} {solution}\n'
+                     for difficulty, queue in self._queues.items()
+                     for puzzle, solution in queue]
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as handle:
+            handle.writelines(lines)
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        """Queue the puzzles saved by ``save``"""
+        with open(path) as handle:
+            for line in handle:
+                fields = line.split()
+                if len(fields) == 3:
+                    self.put(*fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_to_fill(self):
+        """Return a difficulty below the low watermark and how many it misses"""
+        for difficulty, queue in self._queues.items():
+            if len(queue) < self._low or not queue:
+                return difficulty, self._high - len(queue)
+        return None, 0
+
+    def _run(self):
+        """Refill thread: top up queues whenever one drops below low"""
+        while True:
+            with self._condition:
+                difficulty, missing = self._next_to_fill()
+                while difficulty is None and not self._closed:
+                    self._condition.wait()
+                    difficulty, missing = self._next_to_fill()
+                if self._closed:
+                    return
+            for puzzle, solution in _produce(difficulty, missing, self._workers):
+                with self._condition:
+                    if self._closed:
+                        return
+                    self._queues[difficulty].append((puzzle, solution))
+
+
+def _generate(difficulty):
+    """Generate one puzzle in the calling thread"""
+    from ._sudoku import _generate_puzzle
+    return _generate_puzzle(difficulty)
+
+
+def _produce(difficulty, count, workers):
+    """Yield count new puzzles, on worker processes when workers > 1"""
+    if workers > 1:
+        from ._batch import generate_many
+        for item in generate_many(count, difficulty, workers):
+            yield item
+    else:
+        for _ in range(count):
+            yield _generate(difficulty)
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_default_pool():
+    """Return the shared pool used by SudokuBoard, creating it on first use"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = PuzzlePool(difficulties=())
+        return _default_pool
+
+
+def set_default_pool(pool):
+    """Replace the shared pool used by SudokuBoard
+
+    The previous pool is returned and left running.
+    """
+    global _default_pool
+    with _default_lock:
+        previous, _default_pool = _default_pool, pool
+    return previous
@@ -0,0 +1,507 @@
+"""HTTP puzzle service behind ``python -m sudoku serve``.
+
+A small HTTP/1.1 server on ``asyncio`` streams, with no dependency outside the
+standard library. Every endpoint answers JSON and takes its parameters from
+the query string, a JSON object body, or both:
+
+    GET  /generate?difficulty=hard   puzzle, solution and where it came from
+    POST /solve     {"puzzle": ...}  solution, or null if there is none
+    POST /validate  {"board": ...}   repeated digits and completeness
+    POST /hint      {"puzzle": ..., "board": ...}  next logical move
+    GET  /stats                      latency histograms and queue depths
+
+Boards are puzzle strings in the format of the solve command. 9x9 puzzles
+are served from a ``PuzzlePool``, if given, and only generated on demand
+when the pool is dry. Solve requests are micro-batched: puzzles arriving
+within ``batch_delay`` of each other are packed into one ``_solve_chunk``
+task, up to ``batch_size`` per task, so a burst of small requests costs one
+round trip to the workers instead of one each. Every batch is searched under
+a budget of ``timeout`` seconds (and every puzzle under ``max_nodes``
+guesses if given), so adversarial puzzles cannot hold a worker; they are
+answered with a 503. Generation, solving and hints run on an
+``AsyncExecutor``, which bounds the work in flight; the event loop only
+parses, routes and answers.
+
+Connections are kept alive until the client sends ``Connection: close``.
+Request bodies must carry a Content-Length.
+
+Classes:
+    PuzzleServer: The HTTP service
+
+"""
+
+import asyncio
+import http
+import json
+import logging
+import random
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from ._async import _generate_task, get_default_executor
+from ._batch import _solve_chunk
+from ._board import SIZES, CompactBoard
+from ._metrics import LatencyHistogram
+from ._pool import DIFFICULTIES
+from ._solve_engine import ENGINES, GaveUp, solve
+from ._sudoku import SudokuBoard, _unit_slots
+
+# Largest request head and body accepted, in bytes
+_MAX_HEAD = 8192
+_MAX_BODY = 65536
+
+_logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    """An error answered with an HTTP status"""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class PuzzleServer(object):
+    """HTTP service for generating, solving, validating and hinting puzzles
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on, 0 for any free port
+        executor: AsyncExecutor running the work, defaults to the shared one
+        pool: Optional PuzzlePool serving 9x9 puzzles; without one every
+            puzzle is generated on the executor. A pool refilled on its
+            own thread (workers=1) competes with the event loop for the GIL
+        batch_size: Most puzzles solved by one worker task
+        batch_delay: Seconds a solve request waits for others to batch with
+        timeout: Seconds a request may wait for its result, and a batch of
+            puzzles may be searched for
+        max_nodes: Optional most guesses the search of a puzzle may make
+    """
+
+    def __init__(self, host='127.0.0.1', port=8080, executor=None, pool=None,
+                 batch_size=64, batch_delay=0.002, timeout=10.0, max_nodes=None):
+        super().__init__()
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self._host = host
+        self._port = port
+        self._executor = executor or get_default_executor()
+        self._pool = pool
+        self._timeout = timeout
+        self._max_nodes = max_nodes
+        self._batcher = _SolveBatcher(self._executor, batch_size, batch_delay,
+                                      (timeout, max_nodes))
+        self._server = None
+        self._connections = {}  # Task serving each open connection -> its writer
+        self._started = None
+        self._latency = {path: LatencyHistogram() for path in _ROUTES}
+        self._statuses = {}
+        self._sources = dict.fromkeys(('pool', 'generated'), 0)
+
+    @property
+    def address(self):
+        """(tuple) Host and port listened on, None before start"""
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self):
+        """Start listening"""
+        if self._server is None:
+            self._server = await asyncio.start_server(
+                self._serve_connection, self._host, self._port, limit=_MAX_HEAD)
+            self._started = time.monotonic()
+
+    async def serve_forever(self):
+        """Listen and answer requests until cancelled"""
+        await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and hang up every open connection
+
+        Requests being answered are abandoned, not waited for.
+        """
+        if self._server is not None:
+            self._server.close()
+            tasks = list(self._connections)
+            for writer in self._connections.values():
+                writer.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def stats(self):
+        """
+        Get the service metrics reported by /stats
+
+        Returns:
+            dict: uptime in seconds; latency, the latency summary in
+                seconds per endpoint; statuses, the count of every response
+                status; batches, the solve batches run and their sizes;
+                generate, the puzzles taken from the pool and generated on
+                demand; executor, the AsyncExecutor stats; and pool, the
+                queued puzzles per difficulty
+        """
+        return {
+            'uptime': 0.0 if self._started is None else time.monotonic() - self._started,
+            'latency': {path: histogram.summary()
+                        for path, histogram in self._latency.items() if histogram.count},
+            'statuses': {str(status): count for status, count in sorted(self._statuses.items())},
+            'batches': self._batcher.stats(),
+            'generate': dict(self._sources),
+            'executor': self._executor.stats(),
+            'pool': {} if self._pool is None else self._pool.sizes(),
+        }
+
+    async def _serve_connection(self, reader, writer):
+        """Answer the requests of one connection in turn"""
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except HTTPError as error:
+                    # The stream position is lost; answer and hang up
+                    writer.write(_response(error.status, {'error': str(error)}, False))
+                    self._count(error.status)
+                    break
+                if message is None:
+                    break
+                start_line, headers, body = message
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = await self._answer(start_line, body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Hung up by the client, or by close
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def _answer(self, start_line, body):
+        """Route a request and return (status, payload)"""
+        started = time.perf_counter()
+        path = None
+        try:
+            try:
+                method, target, _ = start_line.split()
+            except ValueError:
+                raise HTTPError(http.HTTPStatus.BAD_REQUEST, 'Malformed request line')
+            if method not in ('GET', 'POST'):
+                raise HTTPError(http.HTTPStatus.METHOD_NOT_ALLOWED)
+            url = urlsplit(target)
+            if url.path not in _ROUTES:
+                raise HTTPError(http.HTTPStatus.NOT_FOUND, f'No endpoint {url.path}')
+            path = url.path
+            params = dict(parse_qsl(url.query))
+            params.update(_parse_body(body))
+            status, payload = http.HTTPStatus.OK, await getattr(self, _ROUTES[path])(params)
+        except HTTPError as error:
+            status, payload = error.status, {'error': str(error)}
+        except asyncio.TimeoutError:
+            status, payload = http.HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'Timed out'}
+        except Exception:
+            _logger.exception('Failed to answer %s', start_line)
+            status = http.HTTPStatus.INTERNAL_SERVER_ERROR
+            payload = {'error': status.phrase}
+        if path is not None:
+            self._latency[path].add(time.perf_counter() - started)
+        self._count(status)
+        return status, payload
+
+    def _count(self, status):
+        """Count a response status"""
+        self._statuses[status.value] = self._statuses.get(status.value, 0) + 1
+
+    async def _generate(self, params):
+        """Take a puzzle from the pool, or generate one when it is dry"""
+        difficulty = _choice(params, 'difficulty', 'medium', DIFFICULTIES)
+        size = _choice(params, 'size', 9, SIZES)
+        item = None
+        if self._pool is not None and size == 9:
+            item = self._pool.try_get(difficulty)
+        source = 'pool'
+        if item is None:
+            seed = random.getrandbits(64)
+            item = await self._executor.run(_generate_task, difficulty, size, seed,
+                                            timeout=self._timeout)
+            source = 'generated'
+        self._sources[source] += 1
+        puzzle, solution = item
+        return {'puzzle': puzzle.to_string(), 'solution': solution.to_string(),
+                'difficulty': difficulty, 'source': source}
+
+    async def _solve(self, params):
+        """Solve a puzzle in the next batch"""
+        puzzle = _board(params, 'puzzle')
+        engine = _choice(params, 'engine', 'bitmask', ENGINES)
+        solution = await asyncio.wait_for(self._batcher.solve(puzzle, engine), self._timeout)
+        if isinstance(solution, GaveUp):
+            raise _unavailable(solution)
+        return {'solution': None if solution is None else solution.to_string()}
+
+    async def _validate(self, params):
+        """Report the repeated digits of a board"""
+        board = _board(params, 'board')
+        conflicts = _conflicts(board)
+        return {'valid': not conflicts, 'complete': not board.count_empty(),
+                'conflicts': conflicts}
+
+    async def _hint(self, params):
+        """Find the next move for a game in progress"""
+        puzzle = _board(params, 'puzzle')
+        board = _board(params, 'board') if 'board' in params else puzzle
+        if board.size != puzzle.size:
+            raise HTTPError(http.HTTPStatus.BAD_REQUEST, 'board and puzzle differ in size')
+        try:
+            hint = await self._executor.run(_hint_task, puzzle.to_string(), board.to_string(),
+                                            self._timeout, self._max_nodes,
+                                            timeout=self._timeout)
+        except _GameError as error:
+            raise HTTPError(http.HTTPStatus.BAD_REQUEST, str(error))
+        if isinstance(hint, GaveUp):
+            raise _unavailable(hint)
+        if hint is None:
+            return {'hint': None}
+        return {'hint': dict(zip(('row', 'col', 'digit', 'technique'), hint))}
+
+    async def _stats(self, params):
+        """Service metrics"""
+        return self.stats()
+
+
+# Endpoint paths and the PuzzleServer methods answering them
+_ROUTES = {
+    '/generate': '_generate',
+    '/solve': '_solve',
+    '/validate': '_validate',
+    '/hint': '_hint',
+    '/stats': '_stats',
+}
+
+
+class _SolveBatcher(object):
+    """Collect solve requests into batches for the executor
+
+    A batch holds puzzles of one size and engine. It is sent when it is full
+    or batch_delay after its first puzzle arrived, whichever comes first.
+    budget is the (timeout, max_nodes) search budget: max_nodes for every
+    puzzle and timeout for the batch as a whole, so a batch of hard puzzles
+    holds its worker no longer than a single one.
+    """
+
+    def __init__(self, executor, size, delay, budget=(None, None)):
+        super().__init__()
+        self._executor = executor
+        self._size = size
+        self._delay = delay
+        self._budget = budget
+        self._open = {}  # (ncells, engine) -> (timer, [(cells, future), ...])
+        self._tasks = set()  # Batches being solved
+        self._sizes = LatencyHistogram(lowest=1, growth=1.1)
+
+    def solve(self, puzzle, engine):
+        """Queue a puzzle and return a future of its solution, None or GaveUp"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (len(puzzle), engine)
+        if key not in self._open:
+            self._open[key] = (loop.call_later(self._delay, self._flush, key), [])
+        batch = self._open[key][1]
+        batch.append((puzzle.cells, future))
+        if len(batch) >= self._size:
+            self._flush(key)
+        return future
+
+    def stats(self):
+        """Return the number of batches and the puzzles per batch"""
+        sizes = self._sizes
+        return {'count': sizes.count, 'puzzles': int(sizes.total), 'mean': sizes.mean,
+                'p50': sizes.percentile(50), 'max': sizes.max or 0}
+
+    def _flush(self, key):
+        """Send the open batch of a key to the executor"""
+        timer, batch = self._open.pop(key)
+        timer.cancel()
+        # Requests that timed out or went away no longer need solving
+        batch = [(cells, future) for cells, future in batch if not future.done()]
+        if batch:
+            self._sizes.add(len(batch))
+            task = asyncio.ensure_future(self._run(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key, batch):
+        """Solve a batch and resolve the futures of its requests"""
+        ncells, engine = key
+        timeout, max_nodes = self._budget
+        deadline = None if timeout is None else time.time() + timeout
+        try:
+            solved, _, _, gave_up = await self._executor.run(
+                _solve_chunk, (ncells, b''.join(cells for cells, _ in batch)), engine,
+                False, None, max_nodes, deadline)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        gave_up = dict(gave_up)
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                cells = solved[i * ncells:(i + 1) * ncells]
+                future.set_result(CompactBoard(cells) if cells[0] else gave_up.get(i))
+
+
+async def read_message(reader):
+    """
+    Read one HTTP/1.1 request or response from a stream
+
+    Returns:
+        tuple: (start_line, headers, body) with lower-case header names, or
+            None if the stream ends before a message starts
+
+    Raises:
+        HTTPError: If the message is malformed or too large
+        ConnectionError: If the stream ends inside a message
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as error:
+        if not error.partial.strip():
+            return None
+        raise ConnectionResetError('Connection closed inside a message head')
+    except asyncio.LimitOverrunError:
+        raise HTTPError(http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    if 'chunked' in headers.get('transfer-encoding', ''):
+        raise HTTPError(http.HTTPStatus.LENGTH_REQUIRED, 'Chunked bodies are not supported')
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(http.HTTPStatus.BAD_REQUEST, 'Invalid Content-Length')
+    if length > _MAX_BODY:
+        raise HTTPError(http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ConnectionResetError('Connection closed inside a message body')
+    return lines[0], headers, body
+
+
+def format_request(method, target, host, payload=None):
+    """Encode a request with an optional JSON body, keeping the connection alive"""
+    body = b'' if payload is None else json.dumps(payload).encode()
+    head = (f'{method} {target} HTTP/1.1\r\nHost: {host}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n')
+    return head.encode('latin-1') + body
+
+
+def _response(status, payload, keep_alive):
+    """Encode a JSON response"""
+    body = json.dumps(payload).encode()
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n')
+    if not keep_alive:
+        head += 'Connection: close\r\n'
+    return (head + '\r\n').encode('latin-1') + body
+
+
+def _parse_body(body):
+    """Decode a JSON object body into parameters"""
+    if not body.strip():
+        return {}
+    try:
+        params = json.loads(body)
+    except ValueError:
+        raise HTTPError(http.HTTPStatus.BAD_REQUEST, 'Body is not valid JSON')
+    if not isinstance(params, dict):
+        raise HTTPError(http.HTTPStatus.BAD_REQUEST, 'Body must be a JSON object')
+    return params
+
+
+def _unavailable(gave_up):
+    """The 503 answering a puzzle whose search ran out of budget"""
+    return HTTPError(http.HTTPStatus.SERVICE_UNAVAILABLE,
+                     f'Gave up after {gave_up.stats.nodes} guesses ({gave_up.reason})')
+
+
+def _board(params, name):
+    """Parse the board string of a parameter"""
+    if name not in params:
+        raise HTTPError(http.HTTPStatus.BAD_REQUEST, f'Missing parameter {name!r}')
+    text = params[name]
+    if not isinstance(text, str):
+        raise HTTPError(http.HTTPStatus.BAD_REQUEST, f'{name} must be a puzzle string')
+    try:
+        return CompactBoard.from_string(text)
+    except ValueError as error:
+        raise HTTPError(http.HTTPStatus.BAD_REQUEST, str(error))
+
+
+def _choice(params, name, default, choices):
+    """The choice a parameter names, matched as text so '16' selects 16"""
+    value = str(params.get(name, default))
+    for choice in choices:
+        if str(choice) == value:
+            return choice
+    raise HTTPError(http.HTTPStatus.BAD_REQUEST,
+                    f'{name} must be one of {", ".join(map(str, choices))}')
+
+
+def _conflicts(board):
+    """Sorted [row, col] of every cell whose digit repeats in a unit"""
+    cells = board.cells
+    found = set()
+    for unit in _unit_slots(len(cells))[1]:
+        seen = {}
+        for cell in unit:
+            value = cells[cell]
+            if value:
+                if value in seen:
+                    found.update((cell, seen[value]))
+                else:
+                    seen[value] = cell
+    return [list(divmod(cell, board.size)) for cell in sorted(found)]
+
+
+class _GameError(ValueError):
+    """A hint request whose puzzle and board do not make a game"""
+
+
+def _hint_task(puzzle, board, timeout=None, max_nodes=None):
+    """Worker task: the next move of a game as (row, col, digit, technique)
+
+    The puzzle is solved under the (timeout, max_nodes) search budget; a
+    GaveUp is returned if it runs out.
+
+    Raises:
+        _GameError: If the puzzle has no solution or the board changes a
+            given
+    """
+    puzzle = CompactBoard.from_string(puzzle)
+    solution = puzzle.copy()
+    solved = solve(solution, 'bitmask', None, timeout, max_nodes)
+    if isinstance(solved, GaveUp):
+        return solved
+    if not solved:
+        raise _GameError('Puzzle has no solution')
+    game = SudokuBoard.from_puzzle(puzzle, solution)
+    board = CompactBoard.from_string(board)
+    size = board.size
+    for cell, value in enumerate(board.cells):
+        if not game.set_cell(cell // size, cell % size, value) and \
+                game.get_cell(cell // size, cell % size) != value:
+            raise _GameError('board changes a given of the puzzle')
+    hint = game.find_hint()
+    return None if hint is None else tuple(hint[:4])
@@ -1,83 +1,352 @@
-"""Sudoku solving engine using backtracking algorithm.
+"""Sudoku solving engines.
 
-This module implements a backtracking algorithm to solve Sudoku puzzles. The solver
-recursively fills empty cells by trying digits 1-9 and backtracking when conflicts
-are detected.
+This module implements the solvers used by the package. Three engines are
+available and can be selected by name:
 
-The algorithm checks three constraints for each placement:
+- ``'bitmask'`` (default): constraint propagation over per-row, per-column and
+  per-box digit bitmasks. Naked and hidden singles are placed until the grid
+  stops changing, then the search branches on the empty cell with the minimum
+  remaining values (MRV).
+- ``'dlx'``: Knuth's Dancing Links over the exact-cover formulation, see
+  ``_dlx``. It is the default for counting and enumerating solutions.
+- ``'backtrack'``: the original reference solver. It recursively fills empty
+  cells by trying digits 1-9 and backtracking when conflicts are detected.
+
+All engines enforce the same three constraints for each placement:
 - No duplicate in the same row
 - No duplicate in the same column
 - No duplicate in the same 3x3 box
 
+The engines also take the other board sizes (4x4, 16x16 and 25x25, see
+``_board``); only ``'bitmask'`` and ``'dlx'`` are practical beyond 9x9.
+
+Every entry point takes an optional ``SolveStats`` (see ``_metrics``) that the
+engines fill with search-tree counters and the wall time.
+
+``solve`` and ``count_solutions`` also take a search budget: a timeout, a
+maximum number of guesses (search nodes) and a cancellation event. Engines
+charge the budget through the same per-guess hook that feeds ``SolveStats``,
+so unbudgeted searches pay nothing for it. A search that runs out is unwound,
+leaving the board untouched, and the call returns a falsy ``GaveUp`` holding
+the reason and the statistics of the partial search instead of ``False``.
+
+Classes:
+    GaveUp: Falsy result of a search stopped by its budget
+
 Functions:
     solve: Main entry point to solve a Sudoku puzzle
+    iter_solutions: Lazily yield every solution of a puzzle
+    count_solutions: Count the solutions of a puzzle up to a limit
     is_valid_board: Validate that a board state has no conflicts
 
 """
 
+import time
+
+from . import _dlx
+from ._board import CompactBoard, flatten, write_cells
+from ._metrics import SolveStats
+
+ENGINES = ('bitmask', 'dlx', 'backtrack')
+
+# Box side length for every supported board side length
+_BASE_OF_SIZE = {4: 2, 9: 3, 16: 4, 25: 5}
+
+# Guesses between two checks of the clock and the cancellation event
+_POLL_INTERVAL = 16
+
+
+class GaveUp(object):
+    """Result of a search stopped before it could finish
+
+    Falsy, like the ``False`` of an unsolvable puzzle, so plain truth tests
+    keep working; compare with ``is False`` or check the type to tell the
+    two apart.
+
+    Attributes:
+        reason: 'timeout', 'nodes' (guess budget spent) or 'cancelled'
+        stats: SolveStats of the partial search; for a count, solutions
+            holds the solutions found before stopping
+    """
+
+    __slots__ = ('reason', 'stats')
+
+    def __init__(self, reason, stats):
+        super().__init__()
+        self.reason = reason
+        self.stats = stats
+
+    def __bool__(self):
+        return False
+
+    def __reduce__(self):
+        return GaveUp, (self.reason, self.stats)
+
+    def __repr__(self):
+        return f'GaveUp({self.reason!r}, nodes={self.stats.nodes})'
+
+
+class _OutOfBudget(Exception):
+    """Raised from the per-guess hook to unwind a search"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Budget(object):
+    """Per-guess hook enforcing a timeout, guess budget and cancellation event
+
+    Args:
+        timeout: Seconds from now, or None
+        max_nodes: Most guesses allowed, or None
+        cancel: Object with an ``is_set`` method such as a threading.Event,
+            or None
+        on_node: Hook of the caller's SolveStats, called first
+    """
+
+    __slots__ = ('deadline', 'max_nodes', 'cancel', 'on_node', 'nodes')
+
+    def __init__(self, timeout, max_nodes, cancel, on_node=None):
+        super().__init__()
+        self.deadline = None if timeout is None else time.perf_counter() + timeout
+        self.max_nodes = max_nodes
+        self.cancel = cancel
+        self.on_node = on_node
+        self.nodes = 0
+
+    def __call__(self, depth, cell, digit):
+        if self.on_node is not None:
+            self.on_node(depth, cell, digit)
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise _OutOfBudget('nodes')
+        if not self.nodes % _POLL_INTERVAL:
+            self.poll()
+
+    def poll(self):
+        """Raise _OutOfBudget if the deadline passed or the search was cancelled"""
+        if self.cancel is not None and self.cancel.is_set():
+            raise _OutOfBudget('cancelled')
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise _OutOfBudget('timeout')
+
+
+def _limited(run, stats, timeout, max_nodes, cancel):
+    """Call run(search_stats) under a budget, returning GaveUp when it runs out
+
+    The search gets its own SolveStats carrying the budget hook; its
+    counters and time are added to stats afterwards.
+    """
+    on_node = None if stats is None else stats.on_node
+    search_stats = SolveStats(on_node=_Budget(timeout, max_nodes, cancel, on_node))
+    started = time.perf_counter()
+    try:
+        search_stats.on_node.poll()
+        result = run(search_stats)
+    except _OutOfBudget as error:
+        result = GaveUp(error.reason, search_stats)
+    finally:
+        search_stats.elapsed += time.perf_counter() - started
+        search_stats.on_node = None
+        if stats is not None:
+            stats.merge(search_stats)
+    return result
+
+
+def solve(board, engine='bitmask', stats=None, timeout=None, max_nodes=None, cancel=None):
+    """
+    Solve a sudoku puzzle in place
+    
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        engine: Name of the solving engine, one of ``ENGINES``
+        stats: Optional SolveStats to update
+        timeout: Optional seconds to search for
+        max_nodes: Optional most guesses to make
+        cancel: Optional threading.Event (or any object with ``is_set``)
+            that stops the search once set
+    
+    Returns:
+        bool: True if solved successfully, False otherwise, or a falsy
+            GaveUp if the search stopped first; the board is then unchanged
+    """
+    if timeout is not None or max_nodes is not None or cancel is not None:
+        return _limited(lambda stats: _solve(board, engine, stats), stats,
+                        timeout, max_nodes, cancel)
+    if stats is None:
+        return _solve(board, engine, None)
+    started = time.perf_counter()
+    try:
+        return _solve(board, engine, stats)
+    finally:
+        stats.elapsed += time.perf_counter() - started
+
+
+def _solve(board, engine, stats):
+    """Dispatch to the named engine"""
+    if engine == 'bitmask':
+        return _solve_bitmask(board, stats)
+    if engine == 'dlx':
+        return _dlx.solve(board, stats)
+    if engine == 'backtrack':
+        if isinstance(board, CompactBoard):
+            board = board.rows
+        if stats is None or not isinstance(stats.on_node, _Budget):
+            return _solve_backtrack(board, stats)
+        # The guesses are undone as the search returns, not when it is unwound
+        cells = list(flatten(board))
+        try:
+            return _solve_backtrack(board, stats)
+        except _OutOfBudget:
+            write_cells(board, cells)
+            raise
+    raise ValueError(f"Unknown engine: {engine!r} (expected one of {ENGINES})")
+
+
+def iter_solutions(board, engine='dlx', stats=None):
+    """
+    Lazily yield every solution of a puzzle without modifying it
+    
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        engine: 'dlx' or 'bitmask'
+        stats: Optional SolveStats to update; elapsed only counts the time
+            spent inside the search, not in the caller between solutions
+    
+    Returns:
+        iterator: A new 9x9 2D list for each solution
+    """
+    if engine == 'dlx':
+        solutions = _dlx.iter_solutions(board, stats)
+    elif engine == 'bitmask':
+        solutions = _iter_bitmask(board, stats)
+    else:
+        raise ValueError(f"Engine {engine!r} cannot enumerate solutions")
+    if stats is None:
+        return solutions
+    return _timed(solutions, stats)
+
+
+def _timed(iterator, stats):
+    """Yield from iterator, adding the time spent producing items to stats"""
+    clock = time.perf_counter
+    started = clock()
+    for item in iterator:
+        stats.elapsed += clock() - started
+        yield item
+        started = clock()
+    stats.elapsed += clock() - started
+
 
-def solve(board):
+def count_solutions(board, limit=2, engine='dlx', stats=None, timeout=None, max_nodes=None,
+                    cancel=None):
     """
-    Solve a sudoku puzzle using backtracking
+    Count the solutions of a puzzle, stopping once limit is reached
     
     Args:
-        board: 9x9 2D list representing the sudoku board (0 for empty cells)
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        limit: Maximum number of solutions to look for
+        engine: 'dlx' or 'bitmask'
+        stats: Optional SolveStats to update
+        timeout: Optional seconds to search for
+        max_nodes: Optional most guesses to make
+        cancel: Optional threading.Event (or any object with ``is_set``)
+            that stops the search once set
     
     Returns:
-        bool: True if solved successfully, False otherwise
+        int: Number of solutions found (never more than limit), or a falsy
+            GaveUp if the search stopped first
     """
-    return _solve_backtrack(board)
+    if timeout is not None or max_nodes is not None or cancel is not None:
+        return _limited(lambda stats: _count(board, limit, engine, stats), stats,
+                        timeout, max_nodes, cancel)
+    if stats is None:
+        return _count(board, limit, engine, None)
+    started = time.perf_counter()
+    try:
+        return _count(board, limit, engine, stats)
+    finally:
+        stats.elapsed += time.perf_counter() - started
 
 
-def _solve_backtrack(board):
+def _count(board, limit, engine, stats):
+    """Count solutions with the named engine"""
+    if engine == 'dlx':
+        return _dlx.count_solutions(board, limit, stats)
+    if engine != 'bitmask':
+        raise ValueError(f"Engine {engine!r} cannot enumerate solutions")
+    count = 0
+    if limit > 0:
+        search = _iter_bitmask(board, stats)
+        for _ in search:
+            count += 1
+            if count >= limit:
+                search.close()
+                break
+    return count
+
+
+def _solve_backtrack(board, stats=None, depth=0):
     """Internal backtracking solver"""
     # Find next empty cell
     empty = _find_empty_cell(board)
     if not empty:
+        if stats is not None:
+            stats.solutions += 1
         return True  # No empty cells, puzzle is solved
     
     row, col = empty
+    size = len(board)
+    base = _BASE_OF_SIZE[size]
     
     # Try digits 1-9
-    for num in range(1, 10):
-        if _is_valid(board, row, col, num):
+    tried = False
+    for num in range(1, size + 1):
+        if _is_valid(board, row, col, num, size, base):
             board[row][col] = num
+            if stats is not None:
+                tried = True
+                stats.node(depth + 1, row * size + col, num)
             
-            if _solve_backtrack(board):
+            if _solve_backtrack(board, stats, depth + 1):
                 return True
             
             # Backtrack
             board[row][col] = 0
     
+    if stats is not None and not tried:
+        stats.backtracks += 1  # Dead end: no digit fits this cell
     return False
 
 
 def _find_empty_cell(board):
     """Find the next empty cell (with value 0)"""
-    for i in range(9):
-        for j in range(9):
+    size = len(board)
+    for i in range(size):
+        for j in range(size):
             if board[i][j] == 0:
                 return (i, j)
     return None
 
 
-def _is_valid(board, row, col, num):
+def _is_valid(board, row, col, num, size=9, base=3):
     """Check if placing num at board[row][col] is valid"""
     # Check row
-    for j in range(9):
+    for j in range(size):
         if board[row][j] == num:
             return False
     
     # Check column
-    for i in range(9):
+    for i in range(size):
         if board[i][col] == num:
             return False
     
     # Check 3x3 box
-    box_row = (row // 3) * 3
-    box_col = (col // 3) * 3
-    for i in range(box_row, box_row + 3):
-        for j in range(box_col, box_col + 3):
+    box_row = (row // base) * base
+    box_col = (col // base) * base
+    for i in range(box_row, box_row + base):
+        for j in range(box_col, box_col + base):
             if board[i][j] == num:
                 return False
     
@@ -89,18 +358,320 @@ def is_valid_board(board):
     Check if the current board state is valid (no conflicts)
     
     Args:
-        board: 9x9 2D list representing the sudoku board
+        board: 9x9 2D list or CompactBoard
     
     Returns:
         bool: True if valid, False otherwise
     """
-    for i in range(9):
-        for j in range(9):
+    if isinstance(board, CompactBoard):
+        board = board.to_rows()  # Plain lists; row views are slow to index
+    size = len(board)
+    base = _BASE_OF_SIZE[size]
+    for i in range(size):
+        for j in range(size):
             if board[i][j] != 0:
                 num = board[i][j]
                 board[i][j] = 0  # Temporarily remove to check
-                if not _is_valid(board, i, j, num):
+                if not _is_valid(board, i, j, num, size, base):
                     board[i][j] = num
                     return False
                 board[i][j] = num
     return True
+
+
+# ---------------------------------------------------------------------------
+# Bitmask engine
+#
+# Cells are addressed by their flat index (row * 9 + col). Digit d is stored
+# as bit (1 << (d - 1)) so a row, column or box is described by a single int
+# holding the digits already placed in it.
+# ---------------------------------------------------------------------------
+
+def _build_tables(base):
+    """Precompute the lookup tables used by the bitmask engine"""
+    size = base * base
+    ncells = size * size
+    row_of = [cell // size for cell in range(ncells)]
+    col_of = [cell % size for cell in range(ncells)]
+    box_of = [(row_of[cell] // base) * base + col_of[cell] // base
+              for cell in range(ncells)]
+    # (cells, kind, index) where kind selects the rows, cols or boxes masks
+    units = []
+    for i in range(size):
+        for kind, unit_of in enumerate((row_of, col_of, box_of)):
+            units.append(([cell for cell in range(ncells) if unit_of[cell] == i],
+                          kind, i))
+    if size <= 16:
+        bit_count = [bin(mask).count('1') for mask in range(1 << size)]
+    else:
+        bit_count = _PopCount()  # A 2**25 entry table would take 256MB
+    return size, ncells, (1 << size) - 1, row_of, col_of, box_of, units, bit_count
+
+
+class _PopCount(object):
+    """Stands in for the bit count table where it would be too large"""
+
+    __slots__ = ()
+
+    def __getitem__(self, mask):
+        return bin(mask).count('1')
+
+
+(_SIZE, _NCELLS, _ALL, _ROW_OF, _COL_OF, _BOX_OF,
+ _UNITS, _BIT_COUNT) = _build_tables(3)
+
+_TABLE_NAMES = ('SIZE', 'NCELLS', 'ALL', 'ROW_OF', 'COL_OF', 'BOX_OF', 'UNITS', 'BIT_COUNT')
+
+
+class _BitmaskSearch(object):
+    """Search state for the bitmask engine
+
+    Holds the flat cell values together with the digits used by every row,
+    column and box. ``valid`` is False when the givens already conflict.
+    ``stats`` is an optional SolveStats updated by ``solutions``.
+
+    The lookup tables are class attributes for 9x9 boards; other sizes get a
+    subclass with their own tables, picked from the number of cells.
+    """
+
+    __slots__ = ('cells', 'rows', 'cols', 'boxes', 'valid', 'stats')
+
+    (SIZE, NCELLS, ALL, ROW_OF, COL_OF, BOX_OF,
+     UNITS, BIT_COUNT) = (_SIZE, _NCELLS, _ALL, _ROW_OF, _COL_OF, _BOX_OF,
+                          _UNITS, _BIT_COUNT)
+
+    def __new__(cls, cells, stats=None):
+        if cls is _BitmaskSearch and len(cells) != _NCELLS:
+            cls = _search_class(len(cells))
+        return object.__new__(cls)
+
+    def __init__(self, cells, stats=None):
+        size = self.SIZE
+        self.cells = [0] * self.NCELLS
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.boxes = [0] * size
+        self.valid = True
+        self.stats = stats
+        for cell, digit in enumerate(cells):
+            if not digit:
+                continue
+            bit = 1 << (digit - 1)
+            if bit & ~self.candidates(cell):
+                self.valid = False
+            self.place(cell, bit)
+
+    def candidates(self, cell):
+        """Bitmask of digits that can still go in an empty cell"""
+        return self.ALL & ~(self.rows[self.ROW_OF[cell]] | self.cols[self.COL_OF[cell]]
+                            | self.boxes[self.BOX_OF[cell]])
+
+    def place(self, cell, bit):
+        """Put the digit for ``bit`` into ``cell``"""
+        self.cells[cell] = bit.bit_length()
+        self.rows[self.ROW_OF[cell]] |= bit
+        self.cols[self.COL_OF[cell]] |= bit
+        self.boxes[self.BOX_OF[cell]] |= bit
+
+    def unplace(self, cell):
+        """Clear ``cell`` and release its digit"""
+        bit = ~(1 << (self.cells[cell] - 1))
+        self.cells[cell] = 0
+        self.rows[self.ROW_OF[cell]] &= bit
+        self.cols[self.COL_OF[cell]] &= bit
+        self.boxes[self.BOX_OF[cell]] &= bit
+
+    def propagate(self, trail):
+        """Place naked and hidden singles until nothing changes
+
+        Every placed cell is appended to ``trail`` so the caller can undo it.
+
+        Returns:
+            tuple: (ok, cell, mask) where ok is False on a contradiction,
+                cell is the MRV cell to branch on (-1 when the grid is full)
+                and mask holds its candidates
+        """
+        cells, rows, cols, boxes = self.cells, self.rows, self.cols, self.boxes
+        used_by_kind = (rows, cols, boxes)
+        place = self.place
+        all_digits, row_of, col_of, box_of = self.ALL, self.ROW_OF, self.COL_OF, self.BOX_OF
+        bit_count = self.BIT_COUNT
+        ncells = self.NCELLS
+        empty = [cell for cell in range(ncells) if not cells[cell]]
+        while True:
+            masks = [0] * ncells
+            best, best_mask, best_count = -1, 0, self.SIZE + 1
+            placed = False
+
+            # Naked singles, and the MRV cell in the same pass
+            remaining = []
+            for cell in empty:
+                if cells[cell]:
+                    continue
+                mask = all_digits & ~(rows[row_of[cell]] | cols[col_of[cell]]
+                                      | boxes[box_of[cell]])
+                if not mask:
+                    return False, -1, 0
+                count = bit_count[mask]
+                if count == 1:
+                    place(cell, mask)
+                    trail.append(cell)
+                    placed = True
+                else:
+                    remaining.append(cell)
+                    masks[cell] = mask
+                    if count < best_count:
+                        best, best_mask, best_count = cell, mask, count
+            empty = remaining
+            if placed:
+                continue
+            if best < 0:
+                return True, -1, 0
+
+            # Hidden singles: a digit with a single home in some unit
+            for unit, kind, index in self.UNITS:
+                once = twice = 0
+                for cell in unit:
+                    mask = masks[cell]
+                    twice |= once & mask
+                    once |= mask
+                used = used_by_kind[kind][index]
+                if (once | used) != all_digits:
+                    return False, -1, 0
+                hidden = once & ~twice & ~used
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for cell in unit:
+                        if masks[cell] & bit:
+                            break
+                    if cells[cell]:
+                        # Already filled earlier in this pass
+                        if cells[cell] != bit.bit_length():
+                            return False, -1, 0
+                        continue
+                    if not self.candidates(cell) & bit:
+                        return False, -1, 0
+                    place(cell, bit)
+                    trail.append(cell)
+                    placed = True
+            if not placed:
+                return True, best, best_mask
+
+    def solutions(self, depth=0):
+        """Yield ``cells`` each time the grid is completely filled
+
+        The state is restored when the generator is exhausted or closed, so
+        callers must copy a solution before resuming or closing it.
+        """
+        stats = self.stats
+        trail = []
+        try:
+            ok, cell, mask = self.propagate(trail)
+            if stats is not None:
+                stats.propagations += len(trail)
+                if not ok:
+                    stats.backtracks += 1
+                elif cell < 0:
+                    stats.solutions += 1
+            if not ok:
+                return
+            if cell < 0:
+                yield self.cells
+                return
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                self.place(cell, bit)
+                if stats is not None:
+                    stats.node(depth + 1, cell, bit.bit_length())
+                try:
+                    yield from self.solutions(depth + 1)
+                finally:
+                    self.unplace(cell)
+        finally:
+            for cell in trail:
+                self.unplace(cell)
+
+    def has_solution(self):
+        """Check whether the current grid can be completed"""
+        search = self.solutions()
+        try:
+            for _ in search:
+                return True
+            return False
+        finally:
+            search.close()
+
+    def try_remove(self, cell):
+        """Clear a given if the puzzle keeps a unique solution
+
+        The current givens must have exactly one solution. Clearing ``cell``
+        keeps it unique exactly when no completion puts a different digit
+        there, so only those alternatives are searched.
+
+        Returns:
+            bool: True if the cell was cleared, False if it was kept
+        """
+        digit = self.cells[cell]
+        keep = 1 << (digit - 1)
+        self.unplace(cell)
+        others = self.candidates(cell) & ~keep
+        while others:
+            bit = others & -others
+            others ^= bit
+            self.place(cell, bit)
+            found = self.has_solution()
+            self.unplace(cell)
+            if found:
+                self.place(cell, keep)
+                return False
+        return True
+
+    def first_solution(self):
+        """Return a copy of the first solution found, or None"""
+        search = self.solutions()
+        try:
+            for cells in search:
+                return list(cells)
+        finally:
+            search.close()
+        return None
+
+
+_search_classes = {_NCELLS: _BitmaskSearch}
+
+
+def _search_class(ncells):
+    """The _BitmaskSearch subclass for boards of ncells cells"""
+    cls = _search_classes.get(ncells)
+    if cls is None:
+        base = {16: 2, 256: 4, 625: 5}.get(ncells)
+        if base is None:
+            raise ValueError(f'Unsupported board with {ncells} cells')
+        namespace = dict(zip(_TABLE_NAMES, _build_tables(base)), __slots__=())
+        cls = _search_classes[ncells] = type(f'_BitmaskSearch{base * base}',
+                                             (_BitmaskSearch,), namespace)
+    return cls
+
+
+def _solve_bitmask(board, stats=None):
+    """Internal constraint-propagation solver"""
+    search = _BitmaskSearch(flatten(board), stats)
+    if not search.valid:
+        return False
+    cells = search.first_solution()
+    if cells is None:
+        return False
+    write_cells(board, cells)
+    return True
+
+
+def _iter_bitmask(board, stats=None):
+    """Internal solution enumerator for the bitmask engine"""
+    search = _BitmaskSearch(flatten(board), stats)
+    if not search.valid:
+        return
+    for cells in search.solutions():
+        size = search.SIZE
+        yield [cells[i * size:(i + 1) * size] for i in range(size)]
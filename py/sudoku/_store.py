@@ -0,0 +1,470 @@
+"""Binary puzzle store with memory-mapped random access.
+
+Text packs have to be parsed line by line and cannot be seeked by puzzle
+number. A ``PuzzleStore`` file holds fixed-width records instead, so record
+``i`` sits at a known offset and reading it is a slice of a memory map:
+
+    header   64 bytes: magic, version, board size, bits per cell, record
+             size, flags, record count and index offset, little-endian
+    records  puzzle cells, solution cells, difficulty byte, flags byte
+    index    optional: per difficulty, the numbers of its records
+
+Cells are packed two to a byte for 4x4 and 9x9 boards, 41 bytes for a 9x9
+grid, and one to a byte for 16x16 and 25x25 boards, so a 9x9 record is 84
+bytes against 164 for a line of text with its solution.
+
+``store[i]`` returns a ``StoredPuzzle`` whose boards are ``PackedBoard``
+views over the mapped file: nothing is copied or unpacked until a cell is
+read or ``to_board`` is called. The views keep the map alive, so the file
+stays mapped until the store and every view taken from it are gone.
+
+Classes:
+    PuzzleStore: Reader and writer of a binary puzzle file
+    PackedBoard: Read-only board view over a packed record
+    StoredPuzzle: Puzzle, solution and difficulty of one record
+
+"""
+
+import collections
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from ._board import _BASE_OF, _SIZE_OF, CompactBoard, board_size
+from ._pool import DIFFICULTIES
+
+_MAGIC = b'SDKP'
+_VERSION = 1
+# Magic, version, size, bits per cell, record size, flags, count, index offset
+_HEADER = struct.Struct('<4sHBBHHQQ')
+_HEADER_SIZE = 64
+
+# Store flags
+_INDEXED = 1
+
+# Record flags
+_HAS_SOLUTION = 1
+
+# Difficulty byte: 0 when unknown, else 1 + position in DIFFICULTIES
+_CODES = {difficulty: code for code, difficulty in enumerate(DIFFICULTIES, 1)}
+_CODES[None] = 0
+_NAMES = (None,) + DIFFICULTIES
+
+# Unpacking tables: high and low nibble of every byte, and packing the high one
+_HIGH = bytes(value >> 4 for value in range(256))
+_LOW = bytes(value & 15 for value in range(256))
+_SHIFT = bytes((value << 4) & 255 for value in range(256))
+
+StoredPuzzle = collections.namedtuple('StoredPuzzle', 'puzzle solution difficulty')
+StoredPuzzle.__doc__ = """One record of a PuzzleStore
+
+Attributes:
+    puzzle: PackedBoard view of the puzzle
+    solution: PackedBoard view of the solution, None if not stored
+    difficulty: 'easy', 'medium', 'hard' or None
+"""
+
+
+def _cell_bits(size):
+    """Bits per packed cell: nibbles while the values fit, bytes above"""
+    return 4 if size < 16 else 8
+
+
+def _packed_size(ncells, bits):
+    """Bytes taken by ncells packed cells"""
+    return (ncells + 1) // 2 if bits == 4 else ncells
+
+
+def _pack(cells, bits):
+    """Pack cell values into a record field"""
+    if bits == 8:
+        return bytes(cells)
+    if len(cells) % 2:
+        cells = cells + b'\0'
+    # High nibbles and low nibbles occupy disjoint bits: OR them as integers
+    high = int.from_bytes(cells[0::2].translate(_SHIFT), 'big')
+    low = int.from_bytes(cells[1::2], 'big')
+    return (high | low).to_bytes(len(cells) // 2, 'big')
+
+
+def _unpack(data, ncells, bits):
+    """Unpack a record field into a bytearray of ncells cell values"""
+    if bits == 8:
+        return bytearray(data)
+    data = bytes(data)
+    cells = bytearray(2 * len(data))
+    cells[0::2] = data.translate(_HIGH)
+    cells[1::2] = data.translate(_LOW)
+    del cells[ncells:]
+    return cells
+
+
+class PackedBoard(Sequence):
+    """Read-only board over packed cells of a PuzzleStore record
+
+    Cells are read by flat index or ``(row, col)`` like a CompactBoard and
+    unpacked on access. ``to_board`` unpacks the whole board into a new
+    CompactBoard for solving or editing.
+
+    Args:
+        data: Buffer holding the packed cells
+        ncells: Number of cells of the board
+        bits: Bits per packed cell, 4 or 8
+    """
+
+    __slots__ = ('_data', '_ncells', '_bits')
+
+    def __init__(self, data, ncells, bits):
+        self._data = data
+        self._ncells = ncells
+        self._bits = bits
+
+    @property
+    def size(self):
+        """(int) Side length of the board"""
+        return _SIZE_OF[self._ncells]
+
+    @property
+    def base(self):
+        """(int) Side length of a box"""
+        return _BASE_OF[self._ncells]
+
+    def to_board(self):
+        """Return the cells unpacked into a new CompactBoard"""
+        return CompactBoard(_unpack(self._data, self._ncells, self._bits))
+
+    def to_string(self, empty='.'):
+        """Return the string form of the board"""
+        return self.to_board().to_string(empty)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            row, col = index
+            index = row * _SIZE_OF[self._ncells] + col
+        if isinstance(index, slice):
+            return self.to_board().cells[index]
+        if index < 0:
+            index += self._ncells
+        if not 0 <= index < self._ncells:
+            raise IndexError('cell index out of range')
+        if self._bits == 8:
+            return self._data[index]
+        value = self._data[index >> 1]
+        return value & 15 if index & 1 else value >> 4
+
+    def __len__(self):
+        return self._ncells
+
+    def __iter__(self):
+        return iter(self.to_board().cells)
+
+    def __eq__(self, other):
+        if isinstance(other, PackedBoard):
+            return self._bits == other._bits and self._ncells == other._ncells \
+                and self._data == other._data
+        if isinstance(other, CompactBoard):
+            return self.to_board() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(bytes(self.to_board().cells))
+
+    def __repr__(self):
+        return f'PackedBoard({self.to_string()!r})'
+
+
+class PuzzleStore(object):
+    """Binary file of fixed-width puzzle records
+
+    Open an existing file with mode 'r' to read it through a memory map,
+    'w' to create or truncate one, and 'a' to add records to an existing
+    one (or create it). Written records become visible to readers when the
+    store is closed, which also writes the difficulty index.
+
+    Args:
+        path: File of the store
+        mode: 'r', 'w' or 'a'
+        size: Side length of the boards of a new store
+        index: Write the difficulty index on close (writing modes)
+
+    Raises:
+        ValueError: If the file is not a puzzle store, or size is unsupported
+    """
+
+    def __init__(self, path, mode='r', size=9, index=True):
+        super().__init__()
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError(f"mode must be 'r', 'w' or 'a', not {mode!r}")
+        self._path = path
+        self._index = index
+        self._file = None
+        self._map = None
+        self._view = None
+        self._difficulties = None  # difficulty byte of every record, when writing
+        if mode == 'w' or (mode == 'a' and not os.path.exists(path)):
+            board_size(size * size)
+            self._file = open(path, 'w+b')
+            self._set_layout(size, 0, 0, 0)
+            self._difficulties = array('B')
+            self._write_header()
+            return
+
+        self._file = open(path, 'rb' if mode == 'r' else 'r+b')
+        try:
+            self._read_header()
+            if mode == 'r':
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+            else:
+                self._difficulties = array('B', self._scan_difficulties())
+                # Records are appended over the old index, rewritten on close
+                self._file.truncate(self._end)
+                self._file.seek(self._end)
+                self._flags &= ~_INDEXED
+                self._index_offset = 0
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def size(self):
+        """(int) Side length of the boards"""
+        return self._size
+
+    @property
+    def record_size(self):
+        """(int) Bytes per record"""
+        return self._record_size
+
+    @property
+    def indexed(self):
+        """(bool) Whether the file has a difficulty index"""
+        return bool(self._flags & _INDEXED)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        view = self._record(index)
+        field = self._field
+        solution = None
+        if view[-1] & _HAS_SOLUTION:
+            solution = PackedBoard(view[field:2 * field], self._ncells, self._bits)
+        return StoredPuzzle(PackedBoard(view[:field], self._ncells, self._bits),
+                            solution, _NAMES[view[-2]])
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def puzzles(self, start=0, stop=None):
+        """
+        Unpack the puzzles of a range of records
+
+        Args:
+            start: First record
+            stop: Record to stop before, None for the end
+
+        Yields:
+            CompactBoard: Each puzzle, ready for solve_many
+        """
+        field = self._field
+        for i in range(*slice(start, stop).indices(self._count)):
+            yield CompactBoard(_unpack(self._record(i)[:field], self._ncells, self._bits))
+
+    def solutions(self, start=0, stop=None):
+        """Unpack the solutions of a range of records, None where not stored"""
+        field = self._field
+        for i in range(*slice(start, stop).indices(self._count)):
+            view = self._record(i)
+            if view[-1] & _HAS_SOLUTION:
+                yield CompactBoard(_unpack(view[field:2 * field], self._ncells, self._bits))
+            else:
+                yield None
+
+    def with_difficulty(self, difficulty):
+        """
+        Get the numbers of the records of one difficulty
+
+        Read from the index when the file has one, otherwise found by
+        scanning the difficulty byte of every record.
+
+        Args:
+            difficulty: 'easy', 'medium', 'hard' or None for unknown
+
+        Returns:
+            Sequence of int: Record numbers in file order
+        """
+        code = _CODES[difficulty]
+        if not self.indexed:
+            return array('I', (i for i, value in enumerate(self._scan_difficulties())
+                               if value == code))
+        offset = self._index_offset
+        bounds = self._view[offset:offset + 4 * (len(_NAMES) + 1)].cast('I')
+        if sys.byteorder == 'big':
+            bounds = array('I', bounds)
+            bounds.byteswap()
+        start = offset + 4 * (len(_NAMES) + 1 + bounds[code])
+        numbers = self._view[start:start + 4 * (bounds[code + 1] - bounds[code])].cast('I')
+        if sys.byteorder == 'big':
+            numbers = array('I', numbers)
+            numbers.byteswap()
+        return numbers
+
+    def append(self, puzzle, solution=None, difficulty=None):
+        """
+        Write a record at the end of the store
+
+        Args:
+            puzzle: The puzzle, any board accepted by CompactBoard.coerce
+            solution: Its solution, or None
+            difficulty: 'easy', 'medium', 'hard' or None
+
+        Raises:
+            ValueError: If a board does not match the size of the store
+        """
+        if self._difficulties is None:
+            raise ValueError('Store is not open for writing')
+        code = _CODES[difficulty]
+        puzzle = CompactBoard.coerce(puzzle).cells
+        if len(puzzle) != self._ncells:
+            raise ValueError(f'Expected a {self._size}x{self._size} puzzle')
+        flags = 0
+        if solution is None:
+            packed_solution = bytes(self._field)
+        else:
+            solution = CompactBoard.coerce(solution).cells
+            if len(solution) != self._ncells:
+                raise ValueError(f'Expected a {self._size}x{self._size} solution')
+            packed_solution = _pack(solution, self._bits)
+            flags |= _HAS_SOLUTION
+        self._file.write(_pack(puzzle, self._bits) + packed_solution + bytes((code, flags)))
+        self._difficulties.append(code)
+        self._count += 1
+
+    def extend(self, pairs, difficulty=None):
+        """Write (puzzle, solution) pairs, as yielded by generate_many"""
+        for puzzle, solution in pairs:
+            self.append(puzzle, solution, difficulty)
+
+    def close(self):
+        """Finish writing the header and index, and release the file"""
+        if self._file is None:
+            return
+        try:
+            if self._difficulties is not None:
+                if self._index:
+                    self._write_index()
+                self._write_header()
+        finally:
+            self._view = None
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:
+                    pass  # Boards still point into the map; it closes with them
+                self._map = None
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f'PuzzleStore({self._path!r}, {self._size}x{self._size}, {self._count} records)'
+
+    def _set_layout(self, size, flags, count, index_offset):
+        """Derive the record layout of a size and store the header fields"""
+        self._size = size
+        self._ncells = size * size
+        self._bits = _cell_bits(size)
+        self._field = _packed_size(self._ncells, self._bits)
+        self._record_size = 2 * self._field + 2
+        self._flags = flags
+        self._count = count
+        self._index_offset = index_offset
+
+    @property
+    def _end(self):
+        """File offset just past the last record"""
+        return _HEADER_SIZE + self._count * self._record_size
+
+    def _record(self, index):
+        """Memoryview of a record"""
+        if self._view is None:
+            raise ValueError('Store is not open for reading')
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('store index out of range')
+        offset = _HEADER_SIZE + index * self._record_size
+        return self._view[offset:offset + self._record_size]
+
+    def _read_header(self):
+        """Read and check the header of an existing file"""
+        data = self._file.read(_HEADER_SIZE)
+        try:
+            magic, version, size, bits, record_size, flags, count, index_offset = \
+                _HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError(f'{self._path} is not a puzzle store') from None
+        if magic != _MAGIC:
+            raise ValueError(f'{self._path} is not a puzzle store')
+        if version != _VERSION:
+            raise ValueError(f'Unsupported puzzle store version {version}')
+        board_size(size * size)
+        self._set_layout(size, flags, count, index_offset)
+        if bits != self._bits or record_size != self._record_size:
+            raise ValueError(f'{self._path} has an unexpected record layout')
+        if os.fstat(self._file.fileno()).st_size < self._end:
+            raise ValueError(f'{self._path} is truncated')
+
+    def _write_header(self):
+        """Write the header at the start of the file, keeping the position"""
+        position = self._file.tell()
+        self._file.seek(0)
+        header = _HEADER.pack(_MAGIC, _VERSION, self._size, self._bits, self._record_size,
+                              self._flags, self._count, self._index_offset)
+        self._file.write(header.ljust(_HEADER_SIZE, b'\0'))
+        self._file.seek(max(position, _HEADER_SIZE))
+
+    def _write_index(self):
+        """Write the record numbers grouped by difficulty after the records"""
+        groups = [array('I') for _ in _NAMES]
+        for number, code in enumerate(self._difficulties):
+            groups[code].append(number)
+        bounds = array('I', [0])
+        for group in groups:
+            bounds.append(bounds[-1] + len(group))
+        if sys.byteorder == 'big':
+            bounds.byteswap()
+            for group in groups:
+                group.byteswap()
+        self._file.seek(self._end)
+        self._file.write(bounds.tobytes())
+        for group in groups:
+            self._file.write(group.tobytes())
+        self._file.truncate()
+        self._index_offset = self._end
+        self._flags |= _INDEXED
+
+    def _scan_difficulties(self):
+        """Read the difficulty byte of every record"""
+        if self._view is not None:
+            start = _HEADER_SIZE + self._record_size - 2
+            return bytes(self._view[start:self._end:self._record_size])
+        codes = bytearray()
+        block = 65536 * self._record_size
+        self._file.seek(_HEADER_SIZE)
+        for start in range(0, self._count * self._record_size, block):
+            data = self._file.read(min(block, self._end - _HEADER_SIZE - start))
+            codes += data[self._record_size - 2::self._record_size]
+        return bytes(codes)
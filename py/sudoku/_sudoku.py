@@ -9,19 +9,25 @@
 This module provides functionality for generating valid Sudoku puzzles with unique
 solutions, managing game state, and validating moves. It includes:
 
-- Puzzle generation with configurable difficulty levels (easy, medium, hard)
+- Puzzle generation with difficulty levels (easy, medium, hard) targeted by
+  logical rating (see ``_logic``)
 - Complete board generation using randomized diagonal boxes and backtracking
 - Solution validation ensuring unique solutions
-- Game board management with initial puzzle tracking
-- Move validation for rows, columns, and 3x3 boxes
-- Hint system and board state management
+- Game board management with initial puzzle tracking, stored as compact
+  flat boards (see ``_board``)
+- Move validation for rows, columns, and boxes
+- Boards of 4x4, 16x16 and 25x25 as well as 9x9; difficulty of the other
+  sizes is set by the number of clues only, since the logical rating is
+  9x9-specific
+- Logical hints from live candidates (see ``_hints``) and board state
+  management, with undo/redo (see ``_history``)
 
 Classes:
     SudokuBoard: Main game board class with puzzle generation and game logic
 
 Functions:
     is_valid_move: Validate if a number can be placed at a specific position
-    solve_sudoku: Solve a Sudoku puzzle using backtracking algorithm
+    solve_sudoku: Solve a Sudoku puzzle with one of the solving engines
     generate_full_board: Generate a complete, valid Sudoku board
     count_solutions: Count number of solutions for a puzzle (up to a limit)
     generate_puzzle: Generate a Sudoku puzzle with unique solution at specified difficulty
@@ -29,206 +35,695 @@ Functions:
 """
 
 import random
-import copy
+import struct
+import time
+
+from ._board import CompactBoard
+from ._history import MoveHistory
+from ._pool import get_default_pool
+from ._solve_engine import (solve, count_solutions as _count_solutions, _BitmaskSearch,
+                            _BASE_OF_SIZE, _limited, _search_class)
+
+
 def is_valid_move(board, row, col, num):
     """Check if placing num at board[row][col] is valid"""
+    size = len(board)
+    base = _BASE_OF_SIZE[size]
+    
     # Check row
     if num in board[row]:
         return False
     
     # Check column
-    if num in [board[i][col] for i in range(9)]:
+    if num in [board[i][col] for i in range(size)]:
         return False
     
-    # Check 3x3 box
-    box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(box_row, box_row + 3):
-        for j in range(box_col, box_col + 3):
+    # Check box
+    box_row, box_col = base * (row // base), base * (col // base)
+    for i in range(box_row, box_row + base):
+        for j in range(box_col, box_col + base):
             if board[i][j] == num:
                 return False
     
     return True
 
 
-def solve_sudoku(board):
-    """Solve sudoku using backtracking"""
-    for row in range(9):
-        for col in range(9):
-            if board[row][col] == 0:
-                for num in range(1, 10):
-                    if is_valid_move(board, row, col, num):
-                        board[row][col] = num
-                        
-                        if solve_sudoku(board):
-                            return True
-                        
-                        board[row][col] = 0
-                
-                return False
-    return True
+def solve_sudoku(board, engine='bitmask', stats=None, timeout=None, max_nodes=None,
+                 cancel=None):
+    """Solve sudoku in place
+    
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        engine: 'bitmask' (constraint propagation), 'dlx' or 'backtrack' (reference)
+        stats: Optional SolveStats filled with search statistics
+        timeout, max_nodes, cancel: Optional search budget, see ``solve``;
+            a falsy GaveUp is returned when it runs out
+    """
+    return solve(board, engine, stats, timeout, max_nodes, cancel)
 
 
-def generate_full_board():
-    """Generate a complete, valid sudoku board"""
-    board = [[0 for _ in range(9)] for _ in range(9)]
-    
-    # Fill diagonal 3x3 boxes first (they don't depend on each other)
-    for box in range(0, 9, 3):
-        nums = list(range(1, 10))
-        random.shuffle(nums)
-        for i in range(3):
-            for j in range(3):
-                board[box + i][box + j] = nums[i * 3 + j]
+def generate_full_board(rng=None, bank=None, size=9):
+    """Generate a complete, valid sudoku board
     
-    # Solve the rest
-    solve_sudoku(board)
-    return board
+    Args:
+        rng: random.Random instance to draw from, defaults to the random module
+        bank: Optional SeedBank; the board is then a random symmetry of one of
+            its solved grids
+        size: Side length, 9 or one of 4, 16 and 25
+    """
+    if bank is not None:
+        _check_bank_size(size)
+        return bank.full_board(rng or random).to_rows()
+    return _generate_full_board(rng or random, size).to_rows()
+
 
+def _generate_full_board(rng=random, size=9):
+    """Generate a complete, valid sudoku board as a CompactBoard"""
+    while True:
+        board = CompactBoard(size=size)
+        base = board.base
+        
+        # Fill diagonal boxes first (they don't depend on each other)
+        for box in range(0, size, base):
+            nums = list(range(1, size + 1))
+            rng.shuffle(nums)
+            for i in range(base):
+                for j in range(base):
+                    board.set(box + i, box + j, nums[i * base + j])
+        
+        # Solve the rest; only 4x4 diagonals can leave no solution
+        if solve_sudoku(board):
+            return board
+
+
+def count_solutions(board, limit=2, engine='dlx', stats=None, timeout=None, max_nodes=None,
+                    cancel=None):
+    """Count number of solutions (up to limit)
+    
+    Args:
+        board: 9x9 2D list or CompactBoard (0 for empty cells)
+        limit: Stop searching once this many solutions are found
+        engine: 'dlx', 'bitmask' or 'backtrack' (reference depth-first search)
+        stats: Optional SolveStats filled with search statistics
+        timeout, max_nodes, cancel: Optional search budget, see ``solve``;
+            a falsy GaveUp is returned when it runs out
+    """
+    if engine != 'backtrack':
+        return _count_solutions(board, limit, engine, stats, timeout, max_nodes, cancel)
 
-def count_solutions(board, limit=2):
-    """Count number of solutions (up to limit)"""
     count = [0]
     
-    def solve_count(board):
+    def solve_count(board, depth, stats):
         if count[0] >= limit:
             return
         
-        for row in range(9):
-            for col in range(9):
+        for row in range(size):
+            for col in range(size):
                 if board[row][col] == 0:
-                    for num in range(1, 10):
+                    tried = False
+                    for num in range(1, size + 1):
                         if is_valid_move(board, row, col, num):
                             board[row][col] = num
-                            solve_count(board)
+                            if stats is not None:
+                                tried = True
+                                stats.node(depth + 1, row * size + col, num)
+                            solve_count(board, depth + 1, stats)
                             board[row][col] = 0
+                    if stats is not None and not tried:
+                        stats.backtracks += 1
                     return
         
         count[0] += 1
+        if stats is not None:
+            stats.solutions += 1
     
-    board_copy = copy.deepcopy(board)
-    solve_count(board_copy)
-    return count[0]
+    def run(stats):
+        solve_count(rows, 0, stats)
+        return count[0]
+    
+    rows = CompactBoard.coerce(board).to_rows()
+    size = len(rows)
+    if timeout is not None or max_nodes is not None or cancel is not None:
+        return _limited(run, stats, timeout, max_nodes, cancel)
+    if stats is None:
+        return run(None)
+    started = time.perf_counter()
+    try:
+        return run(stats)
+    finally:
+        stats.elapsed += time.perf_counter() - started
 
 
-def generate_puzzle(difficulty='medium'):
+def generate_puzzle(difficulty='medium', rng=None, progress=None, bank=None, size=9):
     """Generate a sudoku puzzle with unique solution
     
+    The difficulty is the score band of the puzzle's logical rating (see
+    ``rate_puzzle``): 'easy' needs only singles (about 40-45 clues),
+    'medium' mostly singles with fewer clues (about 30-35) and 'hard'
+    needs techniques such as pointing, pairs or X-wings (about 22-30 clues).
+    Other sizes are not rated; their difficulty only sets how many cells
+    are removed, in the same proportions.
+    
     Args:
-        difficulty: 'easy' (40-45 clues), 'medium' (30-35 clues), 'hard' (25-30 clues)
+        difficulty: 'easy', 'medium' or 'hard'
+        rng: random.Random instance to draw from, defaults to the random module
+        progress: Optional callable(removed, total) called after each removal
+            attempt while carving; an exception raised by it aborts the
+            generation
+        bank: Optional SeedBank to derive the puzzle from, much faster but
+            less varied (see ``SeedBank``); 9x9 only
+        size: Side length, 9 or one of 4, 16 and 25
+    
+    Returns:
+        tuple: (puzzle, solution) as 2D lists
     """
-    board = generate_full_board()
-    solution = copy.deepcopy(board)
+    if bank is not None:
+        _check_bank_size(size)
+        puzzle, solution = bank.generate(difficulty, rng or random, progress)
+    else:
+        puzzle, solution = _generate_puzzle(difficulty, rng or random, progress, size)
+    return puzzle.to_rows(), solution.to_rows()
+
+
+def _check_bank_size(size):
+    """Seed banks only hold 9x9 puzzles"""
+    if size != 9:
+        raise ValueError('SeedBank only generates 9x9 puzzles')
+
+
+def _generate_puzzle(difficulty='medium', rng=random, progress=None, size=9):
+    """Generate a puzzle and its solution as CompactBoards
     
-    # Determine number of cells to remove
+    Cells are carved out while the solution stays unique, then the puzzle is
+    moved into the score band of its difficulty (see ``_logic``). More cells
+    are removed while it rates too easy, and solution digits are given back
+    where the logical solver gets stuck while it rates too hard. Rating stops
+    as soon as the score passes the band, and a grid that cannot reach the
+    band is dropped for a fresh one.
+    """
+    from ._logic import DIFFICULTY_BANDS
+    band = DIFFICULTY_BANDS.get(difficulty) if size == 9 else None
+    while True:
+        solution = _generate_full_board(rng, size)
+        cells_to_remove = _cells_to_remove(difficulty, rng, len(solution))
+        
+        # Remove cells while ensuring unique solution. The search state is kept
+        # across removals and each check only looks for a second solution that
+        # differs from the known one at the removed cell.
+        positions = list(range(len(solution)))
+        rng.shuffle(positions)
+        positions = iter(positions)
+        
+        search = _BitmaskSearch(solution.cells)
+        _carve(search, positions, cells_to_remove, progress)
+        if band is None or _fit_band(search, solution, positions, band, rng, progress):
+            return CompactBoard(search.cells), solution
+
+
+# Most cells removed from each board size (by cell count). The 9x9 counts
+# are scaled to it for the other sizes; much past it the uniqueness checks
+# of the larger boards take seconds to minutes each.
+_MOST_REMOVED = {16: 11, 81: 56, 256: 150, 625: 290}
+
+
+def _cells_to_remove(difficulty, rng, ncells=81):
+    """Number of cells to remove before the first rating"""
+    most = _MOST_REMOVED[ncells]
     if difficulty == 'easy':
-        cells_to_remove = random.randint(36, 41)  # 40-45 clues remain
+        low, high = 36, 41  # 40-45 clues remain
     elif difficulty == 'medium':
-        cells_to_remove = random.randint(46, 51)  # 30-35 clues remain
+        low, high = 46, 51  # 30-35 clues remain
     elif difficulty == 'hard':
-        cells_to_remove = random.randint(51, 56)  # 25-30 clues remain
+        low, high = 51, 56  # 25-30 clues remain
     else:
-        cells_to_remove = 46
-    
-    # Remove cells while ensuring unique solution
-    positions = [(i, j) for i in range(9) for j in range(9)]
-    random.shuffle(positions)
+        return 46 * most // 56
+    return rng.randint(low * most // 56, high * most // 56)
+
+
+def _carve(search, positions, cells_to_remove, progress, checked=True):
+    """Remove cells from positions until cells_to_remove are gone
     
+    With ``checked`` a cell is only removed if the solution stays unique;
+    without it every cell is removed, which is only safe when the remaining
+    givens are known to keep the solution unique.
+    """
     removed = 0
-    for row, col in positions:
+    for cell in positions:
+        if not checked:
+            search.unplace(cell)
+            removed += 1
+        elif search.try_remove(cell):
+            removed += 1
+        if progress is not None:
+            progress(removed, cells_to_remove)
         if removed >= cells_to_remove:
             break
-        
-        backup = board[row][col]
-        board[row][col] = 0
-        
-        # Check if still has unique solution
-        board_copy = copy.deepcopy(board)
-        if count_solutions(board_copy, 2) == 1:
-            removed += 1
+
+
+def _fit_band(search, solution, positions, band, rng, progress=None, checked=True):
+    """Carve or refill a unique puzzle until it rates inside a score band
+    
+    Carving is complete by now, so ``progress`` is called as (1, 1) before
+    each rating; an exception raised by it aborts the fitting. ``checked``
+    is passed on to ``_carve`` for the extra removals.
+    
+    Returns:
+        bool: True once the puzzle is in the band, False if it still rates
+            too easy after trying every remaining position
+    """
+    from ._logic import LogicSolver, _rate
+    low, high = band
+    while True:
+        if progress is not None:
+            progress(1, 1)
+        solver = LogicSolver(CompactBoard(search.cells))
+        rating = _rate(solver, high, None)
+        if rating.solved and rating.score <= high:
+            if rating.score >= low:
+                return True
+            # Too easy: remove one more cell
+            before = search.cells.count(0)
+            _carve(search, positions, 1, None, checked)
+            if search.cells.count(0) == before:
+                return False
         else:
-            board[row][col] = backup
+            # Too hard: give back a cell the logical solver did not reach, or
+            # any empty cell if the score only overshot on the final steps
+            stuck = [cell for cell, digit in enumerate(solver.cells) if not digit]
+            if not stuck:
+                stuck = [cell for cell, digit in enumerate(search.cells) if not digit]
+            cell = rng.choice(stuck)
+            search.place(cell, 1 << (solution.cells[cell] - 1))
+
+
+# Saved sessions: magic, version, difficulty label length and cell count,
+# followed by the label, the solution and the serialized MoveHistory
+_SESSION = struct.Struct('<4sHHH')
+_SESSION_MAGIC = b'SDKS'
+
+_unit_slot_tables = {}
+
+
+def _unit_slots(ncells):
+    """Counter offsets of every cell's row, column and box, each unit's cells
+    and every cell's peers
     
-    return board, solution
+    Units are numbered rows, then columns, then boxes, and each has size + 1
+    counter slots: slot ``offset + digit`` counts digit in the unit.
+    """
+    tables = _unit_slot_tables.get(ncells)
+    if tables is None:
+        search = _search_class(ncells)
+        size = search.SIZE
+        width = size + 1
+        offsets = [(search.ROW_OF[cell] * width,
+                    (size + search.COL_OF[cell]) * width,
+                    (2 * size + search.BOX_OF[cell]) * width) for cell in range(ncells)]
+        unit_cells = [None] * (3 * size)
+        for cells, kind, index in search.UNITS:
+            unit_cells[kind * size + index] = cells
+        peers = [sorted({peer for slot in offsets[cell] for peer in unit_cells[slot // width]}
+                        - {cell}) for cell in range(ncells)]
+        tables = _unit_slot_tables[ncells] = (offsets, unit_cells, peers)
+    return tables
 
 
 class SudokuBoard(object):
-    """Represents a sudoku game board"""
+    """Represents a sudoku game board
     
-    def __init__(self, difficulty='medium'):
+    The boards are held as CompactBoards; ``puzzle``, ``solution`` and
+    ``current_board`` return list-of-lists views over them. Every row,
+    column and box keeps a count of each digit, and the board a count of its
+    empty cells, so move checks, completion and conflict queries do not scan
+    the board. The candidates of every empty cell are kept as well, for
+    ``find_hint``. The counters follow ``set_cell``, ``get_hint``, ``reset``
+    and ``solve``; change the board through them rather than the views.
+    
+    Every change is recorded in a MoveHistory: ``undo``, ``redo`` and
+    ``seek`` move through it, ``reset`` seeks back to the start (so redo
+    brings the moves back), and ``to_bytes`` saves the whole session.
+    
+    Args:
+        difficulty: 'easy', 'medium' or 'hard'
+        pool: PuzzlePool to take the puzzle from, defaults to the shared pool;
+            pools only serve 9x9 puzzles
+        size: Side length, 9 or one of 4, 16 and 25; the other sizes are
+            generated directly
+    """
+    
+    def __init__(self, difficulty='medium', pool=None, size=9):
         super().__init__()
-        self._base_size = 3
+        if size == 9:
+            self._setup(difficulty, *(pool or get_default_pool()).get(difficulty))
+        else:
+            self._setup(difficulty, *_generate_puzzle(difficulty, random, None, size))
+    
+    @classmethod
+    def from_puzzle(cls, puzzle, solution=None, difficulty='custom'):
+        """Create a board for a given puzzle
+        
+        Args:
+            puzzle: 81-char string, 9x9 list or CompactBoard (or another
+                supported size)
+            solution: Its solution in the same forms, solved here when None
+            difficulty: Label reported by the difficulty property
+        
+        Raises:
+            ValueError: If the puzzle has no solution
+        """
+        puzzle = CompactBoard.coerce(puzzle).copy()
+        if solution is None:
+            solution = puzzle.copy()
+            if not solve(solution):
+                raise ValueError('Puzzle has no solution')
+        board = cls.__new__(cls)
+        board._setup(difficulty, puzzle, CompactBoard.coerce(solution).copy())
+        return board
+    
+    def _setup(self, difficulty, puzzle, solution):
+        """Initialize the board state from a puzzle and its solution"""
+        self._base_size = puzzle.base
         self._board_length = self._base_size ** 2
         self._difficulty = difficulty
-        self._puzzle, self._solution = generate_puzzle(difficulty)
-        self._current_board = copy.deepcopy(self._puzzle)
-        self._initial_board = copy.deepcopy(self._puzzle)
+        self._puzzle, self._solution = puzzle, solution
+        self._current_board = self._puzzle.copy()
+        self._initial_board = self._puzzle.copy()
+        self._offsets, self._unit_cells, self._peers = _unit_slots(len(puzzle))
+        self._recount()
+        self._initial_counts = (list(self._counts), set(self._repeated), self._empty,
+                                list(self._candidates))
+        self._history = MoveHistory(self._initial_board.cells)
+    
+    def _recount(self):
+        """Rebuild the digit and empty-cell counters and the candidates from the current board"""
+        cells = self._current_board.cells
+        self._counts = [0] * (3 * self._board_length * (self._board_length + 1))
+        self._repeated = set()  # Counter slots above 1: repeated digits
+        self._empty = 0
+        for cell, value in enumerate(cells):
+            if value:
+                self._count(cell, value, 1)
+            else:
+                self._empty += 1
+        # Candidate bitmask per cell, bit d - 1 for digit d; 0 when filled
+        self._candidates = [0 if value else self._open_digits(cell)
+                            for cell, value in enumerate(cells)]
+        self._struck = [0] * len(cells)  # Digits eliminated by earlier hints
+    
+    def _open_digits(self, cell):
+        """Bitmask of the digits absent from the row, column and box of cell"""
+        counts = self._counts
+        row, col, box = self._offsets[cell]
+        mask = 0
+        for digit in range(1, self._board_length + 1):
+            if not (counts[row + digit] or counts[col + digit] or counts[box + digit]):
+                mask |= 1 << (digit - 1)
+        return mask
+    
+    def _count(self, cell, value, delta):
+        """Add delta to the counters of value in the units of cell"""
+        counts = self._counts
+        for offset in self._offsets[cell]:
+            slot = offset + value
+            counts[slot] += delta
+            if counts[slot] > 1:
+                self._repeated.add(slot)
+            else:
+                self._repeated.discard(slot)
+    
+    def _write(self, cell, value):
+        """Store value in a cell, keeping the counters and candidates up to date"""
+        cells = self._current_board.cells
+        old = cells[cell]
+        if old == value:
+            return
+        if old:
+            self._count(cell, old, -1)
+        else:
+            self._empty -= 1
+        if value:
+            self._count(cell, value, 1)
+        else:
+            self._empty += 1
+        cells[cell] = value
+        
+        candidates = self._candidates
+        peers = self._peers[cell]
+        if value:
+            candidates[cell] = 0
+            keep = ~(1 << (value - 1))
+            for peer in peers:
+                candidates[peer] &= keep
+        else:
+            candidates[cell] = self._open_digits(cell)
+        if old:
+            # The old digit is open again wherever no unit still holds it,
+            # and hint eliminations may have relied on it
+            self._struck = [0] * len(cells)
+            bit = 1 << (old - 1)
+            counts = self._counts
+            offsets = self._offsets
+            for peer in peers:
+                if not cells[peer]:
+                    row, col, box = offsets[peer]
+                    if not (counts[row + old] or counts[col + old] or counts[box + old]):
+                        candidates[peer] |= bit
+    
+    def _change(self, changes):
+        """Write (cell, value) pairs as one undoable step
+        
+        Returns:
+            bool: True if any cell changed
+        """
+        cells = self._current_board.cells
+        moves = [(cell, cells[cell], value) for cell, value in changes if cells[cell] != value]
+        if not moves:
+            return False
+        for cell, _, value in moves:
+            self._write(cell, value)
+        self._history.record(moves)
+        return True
 
     @property
     def difficulty(self):
         """(str) Difficulty level: easy, medium, or hard"""
         return self._difficulty
 
+    @property
+    def size(self):
+        """(int) Side length of the board: 9, or 4, 16 or 25"""
+        return self._board_length
+
     @property
     def puzzle(self):
         """Get the initial puzzle board"""
-        return self._initial_board
+        return self._initial_board.rows
     
     @property
     def solution(self):
         """Get the solution board"""
-        return self._solution
+        return self._solution.rows
     
     @property
     def current_board(self):
         """Get the current state of the board"""
-        return self._current_board
+        return self._current_board.rows
     
     def get_cell(self, row, col):
         """Get value at specific cell"""
-        return self._current_board[row][col]
+        return self._current_board.get(row, col)
     
     def set_cell(self, row, col, value):
-        """Set value at specific cell if it's not part of initial puzzle"""
-        if self._initial_board[row][col] == 0:
-            self._current_board[row][col] = value
+        """Set value at specific cell if it's not part of initial puzzle
+        
+        Raises:
+            ValueError: If value is not 0 (empty) or a digit of the board
+        """
+        if not 0 <= value <= self._board_length:
+            raise ValueError(f'Cell value must be between 0 and {self._board_length}')
+        cell = row * self._board_length + col
+        if self._initial_board.cells[cell] == 0:
+            old = self._current_board.cells[cell]
+            if old != value:
+                self._write(cell, value)
+                self._history.record(((cell, old, value),))
             return True
         return False
     
     def is_initial_cell(self, row, col):
         """Check if cell is part of the initial puzzle"""
-        return self._initial_board[row][col] != 0
+        return self._initial_board.get(row, col) != 0
     
     def is_valid_move(self, row, col, num):
-        """Check if move is valid"""
-        return is_valid_move(self._current_board, row, col, num)
+        """Check if num is not in the row, column or box yet (the cell included)"""
+        if not 1 <= num <= self._board_length:
+            return False
+        counts = self._counts
+        row_slot, col_slot, box_slot = self._offsets[row * self._board_length + col]
+        return not (counts[row_slot + num] or counts[col_slot + num] or counts[box_slot + num])
     
     def is_complete(self):
         """Check if puzzle is completely filled"""
-        for row in range(9):
-            for col in range(9):
-                if self._current_board[row][col] == 0:
-                    return False
-        return True
+        return self._empty == 0
     
     def is_correct(self):
         """Check if current board matches solution"""
-        return self._current_board == self._solution
+        return self._empty == 0 and self._current_board == self._solution
+    
+    def has_conflicts(self):
+        """Check if any digit repeats in a row, column or box"""
+        return bool(self._repeated)
+    
+    def is_conflict(self, row, col):
+        """Check if the digit at a cell repeats in its row, column or box"""
+        cell = row * self._board_length + col
+        value = self._current_board.cells[cell]
+        if not value:
+            return False
+        counts = self._counts
+        return any(counts[offset + value] > 1 for offset in self._offsets[cell])
+    
+    def conflicting_cells(self):
+        """Get the sorted (row, col) of every cell whose digit repeats in a unit"""
+        cells = self._current_board.cells
+        width = self._board_length + 1
+        found = set()
+        for slot in self._repeated:
+            unit, digit = divmod(slot, width)
+            found.update(cell for cell in self._unit_cells[unit] if cells[cell] == digit)
+        return [divmod(cell, self._board_length) for cell in sorted(found)]
     
     def reset(self):
-        """Reset board to initial puzzle state"""
-        self._current_board = copy.deepcopy(self._initial_board)
+        """Reset board to initial puzzle state; redo replays the moves again"""
+        self._history.seek(0)
+        self._current_board = self._initial_board.copy()
+        counts, repeated, empty, candidates = self._initial_counts
+        self._counts, self._repeated, self._empty = list(counts), set(repeated), empty
+        self._candidates = list(candidates)
+        self._struck = [0] * len(candidates)
     
     def solve(self):
-        """Fill in the solution"""
-        self._current_board = copy.deepcopy(self._solution)
+        """Fill in the solution as one undoable step"""
+        self._change(enumerate(self._solution.cells))
+    
+    @property
+    def history(self):
+        """(MoveHistory) The moves made on this board"""
+        return self._history
+    
+    def can_undo(self):
+        """Check if there is a move to undo"""
+        return self._history.can_undo()
+    
+    def can_redo(self):
+        """Check if there is an undone move to redo"""
+        return self._history.can_redo()
+    
+    def undo(self):
+        """Undo the last move
+        
+        Returns:
+            list: (row, col) of every cell the move changed, empty if there
+                was nothing to undo
+        """
+        changes = self._history.undo()
+        for cell, old, _ in reversed(changes):
+            self._write(cell, old)
+        return [divmod(cell, self._board_length) for cell, _, _ in changes]
+    
+    def redo(self):
+        """Redo the last undone move
+        
+        Returns:
+            list: (row, col) of every cell the move changed, empty if there
+                was nothing to redo
+        """
+        changes = self._history.redo()
+        for cell, _, new in changes:
+            self._write(cell, new)
+        return [divmod(cell, self._board_length) for cell, _, _ in changes]
+    
+    def seek(self, position):
+        """Show the board after a number of moves, keeping the moves after it"""
+        self._current_board.cells[:] = self._history.seek(position)
+        self._recount()
+    
+    def to_bytes(self):
+        """Serialize the puzzle, solution, difficulty and every move"""
+        label = str(self._difficulty).encode('utf-8')
+        return (_SESSION.pack(_SESSION_MAGIC, 1, len(label), len(self._solution)) + label +
+                bytes(self._solution.cells) + self._history.to_bytes())
+    
+    @classmethod
+    def from_bytes(cls, data):
+        """Restore a board saved with to_bytes, at the same move
+        
+        Raises:
+            ValueError: If data is not a saved board
+        """
+        try:
+            magic, version, length, ncells = _SESSION.unpack_from(data)
+        except struct.error:
+            raise ValueError('Not a saved sudoku session')
+        if magic != _SESSION_MAGIC or version != 1:
+            raise ValueError('Not a saved sudoku session')
+        offset = _SESSION.size
+        difficulty = bytes(data[offset:offset + length]).decode('utf-8')
+        offset += length
+        solution = CompactBoard(data[offset:offset + ncells])
+        history = MoveHistory.from_bytes(data[offset + ncells:])
+        board = cls.from_puzzle(CompactBoard(history.cells_at(0)), solution, difficulty)
+        board._history = history
+        board.seek(history.position)
+        return board
+    
+    def candidates(self, row, col):
+        """Get the digits not yet used in the row, column and box of an empty cell
+        
+        Returns:
+            list: The digits in increasing order, empty for a filled cell
+        """
+        mask = self._candidates[row * self._board_length + col]
+        return [digit for digit in range(1, self._board_length + 1) if mask >> (digit - 1) & 1]
+    
+    def find_hint(self):
+        """Find the next move without making it
+        
+        A wrong digit on the board is pointed out first, as a 'correction'.
+        Otherwise the move is the next logical deduction from the live
+        candidates (see ``_hints``); when no technique applies, the empty
+        cell with the fewest candidates is filled from the solution and the
+        hint has no technique.
+        
+        Returns:
+            Hint: The move, or None if the board is solved
+        """
+        from ._hints import Hint, next_move
+        cells = self._current_board.cells
+        solution = self._solution.cells
+        size = self._board_length
+        for cell, value in enumerate(cells):
+            if value and value != solution[cell]:
+                return Hint(cell // size, cell % size, solution[cell], 'correction', ())
+        if not self._empty:
+            return None
+        hint = next_move(cells, self._candidates, size, self._unit_cells, self._struck)
+        if hint is None:
+            candidates = self._candidates
+            cell = min((cell for cell, value in enumerate(cells) if not value),
+                       key=lambda cell: bin(candidates[cell]).count('1'))
+            hint = Hint(cell // size, cell % size, solution[cell], None, ())
+        return hint
     
     def get_hint(self):
-        """Get a hint by revealing one empty cell from the solution"""
-        empty_cells = [(i, j) for i in range(9) for j in range(9) 
-                      if self._current_board[i][j] == 0]
-        if empty_cells:
-            row, col = random.choice(empty_cells)
-            self._current_board[row][col] = self._solution[row][col]
-            return row, col
-        return None
-    
\ No newline at end of file
+        """Make the move of find_hint as one undoable step
+        
+        Returns:
+            tuple: (row, col) of the cell filled in, or None if the board is
+                solved
+        """
+        hint = self.find_hint()
+        if hint is None:
+            return None
+        self._change(((hint.row * self._board_length + hint.col, hint.digit),))
+        return hint.row, hint.col
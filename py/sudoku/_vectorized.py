@@ -0,0 +1,167 @@
+"""Batched validation and candidate masks with NumPy.
+
+``is_valid_board`` checks one board at a time in Python. For large batches
+the boards are stacked into one ``(N, 9, 9)`` uint8 array instead, and every
+digit of every row, column and box of the batch is counted in one
+``bincount`` over (unit, digit) slots, the sparse form of summing one-hot
+digit vectors per unit. A cell whose digit is counted more than once in any
+of its units is a conflict. Candidate masks reuse the same counts: a digit
+is a candidate of an empty cell when none of its three units contains it.
+
+The slot indices take a few machine words per cell, so batches are
+processed in slices of ``chunksize`` boards to keep memory flat. Boards of
+the other supported sizes work the same way, as ``(N, 16, 16)`` arrays and
+so on.
+
+NumPy is optional: the package imports without it and this module is only
+loaded when one of its functions is used.
+
+Functions:
+    boards_to_array: Stack boards into an (N, size, size) uint8 array
+    validate_boards: Per-board validity and conflicting cells of a batch
+    candidate_masks: Candidate bitmask of every empty cell of a batch
+
+"""
+
+import numpy as np
+
+from ._board import _BASE_OF, _SIZE_OF, CompactBoard
+
+# Boards processed per slice; a 9x9 slice needs about 40MB of indices
+_CHUNKSIZE = 16384
+
+
+def boards_to_array(boards):
+    """
+    Stack boards into an (N, size, size) uint8 array
+
+    Args:
+        boards: Iterable of CompactBoards, strings or 2D lists, all of one size
+
+    Returns:
+        numpy.ndarray: The boards, one per leading index
+
+    Raises:
+        ValueError: If the boards are of different sizes, or there are none
+    """
+    cells = [CompactBoard.coerce(board).cells for board in boards]
+    if not cells:
+        raise ValueError('No boards given')
+    ncells = len(cells[0])
+    if any(len(board) != ncells for board in cells):
+        raise ValueError('Boards must all have the same size')
+    size = _SIZE_OF[ncells]
+    return np.frombuffer(b''.join(cells), dtype=np.uint8).reshape(-1, size, size)
+
+
+def validate_boards(boards, chunksize=_CHUNKSIZE):
+    """
+    Check a batch of boards for conflicts, like is_valid_board per board
+
+    Empty cells (0) are ignored; a value outside 1..size is a conflict.
+
+    Args:
+        boards: (N, size, size) or (N, size * size) integer array, or an
+            iterable of boards accepted by boards_to_array
+        chunksize: Boards counted at a time
+
+    Returns:
+        tuple: (valid, conflicts) where valid is an (N,) bool array and
+            conflicts an (N, size, size) bool array marking every cell whose
+            value repeats in its row, column or box
+    """
+    grid = _as_grid(boards)
+    valid = np.empty(len(grid), dtype=bool)
+    conflicts = np.empty(grid.shape, dtype=bool)
+    for start in range(0, len(grid), chunksize):
+        part = grid[start:start + chunksize]
+        counts, slots, out_of_range = _unit_counts(part)
+        # Every cell looks up the count of its own digit in its three units
+        found = (counts[slots] > 1).any(axis=0)
+        found &= part > 0
+        found |= out_of_range
+        conflicts[start:start + chunksize] = found
+        valid[start:start + chunksize] = ~found.any(axis=(1, 2))
+    return valid, conflicts
+
+
+def candidate_masks(boards, chunksize=_CHUNKSIZE):
+    """
+    Compute the candidates of every empty cell of a batch
+
+    Bit d - 1 of a mask is set when digit d appears in none of the cell's
+    row, column and box, as in the bitmask solving engine. Filled cells get
+    0, and so does an empty cell without candidates.
+
+    Args:
+        boards: (N, size, size) or (N, size * size) integer array, or an
+            iterable of boards accepted by boards_to_array
+        chunksize: Boards counted at a time
+
+    Returns:
+        numpy.ndarray: (N, size, size) masks, uint16 up to 16x16 and uint32
+            for 25x25 boards
+    """
+    grid = _as_grid(boards)
+    size = grid.shape[1]
+    dtype = np.uint16 if size <= 16 else np.uint32
+    # Weight 0 for the empty-cell count, 1 << (d - 1) for digit d
+    weights = np.concatenate(([0], 1 << np.arange(size))).astype(dtype)
+    full = dtype(weights.sum())
+    masks = np.empty(grid.shape, dtype=dtype)
+    for start in range(0, len(grid), chunksize):
+        part = grid[start:start + chunksize]
+        counts, slots, _ = _unit_counts(part)
+        # Digits used per unit as a bitmask, then gathered onto each cell
+        used = (counts.reshape(-1, size + 1) > 0) @ weights
+        units = slots // (size + 1)
+        cell_used = used[units[0]] | used[units[1]] | used[units[2]]
+        masks[start:start + chunksize] = np.where(part == 0, full & ~cell_used, 0)
+    return masks
+
+
+def _as_grid(boards):
+    """Return boards as an (N, size, size) array, converting if needed"""
+    if not isinstance(boards, np.ndarray):
+        return boards_to_array(boards)
+    if boards.ndim == 2 and boards.shape[1] in _SIZE_OF:
+        size = _SIZE_OF[boards.shape[1]]
+        boards = boards.reshape(-1, size, size)
+    if boards.ndim != 3 or boards.shape[1] != boards.shape[2] or \
+            boards.shape[1] ** 2 not in _SIZE_OF:
+        raise ValueError(f'Expected an (N, 9, 9) array of boards, got shape {boards.shape}')
+    return boards
+
+
+def _unit_counts(grid):
+    """Count every digit in every row, column and box of a (n, size, size) grid
+
+    Returns:
+        tuple: (counts, slots, out_of_range) where counts is a flat array
+            with one slot per (unit, value) pair, value 0 counting empty
+            cells; slots is (3, n, size, size) and gives for each cell the
+            slot of its value in its row, column and box; out_of_range marks
+            values outside 0..size, which are counted as empty
+    """
+    n, size = grid.shape[:2]
+    width = size + 1
+    out_of_range = (grid > size) | (grid < 0)
+    values = np.where(out_of_range, 0, grid).astype(np.intp)
+    # Unit numbers: rows first, then columns, then boxes, each n * size long
+    board = np.arange(n, dtype=np.intp)[:, None, None] * size
+    row, col, box = _unit_layout(size)
+    slots = np.stack((board + row, board + col + n * size, board + box + 2 * n * size))
+    slots *= width
+    slots += values
+    counts = np.bincount(slots.ravel(), minlength=3 * n * size * width)
+    return counts, slots, out_of_range
+
+
+def _unit_layout(size):
+    """Row, column and box number of every cell as (size, size) arrays"""
+    base = _BASE_OF[size * size]
+    index = np.arange(size, dtype=np.intp)
+    row = np.repeat(index, size).reshape(size, size)
+    col = row.T.copy()
+    box = (row // base) * base + col // base
+    return row, col, box
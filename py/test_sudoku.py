@@ -3,8 +3,34 @@
 import sys
 sys.path.insert(0, '.')
 
-from sudoku import SudokuBoard, solve_sudoku, generate_puzzle
+from sudoku import (SudokuBoard, CompactBoard, solve_sudoku, generate_puzzle, solve,
+                    is_valid_board, count_solutions, iter_solutions, solve_many,
+                    iter_solve_many, generate_many, PuzzlePool, SolveStats,
+                    rate_puzzle, difficulty_of, logical_steps, Transform,
+                    canonical_form, random_transform, PuzzleIndex,
+                    SolutionCache, SeedBank, SIZES, MoveHistory, PuzzleStore, GaveUp)
+from sudoku import _batch, _cli
+from sudoku._metrics import LatencyHistogram
+import itertools
 import copy
+import random
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+# 17-clue puzzle and Arto Inkala's "world's hardest sudoku"
+HARD_PUZZLES = [
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+]
+
+
+def parse_puzzle(text):
+    """Convert an 81-char puzzle string into a 9x9 list"""
+    return [[int(c) for c in text[i * 9:(i + 1) * 9]] for i in range(9)]
+
 
 def test_board_generation():
     """Test board generation"""
@@ -19,6 +45,17 @@ def test_board_generation():
     print("✓ Hard board generated")
     return True
 
+def test_puzzle_uniqueness():
+    """Test that generated puzzles have exactly one solution"""
+    print("\nTesting puzzle uniqueness...")
+    for difficulty in ('easy', 'medium', 'hard'):
+        puzzle, solution = generate_puzzle(difficulty)
+        assert count_solutions(puzzle, 2) == 1
+        assert all(puzzle[i][j] in (0, solution[i][j])
+                   for i in range(9) for j in range(9))
+        print(f"✓ {difficulty.capitalize()} puzzle has a unique solution")
+    return True
+
 def test_solver():
     """Test solver functionality"""
     print("\nTesting solver...")
@@ -51,6 +88,558 @@ def test_solver():
         print("✗ Solver failed")
         return False
 
+def test_solver_engines():
+    """Test that every engine solves hard puzzles"""
+    print("\nTesting solver engines...")
+    for text in HARD_PUZZLES:
+        board = parse_puzzle(text)
+        assert solve(board, 'bitmask')
+        assert all(all(row) for row in board) and is_valid_board(board)
+        # Givens must be untouched
+        assert all(text[i * 9 + j] in ('0', str(board[i][j]))
+                   for i in range(9) for j in range(9))
+    print("✓ Bitmask engine solved hard puzzles")
+
+    # The reference backtracker is too slow for hard puzzles, so only check
+    # that both engines agree once one row per band is cleared
+    reference = parse_puzzle(HARD_PUZZLES[1])
+    assert solve(reference, 'bitmask')
+    easy = copy.deepcopy(reference)
+    for i in (0, 4, 8):
+        easy[i] = [0] * 9
+    assert solve(easy, 'backtrack') and easy == reference
+    print("✓ Backtrack engine agrees with bitmask engine")
+
+    # Conflicting givens are rejected rather than "solved"
+    board = parse_puzzle(HARD_PUZZLES[0])
+    board[0][0] = board[0][7]
+    assert not solve_sudoku(board)
+    print("✓ Invalid puzzle rejected")
+    return True
+
+def test_solution_counting():
+    """Test DLX counting and enumeration against the other engines"""
+    print("\nTesting solution counting...")
+    solution = parse_puzzle(HARD_PUZZLES[0])
+    assert solve(solution, 'dlx') and is_valid_board(solution)
+    print("✓ DLX engine solved hard puzzle")
+
+    # Clearing two rows of the same band leaves several solutions, since
+    # at least the two rows can be swapped
+    puzzle = copy.deepcopy(solution)
+    puzzle[0] = [0] * 9
+    puzzle[1] = [0] * 9
+    expected = count_solutions(puzzle, 10, engine='backtrack')
+    assert expected >= 2
+    for engine in ('dlx', 'bitmask'):
+        assert count_solutions(puzzle, 10, engine=engine) == expected, engine
+    solutions = list(iter_solutions(puzzle))
+    assert len(solutions) == expected and solution in solutions
+    assert all(all(row) for row in puzzle[2:]) and puzzle[0] == [0] * 9
+    print("✓ Engines agree on the number of solutions")
+
+    empty = [[0] * 9 for _ in range(9)]
+    assert count_solutions(empty, 500) == 500
+    first = list(itertools.islice(iter_solutions(empty), 3))
+    assert len(first) == 3 and first[0] != first[1]
+    assert all(is_valid_board(board) for board in first)
+    print("✓ Enumerated solutions of an empty grid")
+    return True
+
+def test_solve_stats():
+    """Test search statistics collected by the engines"""
+    print("\nTesting solver statistics...")
+    puzzle = CompactBoard.from_string(HARD_PUZZLES[1])
+    for engine in ('bitmask', 'dlx'):
+        guesses = []
+        stats = SolveStats(on_node=lambda depth, cell, digit: guesses.append(depth))
+        board = puzzle.copy()
+        assert solve(board, engine, stats) and is_valid_board(board)
+        assert stats.solutions == 1 and stats.elapsed > 0
+        assert 0 < stats.backtracks < stats.nodes == len(guesses)
+        assert stats.max_depth == max(guesses) and stats.propagations > 0
+        print(f"✓ {engine}: {stats.nodes} guesses, {stats.backtracks} dead ends, "
+              f"depth {stats.max_depth}")
+
+    # The reference engines only guess, never propagate
+    easy = CompactBoard.from_string(HARD_PUZZLES[0]).copy()
+    solve(easy)
+    for cell in range(0, 81, 3):
+        easy[cell] = 0
+    stats = SolveStats()
+    assert count_solutions(easy.rows, 1, 'backtrack', stats) == 1
+    assert stats.nodes > 0 and stats.propagations == 0 and stats.solutions == 1
+
+    # Counters accumulate over several calls, enumeration included
+    stats = SolveStats()
+    assert count_solutions(puzzle, 2, 'bitmask', stats) == 1
+    nodes = stats.nodes
+    assert len(list(iter_solutions(puzzle, 'dlx', stats))) == 1
+    assert stats.solutions == 2 and stats.nodes > nodes
+    print("✓ Counting and enumeration report statistics")
+
+    lines = []
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, 'in.txt')
+        target = os.path.join(folder, 'out.txt')
+        with open(source, 'w') as handle:
+            handle.write(HARD_PUZZLES[1] + '\n')
+        assert _cli.main(['solve', '--stats', '-q', source, '-o', target]) == 0
+        with open(target) as handle:
+            lines = handle.read().split()
+    fields = dict(field.split('=') for field in lines[1:])
+    assert lines[0] == board.to_string() and int(fields['nodes']) > 0
+    print("✓ Solve command reports statistics per puzzle")
+    return True
+
+def test_compact_board():
+    """Test the compact board type and its list-of-lists view"""
+    print("\nTesting compact board...")
+    text = HARD_PUZZLES[0]
+    board = CompactBoard.from_string(text)
+    assert board.to_string('0') == text
+    assert CompactBoard.from_string(board.to_string()) == board
+    assert board.to_rows() == parse_puzzle(text)
+    assert board == parse_puzzle(text)
+    print("✓ String and list round-trips")
+
+    clone = board.copy()
+    assert clone == board and hash(clone) == hash(board)
+    assert len({board, clone}) == 1
+    clone.set(0, 0, 5)
+    assert clone != board and board.get(0, 0) == 0
+    print("✓ Copy is independent and hashing follows content")
+
+    view = board.rows
+    assert view[0][7] == 1 and 1 in view[0] and len(view) == 9
+    view[0][0] = 5
+    assert board[0, 0] == 5 and board[0] == 5 and view == clone
+    view[0][0] = 0
+    print("✓ Row view writes through")
+
+    assert solve(board) and is_valid_board(board) and board.count_empty() == 0
+    assert solve(view) and count_solutions(CompactBoard.from_string(text)) == 1
+    print("✓ Engines accept compact boards")
+
+    for bad, message in ((lambda: CompactBoard.from_string('1' * 15), '16, 81, 256, 625'),
+                         (lambda: CompactBoard.from_string('5' + '.' * 15), '4x4'),
+                         (lambda: CompactBoard([0] * 15 + [5]), 'outside 0-4'),
+                         (lambda: CompactBoard.from_rows([[10] * 9] * 9), 'outside 0-9')):
+        try:
+            bad()
+            assert False, "Malformed board accepted"
+        except ValueError as error:
+            assert message in str(error), error
+    print("✓ Malformed strings and out-of-range cells are rejected")
+    return True
+
+def test_board_sizes():
+    """Test 4x4, 16x16 and 25x25 boards through the board, solvers and generator"""
+    print("\nTesting board sizes...")
+    rng = random.Random(17)
+    for size in SIZES:
+        puzzle, solution = generate_puzzle('hard', rng, size=size)
+        assert len(puzzle) == size and len(solution[0]) == size
+        board = CompactBoard.from_rows(puzzle)
+        assert board.size == size and board.base ** 2 == size
+        assert CompactBoard.from_string(board.to_string()) == board
+        assert count_solutions(board) == 1 and is_valid_board(solution)
+        for engine in ('bitmask', 'dlx'):
+            solved = board.copy()
+            started = time.perf_counter()
+            assert solve(solved, engine) and solved == solution
+            assert time.perf_counter() - started < 1.0
+    print("✓ Generated and solved every size within a second")
+
+    text = CompactBoard.from_rows(solution).to_string()
+    assert 'P' in text and CompactBoard.from_string(text.lower()).to_string() == text
+    assert solve(CompactBoard(size=16), 'backtrack')
+    broken = CompactBoard.from_rows(solution)
+    broken[0], broken[1] = broken[1], broken[0]
+    assert not is_valid_board(broken) and not solve(broken)
+    print("✓ Letters round-trip and invalid boards are rejected")
+
+    mixed = solve_many([HARD_PUZZLES[0], '1' + '.' * 15, board], workers=1, chunksize=4)
+    assert [len(result) for result in mixed] == [81, 16, 625]
+    game = SudokuBoard('easy', size=4)
+    assert game.size == 4 and len(game.puzzle) == 4
+    row, col = game.get_hint()
+    assert game.get_cell(row, col) == game.solution[row][col]
+    for call in (lambda: canonical_form(board), lambda: rate_puzzle(board),
+                 lambda: generate_puzzle('easy', bank=SeedBank(), size=16)):
+        try:
+            call()
+            assert False, "9x9-only feature accepted another size"
+        except ValueError:
+            pass
+    print("✓ Batches, games and 9x9-only features handle other sizes")
+    return True
+
+def test_vectorized_validation():
+    """Test the NumPy batch validator and candidate masks against the scalar code"""
+    print("\nTesting vectorized validation...")
+    try:
+        import numpy
+    except ImportError:
+        print("✓ NumPy not installed, skipped")
+        return True
+    from sudoku import validate_boards, candidate_masks, boards_to_array
+    from sudoku._solve_engine import _BitmaskSearch
+
+    puzzles = [CompactBoard.from_string(text) for text in HARD_PUZZLES]
+    solved = [board.copy() for board in puzzles]
+    for board in solved:
+        solve(board)
+    broken = solved[0].copy()
+    broken[0], broken[1] = broken[1], broken[0]
+    clash = puzzles[1].copy()
+    clash[80] = 8  # repeats the 8 at row 7, column 9 in its column and box
+    boards = puzzles + solved + [broken, clash]
+    valid, conflicts = validate_boards(boards_to_array(boards))
+    assert list(valid) == [is_valid_board(board) for board in boards]
+    assert list(valid) == [True] * 4 + [False] * 2
+    assert conflicts[:4].sum() == 0 and conflicts[4, 0, :2].all()
+    assert set(zip(*numpy.nonzero(conflicts[5]))) == {(6, 8), (8, 8)}
+    flat = numpy.frombuffer(bytes(broken.cells), dtype=numpy.uint8).reshape(1, 81)
+    assert not validate_boards(flat)[0][0]
+    assert not validate_boards(numpy.full((1, 9, 9), 10))[0][0]
+    print("✓ Validity and conflicting cells match is_valid_board")
+
+    masks = candidate_masks(boards[:2], chunksize=1)
+    for board, mask in zip(puzzles, masks):
+        search = _BitmaskSearch(board.cells)
+        assert [int(value) for value in mask.flat] == [
+            0 if digit else search.candidates(cell) for cell, digit in enumerate(board)]
+    assert candidate_masks(solved).sum() == 0
+    print("✓ Candidate masks match the bitmask engine")
+    return True
+
+def test_batch_solving():
+    """Test batch solving in and out of process"""
+    print("\nTesting batch solving...")
+    puzzles = HARD_PUZZLES * 3 + ['1' * 81]
+    serial = solve_many(puzzles, workers=1)
+    assert serial[-1] is None
+    assert all(is_valid_board(board) and board.count_empty() == 0
+               for board in serial[:-1])
+    print("✓ Solved batch in process")
+
+    assert solve_many(iter(puzzles), workers=2, chunksize=2) == serial
+    streamed = dict(iter_solve_many(puzzles, workers=2, chunksize=3, ordered=False))
+    assert [streamed[i] for i in range(len(puzzles))] == serial
+    print("✓ Process pool results match, ordered and unordered")
+    return True
+
+def test_solve_command():
+    """Test the streaming solve command and its latency histogram"""
+    print("\nTesting solve command...")
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.add(ms / 1000.0)
+    assert abs(histogram.percentile(50) - 0.050) < 0.003
+    assert abs(histogram.percentile(99) - 0.099) < 0.005
+    print("✓ Histogram percentiles within bucket accuracy")
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, 'puzzles.txt')
+        target = os.path.join(folder, 'solutions.txt')
+        with open(source, 'w') as handle:
+            handle.write('# comment\n\n' + '\n'.join(HARD_PUZZLES + ['1' * 81]) + '\n')
+        assert _cli.main(['solve', source, '-o', target, '-q', '--chunksize', '1']) == 0
+        with open(target) as handle:
+            lines = handle.read().split()
+    assert lines[-1] == _cli.UNSOLVABLE and len(lines) == len(HARD_PUZZLES) + 1
+    assert [CompactBoard.from_string(line) for line in lines[:-1]] == solve_many(HARD_PUZZLES)
+    print("✓ Solutions streamed in input order")
+
+    try:
+        _cli.main(['solve', os.path.join(folder, 'missing.txt'), '-q'])
+        assert False, "Missing input accepted"
+    except SystemExit as error:
+        assert str(error).startswith("sudoku: error: can't open")
+    print("✓ Missing input exits with a one-line error")
+    return True
+
+def test_bulk_generation():
+    """Test seeded, deduplicated bulk generation"""
+    print("\nTesting bulk generation...")
+    pack = list(generate_many(6, 'easy', workers=1, seed=42, chunksize=4))
+    assert len(pack) == 6
+    assert len({puzzle for puzzle, _ in pack}) == 6
+    for puzzle, solution in pack:
+        assert count_solutions(puzzle) == 1 and is_valid_board(solution)
+        assert all(value in (0, solution[i]) for i, value in enumerate(puzzle))
+    print("✓ Generated unique puzzles")
+
+    again = list(generate_many(6, 'easy', workers=2, seed=42, chunksize=4))
+    assert again == pack
+    print("✓ Same seed gives the same pack with more workers")
+
+    stats = {}
+    try:
+        list(_batch._iter_generate_timed(10 ** 6, 'hard', 1, 42, 16, stats, size=4,
+                                         max_duplicates=0))
+        assert False, "Generation did not stop on repeated duplicates"
+    except RuntimeError:
+        assert stats['duplicates'] == 1
+    print("✓ Generation stops once duplicates keep repeating")
+    return True
+
+def test_canonical_form():
+    """Test canonical forms and the puzzle index"""
+    print("\nTesting canonical forms...")
+    rng = random.Random(7)
+    puzzle = CompactBoard.from_string(HARD_PUZZLES[0])
+    solution = puzzle.copy()
+    solve(solution)
+    canonical, transform = canonical_form(puzzle)
+    assert transform.apply(puzzle) == canonical
+    assert transform.invert().apply(canonical) == puzzle
+    for _ in range(5):
+        variant = random_transform(rng)
+        assert is_valid_board(variant.apply(solution))
+        assert canonical_form(variant.apply(puzzle))[0] == canonical
+    print("✓ Equivalent puzzles share a canonical form")
+
+    try:
+        Transform(row_perm=(0, 1, 3, 2, 4, 5, 6, 7, 8))
+        assert False, "Row swap across bands accepted"
+    except ValueError:
+        pass
+    print("✓ Transforms that break a band are rejected")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for path in (None, os.path.join(folder, 'index')):
+            with PuzzleIndex(path) as index:
+                assert index.add(puzzle, solution)
+                variant = random_transform(rng).apply(puzzle)
+                assert variant in index and not index.add(variant)
+                assert CompactBoard.from_string(HARD_PUZZLES[1]) not in index
+                mapped = index.solution_for(variant)
+                assert is_valid_board(mapped)
+                assert all(value in (0, mapped[i]) for i, value in enumerate(variant))
+                assert len(index) == 1
+    print("✓ Index maps a stored solution onto equivalent puzzles")
+    return True
+
+def test_solution_cache():
+    """Test the memoizing solution cache"""
+    print("\nTesting solution cache...")
+    rng = random.Random(11)
+    puzzle = CompactBoard.from_string(HARD_PUZZLES[1])
+    cache = SolutionCache(maxsize=2)
+    board = puzzle.copy()
+    stats = SolveStats()
+    assert cache.solve(board, stats) and is_valid_board(board)
+    assert stats.nodes > 0 and cache.info()['misses'] == 1
+    variant = random_transform(rng).apply(puzzle)
+    rows = variant.to_rows()
+    stats = SolveStats()
+    assert cache.solve(rows, stats) and is_valid_board(rows)
+    assert all(value in (0, rows[i // 9][i % 9]) for i, value in enumerate(variant))
+    assert stats.nodes == 0 and cache.info()['hits'] == 1
+    print("✓ Symmetric variant served from the cache")
+
+    unsolvable = puzzle.copy()
+    unsolvable[1] = puzzle[0]
+    assert not cache.solve(unsolvable) and cache.get(unsolvable) is False
+    cache.put(HARD_PUZZLES[0], None)
+    assert len(cache) == 2 and cache.info()['evictions'] == 1
+    assert cache.get(puzzle) is None
+    print("✓ Least recently used entry evicted")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'solutions')
+        with SolutionCache(canonical=False, path=path) as cache:
+            assert cache.solve(puzzle.copy())
+        with SolutionCache(canonical=False, path=path) as cache:
+            assert cache.get(puzzle) == board
+            assert cache.get(variant) is None
+    print("✓ Exact keys persisted between runs")
+    return True
+
+def test_seed_bank():
+    """Test generation from a seed bank of minimal puzzles"""
+    print("\nTesting seed bank...")
+    rng = random.Random(3)
+    bank = SeedBank(reuse=4)
+    for difficulty in ('easy', 'medium', 'easy', 'medium', 'easy'):
+        puzzle, solution = generate_puzzle(difficulty, rng, bank=bank)
+        assert count_solutions(puzzle) == 1 and is_valid_board(solution)
+        assert difficulty_of(rate_puzzle(puzzle)) == difficulty
+        assert all(value in (0, solution[i // 9][i % 9])
+                   for i, value in enumerate(itertools.chain(*puzzle)))
+    assert is_valid_board(bank.full_board(rng))
+    print("✓ Derived puzzles are unique and in their difficulty band")
+
+    cores = len(bank)
+    bank.add(HARD_PUZZLES[0])
+    assert len(bank) == cores + 1
+    try:
+        bank.add("0" * 81)
+        assert False, "Puzzle without a unique solution accepted"
+    except ValueError:
+        pass
+    print("✓ Only uniquely solvable puzzles are added")
+
+    pack = list(generate_many(6, 'easy', workers=1, seed=5, chunksize=3, reuse=3))
+    assert len({canonical_form(puzzle)[0] for puzzle, _ in pack}) == 6
+    assert list(generate_many(6, 'easy', workers=2, seed=5, chunksize=3, reuse=3)) == pack
+    print("✓ Bank-derived packs are reproducible")
+    return True
+
+def test_puzzle_pool():
+    """Test pre-generated puzzle pools"""
+    print("\nTesting puzzle pool...")
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'pool.txt')
+        with PuzzlePool(low=1, high=3, difficulties=('easy',), path=path,
+                        start=False) as pool:
+            pool.fill()
+            assert pool.sizes() == {'easy': 3}
+            board = SudokuBoard('easy', pool=pool)
+            assert pool.sizes() == {'easy': 2}
+            assert count_solutions(board.puzzle) == 1
+        print("✓ Board taken from a filled pool")
+
+        with PuzzlePool(path=path, start=False) as pool:
+            assert pool.sizes()['easy'] == 2
+            puzzle, solution = pool.get('easy')
+            assert solve(puzzle.copy()) and count_solutions(puzzle) == 1
+            # Empty queues fall back to synchronous generation
+            assert pool.get('hard')[0].count_empty() > 0
+        print("✓ Pool persisted between runs")
+
+    with PuzzlePool(low=2, high=4, difficulties=('medium',)) as pool:
+        pool.get('medium')
+        for _ in range(200):
+            if pool.sizes()['medium'] >= 4:
+                break
+            time.sleep(0.05)
+        assert pool.sizes()['medium'] == 4
+    print("✓ Background thread refilled the pool")
+
+    with PuzzlePool(low=1, high=2, difficulties=()) as pool:
+        assert pool.try_get('easy') is None
+        for _ in range(200):
+            if pool.sizes()['easy'] >= 2:
+                break
+            time.sleep(0.05)
+        assert pool.sizes() == {'easy': 2}
+    print("✓ A pool without difficulties only fills the ones asked for")
+    return True
+
+def test_difficulty_rating():
+    """Test the logical solver, ratings and band-targeted generation"""
+    print("\nTesting difficulty rating...")
+    puzzle = CompactBoard.from_string(HARD_PUZZLES[0])
+    solution = puzzle.copy()
+    solve(solution)
+    steps = list(logical_steps(puzzle))
+    for step in steps:
+        assert all(solution.cells[cell] == digit for cell, digit in step.placements)
+        assert all(solution.cells[cell] != digit for cell, digit in step.eliminations)
+    rating = rate_puzzle(puzzle)
+    # Singles suffice, so every step fills one cell at weight 1
+    assert rating.solved and rating.hardest in ('naked single', 'hidden single')
+    assert rating.score == puzzle.count_empty() == len(steps)
+    print(f"✓ 17-clue puzzle rated {rating.score} in {len(steps)} sound steps")
+
+    # Inkala's puzzle needs more than these techniques
+    assert not rate_puzzle(HARD_PUZZLES[1]).solved
+    capped = rate_puzzle(puzzle, max_score=20)
+    assert not capped.solved and 20 < capped.score <= 20 + 15
+    print("✓ Unfinished and capped ratings are unsolved")
+
+    for difficulty in ('easy', 'medium', 'hard'):
+        puzzle, solution = generate_puzzle(difficulty)
+        rating = rate_puzzle(puzzle)
+        assert difficulty_of(rating) == difficulty, (difficulty, rating)
+        assert count_solutions(puzzle) == 1
+    print("✓ Generated puzzles rate inside their difficulty band")
+    return True
+
+def test_generation_progress():
+    """Test progress reporting and boards built from given puzzles"""
+    print("\nTesting generation progress...")
+    reports = []
+    puzzle, solution = generate_puzzle(
+        'easy', progress=lambda done, total: reports.append((done, total)))
+    assert all(0 <= done <= total for done, total in reports)
+    assert reports[-1][0] == reports[-1][1]
+    print(f"✓ {len(reports)} progress reports during generation")
+
+    class Cancelled(Exception):
+        pass
+
+    def cancel_while_rating(done, total):
+        if (done, total) == (1, 1):
+            raise Cancelled()
+    for bank in (None, SeedBank()):
+        try:
+            generate_puzzle('hard', random.Random(3), cancel_while_rating, bank)
+            assert False, "Band fitting ignored the progress callback"
+        except Cancelled:
+            pass
+    print("✓ Progress callback can abort the band fitting")
+
+    board = SudokuBoard.from_puzzle(puzzle)
+    assert board.puzzle == puzzle and board.solution == solution
+    assert board.difficulty == 'custom'
+    try:
+        SudokuBoard.from_puzzle('11' + '.' * 79)
+    except ValueError:
+        print("✓ Boards built from given puzzles")
+    else:
+        raise AssertionError('Unsolvable puzzle accepted')
+    return True
+
+def test_import_time():
+    """Test that importing the library stays fast and headless"""
+    print("\nTesting import time...")
+    script = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import sudoku\n"
+        "elapsed = time.perf_counter() - started\n"
+        "heavy = [name for name in ('PySide6', 'concurrent.futures', 'numpy', 'asyncio',\n"
+        "                           'sudoku._logic')\n"
+        "         if name in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Best of a few runs to keep a busy machine from failing the check
+    timings = []
+    for _ in range(3):
+        output = subprocess.run([sys.executable, '-c', script], cwd=here, check=True,
+                                capture_output=True, text=True).stdout.split()
+        assert len(output) == 1, f"Heavy modules imported: {output[1]}"
+        timings.append(float(output[0]))
+    assert min(timings) < 0.05, f"import sudoku took {min(timings) * 1000:.1f}ms"
+    print(f"✓ import sudoku in {min(timings) * 1000:.1f}ms without PySide6 or NumPy")
+    return True
+
+def test_benchmark_baselines():
+    """Test benchmark baselines and regression flagging"""
+    print("\nTesting benchmark baselines...")
+    import bench_sudoku
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'baseline.json')
+        args = ['-k', 'is_valid_board/solved-rows', '--repeat', '1']
+        assert bench_sudoku.main(args + ['--save', path]) == 0
+        assert bench_sudoku.main(args + ['--compare', path, '--threshold', '100']) == 0
+
+        # A baseline ten times faster than today must be flagged
+        with open(path) as handle:
+            document = json.load(handle)
+        for result in document['results'].values():
+            result['p50'] /= 10
+        with open(path, 'w') as handle:
+            json.dump(document, handle)
+        assert bench_sudoku.main(args + ['--compare', path]) == 1
+    print("✓ Regressions against a saved baseline are flagged")
+    return True
+
 def test_game_functions():
     """Test game functionality"""
     print("\nTesting game functions...")
@@ -85,6 +674,416 @@ def test_game_functions():
     
     return True
 
+def test_conflict_tracking():
+    """Test the incremental move, completion and conflict queries of a game"""
+    print("\nTesting conflict tracking...")
+    # Hardest puzzle: row 0 holds only an 8 at column 0
+    board = SudokuBoard.from_puzzle(HARD_PUZZLES[1])
+    assert not board.is_valid_move(0, 5, 8) and board.is_valid_move(0, 5, 4)
+    assert not board.has_conflicts() and not board.is_complete()
+    assert board.set_cell(0, 5, 8) and not board.set_cell(0, 0, 1)
+    assert board.conflicting_cells() == [(0, 0), (0, 5)] and board.is_conflict(0, 0)
+    assert board.set_cell(1, 5, 8)
+    assert board.conflicting_cells() == [(0, 0), (0, 5), (1, 5)]
+    assert board.set_cell(0, 5, 0) and board.conflicting_cells() == []
+    print("✓ Conflicts appear and clear as cells change")
+
+    try:
+        board.set_cell(0, 5, 10)
+        assert False, "Out-of-range value accepted"
+    except ValueError:
+        pass
+    board.set_cell(1, 5, 0)
+    while board.get_hint():
+        pass
+    assert board.is_complete() and not board.has_conflicts()
+    board.reset()
+    assert board.current_board == board.puzzle and board.is_valid_move(1, 5, 8)
+    board.solve()
+    assert board.is_complete() and board.is_correct()
+    print("✓ Counters follow hints, reset and solve")
+    return True
+
+def test_move_history():
+    """Test undo, redo, seeking and saving a game session"""
+    print("\nTesting move history...")
+    board = SudokuBoard.from_puzzle(HARD_PUZZLES[1], difficulty='hard')
+    empty = [divmod(cell, 9) for cell in range(81) if not board.is_initial_cell(*divmod(cell, 9))]
+    rng = random.Random(20)
+    states = [board.current_board.board.copy()]
+    for _ in range(150):
+        row, col = rng.choice(empty)
+        if board.set_cell(row, col, rng.randint(0, 9)) and board.current_board != states[-1]:
+            states.append(board.current_board.board.copy())
+    assert len(board.history) == len(states) - 1 > board.history.interval
+    assert board.undo() and board.current_board == states[-2]
+    assert board.redo() and board.current_board == states[-1] and not board.redo()
+    for position in (0, 1, 64, len(states) - 1, 7):
+        board.seek(position)
+        assert board.current_board == states[position]
+    print("✓ Undo, redo and seek reproduce every earlier board")
+
+    saved = board.to_bytes()
+    restored = SudokuBoard.from_bytes(saved)
+    assert restored.current_board == states[7] and restored.difficulty == 'hard'
+    assert restored.history.position == 7 and len(restored.history) == len(states) - 1
+    assert restored.redo() and restored.current_board == states[8]
+    history = MoveHistory.from_bytes(board.history.to_bytes())
+    assert history.cells_at(len(states) - 1) == states[-1].cells
+    try:
+        SudokuBoard.from_bytes(saved[:40])
+        assert False, "Truncated session accepted"
+    except ValueError:
+        pass
+    print(f"✓ Session of {len(states) - 1} moves saved in {len(saved)} bytes and restored")
+
+    restored.solve()
+    assert restored.is_correct() and len(restored.history) == 9
+    restored.undo()
+    assert restored.current_board == states[8]
+    restored.reset()
+    assert restored.current_board == states[0] and restored.can_redo()
+    print("✓ Solve is one undoable step and reset can be redone")
+    return True
+
+def test_logical_hints():
+    """Test live candidates and logical hints"""
+    print("\nTesting logical hints...")
+    board = SudokuBoard.from_puzzle(HARD_PUZZLES[1])
+    rng = random.Random(22)
+    for _ in range(300):
+        row, col = rng.randrange(9), rng.randrange(9)
+        board.set_cell(row, col, rng.randint(0, 9))
+        if rng.random() < 0.2:
+            board.undo()
+    rows = board.current_board
+    for row, col in itertools.product(range(9), range(9)):
+        box = [rows[r][c] for r in range(row // 3 * 3, row // 3 * 3 + 3)
+               for c in range(col // 3 * 3, col // 3 * 3 + 3)]
+        seen = set(rows[row]) | {rows[r][col] for r in range(9)} | set(box)
+        expected = [] if rows[row][col] else [d for d in range(1, 10) if d not in seen]
+        assert board.candidates(row, col) == expected, (row, col)
+    print("✓ Candidates follow moves and undo")
+
+    seventeen = SudokuBoard.from_puzzle(HARD_PUZZLES[0])
+    hint = seventeen.find_hint()
+    assert seventeen.current_board == seventeen.puzzle and hint.technique.endswith('single')
+    assert hint.digit == seventeen.solution[hint.row][hint.col]
+    assert hint.steps[-1].placements == ((hint.row * 9 + hint.col, hint.digit),)
+
+    board.reset()
+    techniques = set()
+    while True:
+        hint = board.find_hint()
+        if hint is None:
+            break
+        techniques.add(hint.technique)
+        assert board.get_hint() == (hint.row, hint.col)
+    assert board.is_correct()
+    # Inkala's puzzle needs pairs along the way and reveals where logic stops
+    assert None in techniques and techniques - {None, 'naked single', 'hidden single'}
+    print(f"✓ Hints solve the puzzle using {sorted(filter(None, techniques))}")
+
+    board.reset()
+    row, col = next((r, c) for r in range(9) for c in range(9) if not board.is_initial_cell(r, c))
+    wrong = board.solution[row][col] % 9 + 1
+    board.set_cell(row, col, wrong)
+    hint = board.find_hint()
+    assert (hint.row, hint.col, hint.technique) == (row, col, 'correction')
+    small = SudokuBoard('easy', size=4).find_hint()
+    assert small.technique in ('naked single', 'hidden single')
+    print("✓ Wrong digits are corrected first; other sizes get singles")
+    return True
+
+def test_async_api():
+    """Test the asyncio entry points and the bounded executor"""
+    print("\nTesting async API...")
+    import asyncio
+    from sudoku import AsyncExecutor, asolve, agenerate_puzzle
+
+    async def solve_and_generate(executor):
+        board = CompactBoard.from_string(HARD_PUZZLES[1])
+        stats = SolveStats()
+        assert await asolve(board, stats=stats, executor=executor)
+        assert board == solve_many(HARD_PUZZLES[1:])[0] and stats.nodes > 0
+        assert not await asolve(CompactBoard.from_string('11' + '.' * 79), executor=executor)
+        first = await agenerate_puzzle('easy', seed=3, executor=executor)
+        assert first == await agenerate_puzzle('easy', seed=3, executor=executor)
+        assert count_solutions(first[0]) == 1
+
+    executor = AsyncExecutor(workers=2)
+    try:
+        asyncio.run(solve_and_generate(executor))
+    finally:
+        executor.shutdown()
+    print("✓ Solved and generated on worker processes")
+
+    async def overload(executor):
+        tasks = [asyncio.ensure_future(executor.run(time.sleep, 0.05)) for _ in range(8)]
+        await asyncio.sleep(0)  # Every task takes a slot or joins the queue
+        depth = executor.stats()
+        tasks[-1].cancel()
+        try:
+            await executor.run(time.sleep, 1, timeout=0.02)
+            assert False, "Queued call outlived its timeout"
+        except asyncio.TimeoutError:
+            pass
+        return depth, await asyncio.gather(*tasks, return_exceptions=True)
+
+    executor = AsyncExecutor(workers=2, max_pending=2, kind='thread')
+    depth, results = asyncio.run(overload(executor))
+    executor.shutdown()
+    assert depth['running'] == 2 and depth['waiting'] == 6
+    assert isinstance(results[-1], asyncio.CancelledError) and results[:-1] == [None] * 7
+    stats = executor.stats()
+    assert stats['running'] == stats['waiting'] == 0 and stats['completed'] == 7
+    assert stats['timeouts'] == 1 and stats['cancelled'] == 1
+    print("✓ Calls beyond max_pending wait, time out and cancel in the queue")
+    return True
+
+def test_http_service():
+    """Test the HTTP service and its load-test client"""
+    print("\nTesting HTTP service...")
+    import asyncio
+    from sudoku import AsyncExecutor, PuzzleServer
+    from sudoku._loadtest import Connection, load_test
+    solution = solve_many(HARD_PUZZLES[:1])[0].to_string()
+
+    async def exercise(server):
+        await server.start()
+        host, port = server.address
+        client = Connection(host, port)
+        status, answer = await client.request('GET', '/generate?difficulty=easy')
+        assert status == 200 and answer['source'] == 'pool'
+        assert count_solutions(CompactBoard.from_string(answer['puzzle'])) == 1
+        status, answer = await client.request('GET', '/generate?difficulty=easy')
+        assert status == 200 and answer['source'] == 'generated'
+
+        clients = [Connection(host, port) for _ in range(6)]
+        answers = await asyncio.gather(*(other.request('POST', '/solve', {'puzzle': HARD_PUZZLES[0]})
+                                         for other in clients))
+        assert answers == [(200, {'solution': solution})] * 6
+        assert server.stats()['batches']['max'] > 1
+        assert await client.request('POST', '/solve', {'puzzle': '11' + '.' * 79}) == \
+            (200, {'solution': None})
+
+        board = '66' + HARD_PUZZLES[0][2:]
+        assert await client.request('POST', '/validate', {'board': board}) == \
+            (200, {'valid': False, 'complete': False, 'conflicts': [[0, 0], [0, 1]]})
+        status, answer = await client.request('POST', '/hint', {'puzzle': HARD_PUZZLES[0]})
+        hint = answer['hint']
+        assert status == 200 and hint['technique'] is not None
+        assert solution[hint['row'] * 9 + hint['col']] == str(hint['digit'])
+        status, answer = await client.request('POST', '/hint', {'puzzle': HARD_PUZZLES[0],
+                                                                'board': board})
+        hint = answer['hint']
+        assert hint['technique'] == 'correction' and hint['row'] == 0 and hint['col'] in (0, 1)
+        assert solution[hint['col']] == str(hint['digit']) != '6'
+
+        assert (await client.request('POST', '/solve', {'puzzle': '123'}))[0] == 400
+        assert (await client.request('POST', '/solve'))[0] == 400
+        assert (await client.request('GET', '/missing'))[0] == 404
+        report = await load_test(f'http://{host}:{port}', 'validate', 40, 4, HARD_PUZZLES)
+        assert report['requests'] == 40 and report['statuses'] == {200: 40}
+        for connection in clients:
+            connection.close()
+        await server.close()
+        try:
+            await client.request('GET', '/stats')
+            assert False, "Connection outlived the server"
+        except ConnectionError:
+            pass
+
+    executor = AsyncExecutor(workers=2, kind='thread')
+    pool = PuzzlePool(low=0, high=1, difficulties=('easy',), start=False)
+    pool.put('easy', *generate_puzzle('easy'))
+    server = PuzzleServer(port=0, executor=executor, pool=pool, batch_delay=0.02)
+    try:
+        asyncio.run(exercise(server))
+    finally:
+        executor.shutdown()
+        pool.close()
+    stats = server.stats()
+    assert stats['statuses'] == {'200': 53, '400': 2, '404': 1}
+    assert stats['latency']['/validate']['count'] == 41
+    print("✓ Generated, solved in batches, validated and hinted over HTTP")
+
+    # Conflict-free but unsolvable only in the last row: endless for backtracking
+    trap = {'puzzle': '000000009' + '0' * 63 + '123456780', 'engine': 'backtrack'}
+
+    async def overrun(server):
+        await server.start()
+        clients = [Connection(*server.address) for _ in range(4)]
+        answers = await asyncio.gather(*(client.request('POST', '/solve', trap)
+                                         for client in clients))
+        await asyncio.sleep(0.3)
+        running = executor.stats()['running']
+        for client in clients:
+            client.close()
+        await server.close()
+        return [status for status, _ in answers], running
+
+    async def ask(server, method, target, payload=None):
+        await server.start()
+        client = Connection(*server.address)
+        answer = await client.request(method, target, payload)
+        client.close()
+        await server.close()
+        return answer
+
+    class BrokenPool(PuzzlePool):
+        def try_get(self, difficulty):
+            raise OSError('Pool file is gone')
+
+    executor = AsyncExecutor(workers=1, kind='thread')
+    server = PuzzleServer(port=0, executor=executor, pool=pool, batch_delay=0.02, timeout=0.2)
+    try:
+        statuses, running = asyncio.run(overrun(server))
+        status, answer = asyncio.run(ask(
+            PuzzleServer(port=0, executor=executor, pool=pool, max_nodes=3),
+            'POST', '/hint', {'puzzle': HARD_PUZZLES[1]}))
+        broken = PuzzleServer(port=0, executor=executor,
+                              pool=BrokenPool(low=0, high=1, start=False))
+        failure = asyncio.run(ask(broken, 'GET', '/generate'))
+        bad_size = asyncio.run(ask(broken, 'GET', '/generate?size=5'))
+    finally:
+        executor.shutdown()
+    assert statuses == [503] * 4 and server.stats()['batches']['count'] == 1
+    assert running == 0
+    print("✓ A batch of endless puzzles shares one timeout")
+    assert status == 503 and answer['error'].startswith('Gave up')
+    print("✓ Hints search the puzzle under the same budget")
+    assert failure == (500, {'error': 'Internal Server Error'})
+    assert bad_size[0] == 400 and broken.stats()['statuses'] == {'400': 1, '500': 1}
+    print("✓ Server failures are answered with a 500")
+    return True
+
+def test_search_budget():
+    """Test timeouts, guess budgets and cancellation of the engines"""
+    print("\nTesting search budgets...")
+    import asyncio
+    import threading
+    from sudoku import AsyncExecutor, asolve
+    # Conflict-free but unsolvable only in the last row: endless for backtracking
+    trap = '000000009' + '0' * 63 + '123456780'
+    easy = CompactBoard.from_rows(generate_puzzle('easy')[0])
+
+    for engine in ('bitmask', 'dlx', 'backtrack'):
+        board = CompactBoard.from_string(HARD_PUZZLES[1])
+        stats = SolveStats()
+        result = solve(board, engine, stats, max_nodes=5)
+        assert isinstance(result, GaveUp) and not result and result is not False
+        assert result.reason == 'nodes' and result.stats.nodes == stats.nodes == 6
+        assert board == CompactBoard.from_string(HARD_PUZZLES[1])
+        cancel = threading.Event()
+        cancel.set()
+        assert solve(board, engine, cancel=cancel).reason == 'cancelled'
+        board = easy.copy()
+        assert solve(board, engine, max_nodes=100000) is True and not board.count_empty()
+        result = count_solutions(CompactBoard(), 10 ** 6, engine, max_nodes=500)
+        assert result.reason == 'nodes' and result.stats.solutions > 0
+    print("✓ Every engine stops at its guess budget and on cancellation")
+
+    started = time.perf_counter()
+    result = solve(CompactBoard.from_string(trap), 'backtrack', timeout=0.05)
+    assert result.reason == 'timeout' and time.perf_counter() - started < 1.0
+    assert solve(CompactBoard.from_string(trap)) is False
+    solutions = solve_many([HARD_PUZZLES[1], trap, HARD_PUZZLES[0]], workers=1, max_nodes=3)
+    assert isinstance(solutions[0], GaveUp) and solutions[1] is None and solutions[2]
+    print("✓ Timeouts unwind the search and batches report GaveUp per puzzle")
+
+    async def budgeted(executor):
+        assert (await asolve(CompactBoard.from_string(HARD_PUZZLES[1]), max_nodes=3,
+                             executor=executor)).reason == 'nodes'
+        try:
+            await asolve(CompactBoard.from_string(trap), 'backtrack', timeout=0.05,
+                         executor=executor)
+            assert False, "Trap puzzle was solved"
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.2)
+        return executor.stats()
+
+    executor = AsyncExecutor(workers=1, kind='thread')
+    stats = asyncio.run(budgeted(executor))
+    assert stats['running'] == 0 and stats['timeouts'] == 1
+
+    async def queued(executor):
+        await executor.run(time.sleep, 0)  # Start the worker process
+        busy = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        try:
+            # Handed to the worker's call queue, where it can no longer be withdrawn
+            await asolve(CompactBoard.from_string(trap), 'backtrack', timeout=0.2,
+                         executor=executor)
+            assert False, "Trap puzzle was solved"
+        except asyncio.TimeoutError:
+            pass
+        await busy
+        await asyncio.sleep(0.15)
+        return executor.stats()
+
+    executor = AsyncExecutor(workers=1, max_pending=2)
+    try:
+        stats = asyncio.run(queued(executor))
+    finally:
+        executor.shutdown()
+    assert stats['running'] == 0 and stats['timeouts'] == 1
+    print("✓ A queued asolve stops at the caller's deadline")
+    executor.shutdown()
+    print("✓ asolve stops the worker's search at its timeout")
+    return True
+
+def test_puzzle_store():
+    """Test writing, appending and memory-mapped reading of a puzzle store"""
+    print("\nTesting puzzle store...")
+    pack = list(generate_many(6, 'easy', workers=1, seed=7))
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'pack.store')
+        with PuzzleStore(path, 'w') as store:
+            store.extend(pack[:4], 'easy')
+            store.append(HARD_PUZZLES[0])
+        with PuzzleStore(path, 'a') as store:
+            store.extend(pack[4:], 'hard')
+        with PuzzleStore(path) as store:
+            assert len(store) == 7 and store.indexed and store.record_size == 84
+            record = store[5]
+            assert record.puzzle == pack[4][0] and record.solution == pack[4][1]
+            assert record.difficulty == 'hard' and record.puzzle[0, 2] == pack[4][0][2]
+            assert store[4].solution is None and store[4].puzzle.to_string('0') == HARD_PUZZLES[0]
+            assert list(store.with_difficulty('hard')) == [5, 6]
+            assert list(store.with_difficulty(None)) == [4]
+            assert solve_many(store.puzzles(0, 4), workers=1) == [s for _, s in pack[:4]]
+        print("✓ Records read back through the memory map, with the difficulty index")
+
+        sixteen = list(generate_many(2, 'easy', workers=1, seed=7, size=16))
+        with PuzzleStore(os.path.join(folder, 'sixteen.store'), 'w', size=16) as store:
+            store.extend(sixteen)
+            try:
+                store.append(HARD_PUZZLES[0])
+                assert False, "9x9 puzzle accepted in a 16x16 store"
+            except ValueError:
+                pass
+        with PuzzleStore(os.path.join(folder, 'sixteen.store')) as store:
+            assert [record.puzzle.to_board() for record in store] == [p for p, _ in sixteen]
+        print("✓ 16x16 boards stored a byte per cell")
+
+        solved = os.path.join(folder, 'solved.store')
+        assert _cli.main(['solve', path, '--store', '-o', solved, '-q']) == 0
+        with PuzzleStore(solved) as store:
+            assert store[4].solution.to_board() == solve_many(HARD_PUZZLES[:1])[0]
+            assert [record.difficulty for record in store] == ['easy'] * 4 + [None] + ['hard'] * 2
+        text = os.path.join(folder, 'puzzles.txt')
+        with open(text, 'w') as handle:
+            handle.write('\n'.join(HARD_PUZZLES) + '\n')
+        try:
+            PuzzleStore(text)
+            assert False, "Text file opened as a store"
+        except ValueError:
+            pass
+    print("✓ Solve command reads and writes stores")
+    return True
+
 def print_board(board):
     """Print a sudoku board"""
     for i, row in enumerate(board):
@@ -103,8 +1102,33 @@ if __name__ == '__main__':
     
     try:
         test_board_generation()
+        test_puzzle_uniqueness()
         test_solver()
+        test_solver_engines()
+        test_solution_counting()
+        test_solve_stats()
+        test_compact_board()
+        test_board_sizes()
+        test_vectorized_validation()
+        test_batch_solving()
+        test_solve_command()
+        test_bulk_generation()
+        test_canonical_form()
+        test_solution_cache()
+        test_seed_bank()
+        test_puzzle_pool()
+        test_difficulty_rating()
+        test_generation_progress()
+        test_import_time()
+        test_benchmark_baselines()
         test_game_functions()
+        test_conflict_tracking()
+        test_move_history()
+        test_logical_hints()
+        test_async_api()
+        test_http_service()
+        test_search_budget()
+        test_puzzle_store()
         
         print("\n" + "=" * 50)
         print("Example Medium Puzzle:")